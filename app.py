@@ -1,21 +1,39 @@
 #!/usr/bin/env python3
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, abort
+from flask_sock import Sock
 import subprocess
+import asyncio
+import hashlib
 import json
 import logging
 import os
 import signal
+import sys
 import time
+import atexit
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
-from libs.ssh_utils import get_host_uptimes
 from libs.grafana_utils import process_dashboards
-from libs.power_management import get_power_status, power_on_host
-from libs.network_utils import check_host_ping
-from libs.gpu_management import get_gpu_info_sync, get_gpu_topo_info_sync, get_docker_info_sync, parse_docker_output_to_html, docker_action_sync
+from libs.power_management import get_power_statuses, power_on_host
+from libs.ipmi_sessions import get_ipmi_session_manager
+from libs.gpu_management import get_gpu_topo_info_sync, parse_docker_output_to_html, docker_action_sync, parse_container_lines, container_record
 from libs.terminal_management import TerminalManager
-from libs.config_utils import load_config, find_host_by_hostname, get_local_hostname
+from libs.web_terminal import terminal_size
+from libs.ssh_pool import get_ssh_pool
+from libs.circuit_breaker import get_host_health
+from libs.deadlines import Deadline, budget, current_deadline, set_deadline
+from libs.instrumentation import REQUEST_TIMEOUTS
+from libs.event_loop import get_event_loop_service, run_async
+from libs.fleet_poller import get_fleet_poller
+from libs.gpu_telemetry import get_gpu_telemetry_manager, merge_gpu_sample
+from libs.docker_state import get_docker_state_manager
+from libs.docker_stats import get_docker_stats_manager, summarize_container_stats
+from libs.docker_actions import DOCKER_ACTIONS, bulk_docker_action, is_valid_container_ref, is_valid_label_selector
+from libs.metrics_store import get_metrics_store, autosave
+from libs.prometheus_exporter import render_metrics
+from libs.fanout import get_fanout_commands, stream_fanout
+from libs.config_utils import load_config, find_host_by_hostname, get_local_hostname, get_host_key, install_reload_signal_handler
 from libs.version import get_version, get_version_info, get_build_info
 
 class DeduplicatingHandler(logging.Handler):
@@ -51,6 +69,7 @@ class DeduplicatingHandler(logging.Handler):
         self.target_handler.setLevel(level)
 
 app = Flask(__name__)
+sock = Sock(app)
 
 def setup_logging():
     logs_dir = Path(__file__).parent / 'logs'
@@ -63,11 +82,12 @@ def setup_logging():
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
     
-    # Clear all loggers
+    # Clear all loggers; third-party ones stay silent, while the application's
+    # own modules under libs/ log through the 'libs' logger configured below
     for logger_name in list(logging.Logger.manager.loggerDict.keys()):
         logger = logging.getLogger(logger_name)
         logger.handlers.clear()
-        logger.disabled = True
+        logger.disabled = not (logger_name == 'libs' or logger_name.startswith('libs.'))
     
     # Create file handler
     file_handler = RotatingFileHandler(
@@ -91,12 +111,109 @@ def setup_logging():
     app.logger.propagate = False  # Critical: don't propagate
     app.logger.disabled = False
     
+    # Timeouts, circuit breaker changes and poller errors from libs/ go to the same log
+    libs_logger = logging.getLogger('libs')
+    libs_logger.handlers = list(app.logger.handlers)
+    libs_logger.setLevel(logging.INFO)
+    libs_logger.propagate = False
+    
     # Disable werkzeug logging completely
     logging.getLogger('werkzeug').disabled = True
+    return app.logger
 
 logger = setup_logging()
 
 
+def configure_ssh_pool(config):
+    """Apply SSH connection pool limits from config"""
+    get_ssh_pool().configure(
+        max_connections_per_host=config.get('ssh_pool_max_connections', 2),
+        max_channels_per_connection=config.get('ssh_pool_max_channels', 8),
+        idle_timeout=config.get('ssh_pool_idle_timeout', 300),
+        keepalive_interval=config.get('ssh_keepalive_interval', 30),
+        shared_result_ttl=config.get('probe_cache_ttl', 2),
+        connect_timeout=config.get('ssh_connect_timeout', 5),
+        auth_timeout=config.get('ssh_auth_timeout', 10)
+    )
+
+configure_ssh_pool(load_config())
+
+def configure_host_health(config):
+    """Apply circuit breaker settings for unreachable hosts from config"""
+    get_host_health().configure(
+        failure_threshold=config.get('circuit_failure_threshold', 3),
+        base_backoff=config.get('circuit_base_backoff', 5),
+        max_backoff=config.get('circuit_max_backoff', 300),
+        channel_max_backoff={'icmp': config.get('circuit_icmp_max_backoff', 30)}
+    )
+
+configure_host_health(load_config())
+
+def configure_ipmi_sessions(config):
+    """Apply persistent IPMI session settings from config"""
+    get_ipmi_session_manager().configure(
+        enabled=config.get('ipmi_persistent_sessions', True),
+        idle_timeout=config.get('ipmi_session_idle_timeout', 60),
+        max_concurrency=config.get('ipmi_concurrency', 10)
+    )
+
+configure_ipmi_sessions(load_config())
+
+def configure_metrics_history(config):
+    """Restore saved metric history and schedule periodic saves if a database is configured"""
+    db_path = config.get('metrics_history_db')
+    if not db_path:
+        return
+    store = get_metrics_store()
+    store.db_path = str(Path(__file__).parent / db_path)
+    try:
+        store.load()
+    except Exception as e:
+        logger.error(f"Error restoring metric history: {e}")
+    get_event_loop_service().submit(autosave(store, config.get('metrics_history_save_interval', 600)))
+
+# config.json is cached and reloaded when it changes on disk or on SIGHUP
+install_reload_signal_handler()
+
+_shutdown_done = False
+
+def stop_live_streams():
+    """End open event streams and terminals, which would otherwise hold their connections until killed"""
+    get_fleet_poller().state.close()
+    if terminal_manager is not None:
+        terminal_manager.stop_all()
+
+def shutdown_background_services():
+    """Stop the fleet poller, terminals and IPMI sessions, save metric history and stop the event loop"""
+    global _shutdown_done
+    # Runs from the server's shutdown hook and again from atexit
+    if _shutdown_done:
+        return
+    _shutdown_done = True
+    stop_live_streams()
+    get_fleet_poller().stop()
+    try:
+        run_async(get_ipmi_session_manager().close_all(), timeout=5)
+    except Exception as e:
+        logger.warning(f"Error closing IPMI sessions: {e}")
+    try:
+        get_metrics_store().save()
+    except Exception as e:
+        logger.warning(f"Error saving metric history: {e}")
+    get_event_loop_service().stop()
+    logger.info("Background services stopped")
+
+# One event loop thread multiplexes all async SSH work for the application
+get_event_loop_service().start()
+atexit.register(shutdown_background_services)
+
+configure_metrics_history(load_config())
+
+# Poll host state in the background so read endpoints serve cached snapshots
+if load_config().get('poller_enabled', True):
+    get_fleet_poller().start()
+
+
 # Initialize terminal manager (will be updated with config values)
 terminal_manager = None
 
@@ -106,37 +223,126 @@ def get_terminal_manager():
     if terminal_manager is None:
         config = load_config()
         ttyd_base_port = config.get('ttyd_base_port', 7681)
+        ttyd_port_count = config.get('ttyd_port_count', 1000)
         local_hostname = get_local_hostname(config)
-        terminal_manager = TerminalManager(ttyd_base_port, local_hostname)
+        terminal_backend = config.get('terminal_backend', 'ttyd')
+        terminal_manager = TerminalManager(ttyd_base_port, local_hostname, ttyd_port_count, terminal_backend)
     return terminal_manager
 
+# Check for ttyd (when used) once at startup instead of on every terminal launch
+get_terminal_manager()
+
+# Endpoints that stream or run Docker actions bound themselves with their own limits
+DEADLINE_EXEMPT_ENDPOINTS = {'static', 'api_stream', 'api_fanout', 'web_terminal_socket', 'docker_action', 'docker_bulk_action'}
+
+@app.before_request
+def start_request_deadline():
+    """Give the request an overall deadline that every host operation it waits on is cut short by"""
+    timeout = load_config().get('request_timeout', 30)
+    deadline = Deadline(timeout) if timeout and request.endpoint not in DEADLINE_EXEMPT_ENDPOINTS else None
+    # Worker threads are reused, so always replace whatever the last request left
+    set_deadline(deadline)
+
+@app.after_request
+def check_request_deadline(response):
+    """Count requests that ran out of time waiting for hosts"""
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired():
+        logger.warning(f"{request.path} exceeded its {deadline.timeout}s deadline")
+        REQUEST_TIMEOUTS.inc(endpoint=request.endpoint)
+    return response
+
+
+def collect_power_statuses(config, hosts):
+    """Run a bounded concurrent IPMI power sweep using the configured limits"""
+    return get_power_statuses(
+        hosts,
+        config.get('ipmitool_path', 'ipmitool'),
+        max_concurrency=config.get('ipmi_concurrency', 10),
+        sweep_timeout=budget(config.get('ipmi_sweep_timeout', 5))
+    )
+
+
+def cached_power_statuses(config, hosts):
+    """Get power status from the poller cache, sweeping hosts that were never collected"""
+    state = get_fleet_poller().state
+    statuses = []
+    for host in hosts:
+        entry = state.get(get_host_key(host), 'power')
+        statuses.append(entry['value'] if entry else None)
+    
+    missing = [index for index, status in enumerate(statuses) if status is None]
+    if missing:
+        swept = collect_power_statuses(config, [hosts[index] for index in missing])
+        for index, status in zip(missing, swept):
+            statuses[index] = status
+            host_key = get_host_key(hosts[index])
+            if host_key and status != 'pending':
+                state.update(host_key, 'power', status)
+    
+    return statuses
+
+def with_freshness(result, entry):
+    """Add the collection time and age of a cached entry to a response"""
+    result = dict(result)
+    result['updated'] = entry['updated']
+    result['age'] = round(time.time() - entry['updated'], 1)
+    return result
+
+def serialize_entry(entry):
+    """Convert a cached poller entry into a JSON-ready dict with freshness fields"""
+    value = entry['value']
+    if not isinstance(value, dict):
+        value = {'status': value}
+    return with_freshness(value, entry)
+
+# Fields pushed to dashboard viewers by /api/stream
+STREAM_FIELDS = ('power', 'ping', 'uptime', 'docker')
+
+
+def refresh_container_state(changes):
+    """
+    Bring cached container lists up to date after Docker actions.
+
+    changes is a list of (host, container ids). Tracked hosts re-read just
+    those containers instead of waiting for their events.
+    """
+    if not changes:
+        return
+    
+    async def refresh_host(host, container_ids):
+        tracker = get_docker_state_manager().get(get_host_key(host))
+        if tracker is not None and tracker.is_synced():
+            try:
+                await tracker.refresh(container_ids)
+            except Exception as e:
+                logger.warning(f"Error refreshing containers on {get_host_key(host)}: {e}")
+        await get_fleet_poller().collect_now(host, 'docker')
+    
+    async def refresh_all():
+        await asyncio.gather(*(refresh_host(host, container_ids) for host, container_ids in changes))
+    
+    run_async(refresh_all())
 
 @app.route('/')
 def index():
     config = load_config()
     hosts = config.get('hosts', [])
-    ipmitool_path = config.get('ipmitool_path', 'ipmitool')
-    ssh_timeout = config.get('ssh_timeout', 10)
     grafana_dashboards = config.get('grafana_dashboard_urls', [])
     
     # Process Grafana dashboards
     updated_dashboards = process_dashboards(grafana_dashboards)
     
+    # Get power status from the poller cache
+    power_statuses = cached_power_statuses(config, hosts)
+    
     # Build host status list (without SSH uptime initially for faster page load)
     host_status = []
-    for host in hosts:
+    for host, power_status in zip(hosts, power_statuses):
         ipmi_host = host.get('ipmi_host')
-        ipmi_username = host.get('ipmi_username')
-        ipmi_password = host.get('ipmi_password')
         ssh_host = host.get('ssh_host')
         name = host.get('name', ipmi_host or ssh_host)
         
-        # Get power status only (fast IPMI check)
-        if ipmi_host and ipmi_username and ipmi_password:
-            power_status = get_power_status(ipmi_host, ipmi_username, ipmi_password, ipmitool_path)
-        else:
-            power_status = 'config_error'
-        
         host_status.append({
             'name': name,
             'hostname': ipmi_host or ssh_host,  # Keep for backwards compatibility
@@ -159,42 +365,121 @@ def index():
 def api_status():
     config = load_config()
     hosts = config.get('hosts', [])
-    ipmitool_path = config.get('ipmitool_path', 'ipmitool')
-    ssh_timeout = config.get('ssh_timeout', 10)
     
-    # Get SSH uptimes in parallel
-    ssh_results = get_host_uptimes(hosts, ssh_timeout)
+    # Get power status and uptimes from the poller cache
+    power_statuses = cached_power_statuses(config, hosts)
+    uptime_entries = get_fleet_poller().get_or_collect_many(hosts, 'uptime')
     
     # Build host status list
     host_status = []
-    for (host, uptime) in ssh_results:
+    for host, power_status, uptime_entry in zip(hosts, power_statuses, uptime_entries):
         ipmi_host = host.get('ipmi_host')
-        ipmi_username = host.get('ipmi_username')
-        ipmi_password = host.get('ipmi_password')
         ssh_host = host.get('ssh_host')
         name = host.get('name', ipmi_host or ssh_host)
         
-        # Get power status
-        if ipmi_host and ipmi_username and ipmi_password:
-            power_status = get_power_status(ipmi_host, ipmi_username, ipmi_password, ipmitool_path)
-        else:
-            power_status = 'config_error'
-        
         host_status.append({
             'name': name,
             'hostname': ipmi_host or ssh_host,
             'status': power_status,
-            'uptime': uptime
+            'uptime': uptime_entry['value'].get('uptime', uptime_entry['value'].get('message')),
+            'updated': uptime_entry['updated']
         })
     
     return jsonify({'hosts': host_status})
 
+@app.route('/api/fleet')
+def api_fleet():
+    """Get cached status fields for every host in one response"""
+    config = load_config()
+    hosts = config.get('hosts', [])
+    poller = get_fleet_poller()
+    
+    fields = [field.strip() for field in request.args.get('fields', 'ping,uptime,power').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in poller.get_intervals(config)]
+    if unknown:
+        return jsonify({'success': False, 'message': f'Unknown fields: {", ".join(unknown)}'}), 400
+    
+    fleet = []
+    for host in hosts:
+        ipmi_host = host.get('ipmi_host')
+        ssh_host = host.get('ssh_host')
+        host_entry = {
+            'name': host.get('name', ipmi_host or ssh_host),
+            'hostname': ipmi_host or ssh_host,
+            'pending': []
+        }
+        
+        for field in fields:
+            entry = poller.get_cached(host, field)
+            if entry is None:
+                # Not collected yet; a background collection has been started
+                host_entry[field] = None
+                host_entry['pending'].append(field)
+            else:
+                host_entry[field] = serialize_entry(entry)
+        
+        fleet.append(host_entry)
+    
+    return jsonify({
+        'success': True,
+        'fields': fields,
+        'complete': not any(host_entry['pending'] for host_entry in fleet),
+        'hosts': fleet
+    })
+
+@app.route('/api/stream')
+def api_stream():
+    """Push per-host status changes to the dashboard as Server-Sent Events"""
+    state = get_fleet_poller().state
+    
+    # Resume from the last event the browser saw when it reconnects
+    try:
+        since_version = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        since_version = 0
+    
+    def generate():
+        version = since_version
+        # Ask the browser to reconnect quickly if the stream drops
+        yield 'retry: 3000\n\n'
+        while True:
+            version, changes = state.wait_for_changes(version, timeout=15)
+            if state.closed:
+                # Shutting down; the browser reconnects to the next server process
+                return
+            if not changes:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+            
+            deltas = []
+            for host_key, metrics in changes.items():
+                delta = {'hostname': host_key}
+                for field in STREAM_FIELDS:
+                    if field in metrics:
+                        delta[field] = serialize_entry(metrics[field])
+                        # Viewers only need container counts, not the full listing
+                        delta[field].pop('output', None)
+                if len(delta) > 1:
+                    deltas.append(delta)
+            
+            # Only the last event of a batch carries the id, so a reconnect
+            # part way through a batch replays the whole batch
+            for index, delta in enumerate(deltas):
+                event_id = f"id: {version}\n" if index == len(deltas) - 1 else ''
+                yield f"{event_id}event: host\ndata: {json.dumps(delta)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/uptime/<hostname>')
 def get_uptime(hostname):
     """Get uptime for a specific host via SSH"""
     config = load_config()
     hosts = config.get('hosts', [])
-    ssh_timeout = config.get('ssh_timeout', 10)
     
     # Find the host in config
     target_host = find_host_by_hostname(hosts, hostname)
@@ -202,23 +487,9 @@ def get_uptime(hostname):
     if not target_host:
         return jsonify({'success': False, 'uptime': 'Host not found'})
     
-    ssh_host = target_host.get('ssh_host')
-    ssh_username = target_host.get('ssh_username')
-    ssh_password = target_host.get('ssh_password')
-    
-    if not ssh_host or not ssh_username:
-        return jsonify({'success': False, 'uptime': 'No SSH config'})
-    
-    # Check if host is pingable first
-    ping_result = check_host_ping(ssh_host)
-    if not ping_result.get('success') or ping_result.get('status') != 'online':
-        return jsonify({'success': False, 'uptime': 'Host unreachable'})
-    
-    # Get uptime using the existing SSH utility
-    from libs.ssh_utils import get_uptime_sync
-    uptime = get_uptime_sync(ssh_host, ssh_username, ssh_password, ssh_timeout)
-    
-    return jsonify({'success': True, 'uptime': uptime})
+    # Serve the poller's latest uptime (it only SSHes to hosts that answer ping)
+    entry = get_fleet_poller().get_or_collect(target_host, 'uptime')
+    return jsonify(with_freshness(entry['value'], entry))
 
 @app.route('/api/ping/<hostname>')
 def check_ping(hostname):
@@ -238,8 +509,8 @@ def check_ping(hostname):
     if not ping_target:
         return jsonify({'success': False, 'status': 'error', 'message': 'No host address configured'})
     
-    result = check_host_ping(ping_target)
-    return jsonify(result)
+    entry = get_fleet_poller().get_or_collect(target_host, 'ping')
+    return jsonify(with_freshness(entry['value'], entry))
 
 @app.route('/api/power-on/<hostname>', methods=['POST'])
 def api_power_on(hostname):
@@ -264,6 +535,8 @@ def api_power_on(hostname):
     result = power_on_host(hostname, ipmi_username, ipmi_password, ipmitool_path)
     
     if result['success']:
+        # Re-check power state ahead of schedule
+        get_fleet_poller().refresh(target_host, 'power')
         return jsonify(result), 200
     else:
         return jsonify(result), 500
@@ -282,11 +555,12 @@ def start_ssh_terminal(hostname):
     
     ssh_host = target_host.get('ssh_host')
     ssh_username = target_host.get('ssh_username')
+    ssh_password = target_host.get('ssh_password')
     
     if not ssh_host:
         return jsonify({'success': False, 'message': 'No SSH host configured for this server'}), 400
     
-    result = get_terminal_manager().start_ssh_terminal(hostname, ssh_host, ssh_username)
+    result = get_terminal_manager().start_ssh_terminal(hostname, ssh_host, ssh_username, ssh_password)
     
     if result['success']:
         return jsonify(result), 200
@@ -299,12 +573,31 @@ def list_ssh_terminals():
     terminals = get_terminal_manager().list_ssh_terminals()
     return jsonify({'terminals': terminals})
 
+@app.route('/terminal/<session_id>')
+def web_terminal_page(session_id):
+    """Serve the xterm.js page for a WebSocket terminal session"""
+    session = get_terminal_manager().get_web_session(session_id)
+    if session is None:
+        abort(404)
+    title = f"{'nvtop' if session['kind'] == 'nvtop' else 'SSH'} - {session['hostname']}"
+    return render_template('terminal.html', session_id=session_id, title=title, writable=session['web'].writable)
+
+@sock.route('/ws/terminal/<session_id>')
+def web_terminal_socket(ws, session_id):
+    """Bridge a browser terminal to the PTY on its dedicated SSH connection until either side closes"""
+    session = get_terminal_manager().get_web_session(session_id)
+    if session is None:
+        ws.close(reason=1008, message='Unknown terminal session')
+        return
+    cols, rows = terminal_size(request.args.get('cols', 80, type=int), request.args.get('rows', 24, type=int))
+    if not session['web'].attach(ws, cols, rows):
+        ws.close(reason=1008, message='Terminal session already in use')
+
 @app.route('/api/gpu-info/<hostname>')
 def get_gpu_info(hostname):
     """Get GPU information via SSH by running nvidia-smi"""
     config = load_config()
     hosts = config.get('hosts', [])
-    ssh_timeout = config.get('ssh_timeout', 10)
     
     # Find the host in config
     target_host = find_host_by_hostname(hosts, hostname)
@@ -314,7 +607,6 @@ def get_gpu_info(hostname):
     
     ssh_host = target_host.get('ssh_host')
     ssh_username = target_host.get('ssh_username')
-    ssh_password = target_host.get('ssh_password')
     
     if not ssh_host:
         return jsonify({'success': False, 'message': 'No SSH host configured for this server'}), 400
@@ -322,8 +614,64 @@ def get_gpu_info(hostname):
     if not ssh_username:
         return jsonify({'success': False, 'message': 'No SSH username configured for this server'}), 400
     
-    result = get_gpu_info_sync(ssh_host, ssh_username, ssh_password, ssh_timeout)
-    return jsonify(result)
+    entry = get_fleet_poller().get_or_collect(target_host, 'gpu')
+    return jsonify(with_freshness(entry['value'], entry))
+
+@app.route('/api/gpu-metrics/<hostname>')
+def get_gpu_metrics(hostname):
+    """Get parsed per-GPU metrics and compute processes from nvidia-smi query mode"""
+    config = load_config()
+    hosts = config.get('hosts', [])
+    
+    # Find the host in config
+    target_host = find_host_by_hostname(hosts, hostname)
+    
+    if not target_host:
+        return jsonify({'success': False, 'message': 'Host not found in configuration'}), 404
+    
+    ssh_host = target_host.get('ssh_host')
+    ssh_username = target_host.get('ssh_username')
+    
+    if not ssh_host:
+        return jsonify({'success': False, 'message': 'No SSH host configured for this server'}), 400
+    
+    if not ssh_username:
+        return jsonify({'success': False, 'message': 'No SSH username configured for this server'}), 400
+    
+    entry = get_fleet_poller().get_or_collect(target_host, 'gpu_metrics')
+    
+    # Prefer the live telemetry stream, keeping processes from the last full query
+    telemetry = get_gpu_telemetry_manager().get(get_host_key(target_host))
+    if telemetry is not None:
+        sample = telemetry.latest()
+        if telemetry.is_fresh(sample):
+            result = merge_gpu_sample(sample, entry['value'].get('gpus'))
+            return jsonify(with_freshness(result, {'updated': sample['timestamp']}))
+    
+    return jsonify(with_freshness(entry['value'], entry))
+
+@app.route('/api/gpu-telemetry/<hostname>')
+def get_gpu_telemetry(hostname):
+    """Get recent streamed GPU samples for a host from the telemetry ring buffer"""
+    config = load_config()
+    hosts = config.get('hosts', [])
+    
+    # Find the host in config
+    target_host = find_host_by_hostname(hosts, hostname)
+    
+    if not target_host:
+        return jsonify({'success': False, 'message': 'Host not found in configuration'}), 404
+    
+    telemetry = get_gpu_telemetry_manager().get(get_host_key(target_host))
+    if telemetry is None:
+        return jsonify({'success': False, 'message': 'GPU telemetry is not streaming for this host'}), 404
+    
+    try:
+        seconds = float(request.args['seconds']) if 'seconds' in request.args else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'seconds must be a number'}), 400
+    
+    return jsonify({'success': True, 'stream': telemetry.get_status(), 'samples': telemetry.history(seconds)})
 
 @app.route('/api/gpu-topo-info/<hostname>')
 def get_gpu_topo_info(hostname):
@@ -351,12 +699,55 @@ def get_gpu_topo_info(hostname):
     result = get_gpu_topo_info_sync(ssh_host, ssh_username, ssh_password, ssh_timeout)
     return jsonify(result)
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Export host, GPU and internal metrics for Prometheus from cached collector state"""
+    body = render_metrics(
+        load_config(),
+        get_fleet_poller().state,
+        get_gpu_telemetry_manager(),
+        get_ssh_pool(),
+        get_ipmi_session_manager(),
+        get_docker_stats_manager(),
+        get_host_health()
+    )
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/history/<hostname>')
+def get_history(hostname):
+    """Get recorded metric history for a host, or the list of recorded metrics"""
+    config = load_config()
+    hosts = config.get('hosts', [])
+    
+    # Find the host in config
+    target_host = find_host_by_hostname(hosts, hostname)
+    
+    if not target_host:
+        return jsonify({'success': False, 'message': 'Host not found in configuration'}), 404
+    
+    store = get_metrics_store()
+    host_key = get_host_key(target_host)
+    metrics = [metric.strip() for metric in request.args.get('metric', '').split(',') if metric.strip()]
+    if not metrics:
+        return jsonify({'success': True, 'metrics': store.list_metrics(host_key)})
+    
+    try:
+        seconds = float(request.args.get('seconds', 3600))
+        step = float(request.args['step']) if 'step' in request.args else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'seconds and step must be numbers'}), 400
+    
+    series = {}
+    for metric in metrics:
+        resolution, points = store.query(host_key, metric, seconds, step)
+        series[metric] = {'resolution': resolution, 'points': points}
+    return jsonify({'success': True, 'seconds': seconds, 'series': series})
+
 @app.route('/api/docker-info/<hostname>')
 def get_docker_info(hostname):
     """Get Docker containers information via SSH by running docker ps -a"""
     config = load_config()
     hosts = config.get('hosts', [])
-    ssh_timeout = config.get('ssh_timeout', 10)
     
     # Find the host in config
     target_host = find_host_by_hostname(hosts, hostname)
@@ -366,7 +757,6 @@ def get_docker_info(hostname):
     
     ssh_host = target_host.get('ssh_host')
     ssh_username = target_host.get('ssh_username')
-    ssh_password = target_host.get('ssh_password')
     
     if not ssh_host:
         return jsonify({'success': False, 'message': 'No SSH host configured for this server'}), 400
@@ -374,18 +764,120 @@ def get_docker_info(hostname):
     if not ssh_username:
         return jsonify({'success': False, 'message': 'No SSH username configured for this server'}), 400
     
-    result = get_docker_info_sync(ssh_host, ssh_username, ssh_password, ssh_timeout)
+    entry = get_fleet_poller().get_or_collect(target_host, 'docker')
+    result = entry['value']
     
     if result['success']:
         # Parse the docker output into HTML table
         html_table = parse_docker_output_to_html(result['output'], hostname)
-        return jsonify({'success': True, 'html': html_table})
+        return jsonify(with_freshness({'success': True, 'html': html_table}, entry))
     else:
-        return jsonify(result)
+        return jsonify(with_freshness(result, entry))
+
+@app.route('/api/docker-changes/<hostname>')
+def get_docker_changes(hostname):
+    """Get containers changed since a version, as tracked from Docker events"""
+    config = load_config()
+    hosts = config.get('hosts', [])
+    
+    # Find the host in config
+    target_host = find_host_by_hostname(hosts, hostname)
+    
+    if not target_host:
+        return jsonify({'success': False, 'message': 'Host not found in configuration'}), 404
+    
+    tracker = get_docker_state_manager().get(get_host_key(target_host))
+    if tracker is None or not tracker.is_synced():
+        return jsonify({'success': False, 'message': 'Docker events are not being tracked for this host'}), 404
+    
+    try:
+        since = int(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'since must be an integer'}), 400
+    
+    changes = tracker.get_changes(since)
+    return jsonify({
+        'success': True,
+        'version': changes['version'],
+        'reset': changes['reset'],
+        'containers': [container_record(container) for container in changes['containers']],
+        'removed': [container_id[:12] for container_id in changes['removed']]
+    })
+
+@app.route('/api/container-stats/<hostname>')
+def get_container_stats(hostname):
+    """Get the latest streamed CPU, memory, network and block I/O figures for a host's containers"""
+    config = load_config()
+    hosts = config.get('hosts', [])
+    
+    # Find the host in config
+    target_host = find_host_by_hostname(hosts, hostname)
+    
+    if not target_host:
+        return jsonify({'success': False, 'message': 'Host not found in configuration'}), 404
+    
+    stats = get_docker_stats_manager().get(get_host_key(target_host))
+    if stats is None:
+        return jsonify({'success': False, 'message': 'Container stats are not being streamed for this host'}), 404
+    
+    records = stats.get_stats()
+    return jsonify({
+        'success': True,
+        'stream': stats.get_status(),
+        'summary': summarize_container_stats(records),
+        'containers': {record['id']: record for record in records}
+    })
+
+# Serialized /api/containers bodies and ETags by host, reused until the cached entry changes
+_container_responses = {}
+
+@app.route('/api/containers/<hostname>')
+def get_containers(hostname):
+    """Get a host's containers as compact JSON; unchanged lists are answered with 304"""
+    config = load_config()
+    hosts = config.get('hosts', [])
+    
+    # Find the host in config
+    target_host = find_host_by_hostname(hosts, hostname)
+    
+    if not target_host:
+        return jsonify({'success': False, 'message': 'Host not found in configuration'}), 404
+    
+    if not target_host.get('ssh_host'):
+        return jsonify({'success': False, 'message': 'No SSH host configured for this server'}), 400
+    
+    if not target_host.get('ssh_username'):
+        return jsonify({'success': False, 'message': 'No SSH username configured for this server'}), 400
+    
+    host_key = get_host_key(target_host)
+    entry = get_fleet_poller().get_or_collect(target_host, 'docker')
+    result = entry['value']
+    if not result['success']:
+        return jsonify(with_freshness(result, entry))
+    
+    cached = _container_responses.get(host_key)
+    if cached is None or cached[0] != entry['version']:
+        containers = [container_record(container) for container in parse_container_lines(result['output'])]
+        body = json.dumps({
+            'success': True,
+            'hostname': host_key,
+            'source': result.get('source', 'poll'),
+            'version': result.get('version'),
+            'counts': result['containers'],
+            'containers': containers
+        })
+        # The ETag leaves out collection times, so a re-poll that found no changes still matches
+        etag = hashlib.sha1(json.dumps([result.get('version'), containers]).encode()).hexdigest()
+        cached = _container_responses[host_key] = (entry['version'], body, etag)
+    
+    response = Response(cached[1], mimetype='application/json')
+    response.set_etag(cached[2], weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/api/docker-action/<hostname>', methods=['POST'])
 def docker_action(hostname):
-    """Perform Docker action (start/stop) on a container"""
+    """Perform Docker action (start/stop/restart) on a container"""
     try:
         data = request.get_json()
         container_id = data.get('container_id')
@@ -394,12 +886,15 @@ def docker_action(hostname):
         if not container_id or not action:
             return jsonify({'success': False, 'message': 'Missing container_id or action'}), 400
         
-        if action not in ['start', 'stop']:
-            return jsonify({'success': False, 'message': 'Invalid action. Must be start or stop'}), 400
+        if action not in DOCKER_ACTIONS:
+            return jsonify({'success': False, 'message': f"Invalid action. Must be one of: {', '.join(DOCKER_ACTIONS)}"}), 400
+        
+        if not is_valid_container_ref(container_id):
+            return jsonify({'success': False, 'message': 'Invalid container_id'}), 400
         
         config = load_config()
         hosts = config.get('hosts', [])
-        ssh_timeout = config.get('ssh_timeout', 10)
+        action_timeout = config.get('docker_action_timeout', 60)
         
         # Find the host in config
         target_host = find_host_by_hostname(hosts, hostname)
@@ -417,12 +912,129 @@ def docker_action(hostname):
         if not ssh_username:
             return jsonify({'success': False, 'message': 'No SSH username configured for this server'}), 400
         
-        result = docker_action_sync(ssh_host, ssh_username, ssh_password, container_id, action, ssh_timeout)
+        result = docker_action_sync(ssh_host, ssh_username, ssh_password, container_id, action, action_timeout)
+        
+        if result['success']:
+            refresh_container_state([(target_host, [container_id])])
+        
         return jsonify(result)
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Server error: {str(e)}'}), 500
 
+@app.route('/api/docker-bulk-action', methods=['POST'])
+def docker_bulk_action():
+    """Apply start/stop/restart to many containers across hosts with one docker command per host"""
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    targets = data.get('targets')
+    
+    if action not in DOCKER_ACTIONS:
+        return jsonify({'success': False, 'message': f"Invalid action. Must be one of: {', '.join(DOCKER_ACTIONS)}"}), 400
+    
+    if not targets or not isinstance(targets, list):
+        return jsonify({'success': False, 'message': 'Missing targets'}), 400
+    
+    config = load_config()
+    hosts = config.get('hosts', [])
+    
+    # Targets naming the same host are merged into one invocation
+    merged = {}
+    for target in targets:
+        hostname = target.get('hostname') if isinstance(target, dict) else None
+        target_host = find_host_by_hostname(hosts, hostname) if hostname else None
+        if not target_host:
+            return jsonify({'success': False, 'message': f'Host not found in configuration: {hostname}'}), 404
+        
+        if not target_host.get('ssh_host') or not target_host.get('ssh_username'):
+            return jsonify({'success': False, 'message': f'No SSH host or username configured for {hostname}'}), 400
+        
+        containers = target.get('containers') or []
+        labels = target.get('labels') or []
+        if not containers and not labels:
+            return jsonify({'success': False, 'message': f'No containers or labels given for {hostname}'}), 400
+        if not isinstance(containers, list) or not all(is_valid_container_ref(ref) for ref in containers):
+            return jsonify({'success': False, 'message': f'Invalid container list for {hostname}'}), 400
+        if not isinstance(labels, list) or not all(is_valid_label_selector(label) for label in labels):
+            return jsonify({'success': False, 'message': f'Invalid label selectors for {hostname}'}), 400
+        
+        _, host_containers, selectors = merged.setdefault(get_host_key(target_host), (target_host, [], []))
+        host_containers.extend(containers)
+        if labels:
+            selectors.append(labels)
+    
+    try:
+        result = run_async(bulk_docker_action(
+            action, list(merged.values()),
+            concurrency=config.get('fanout_concurrency', 20),
+            timeout=config.get('docker_action_timeout', 60)
+        ))
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Server error: {str(e)}'}), 500
+    
+    changed = []
+    for (target_host, _, _), host_result in zip(merged.values(), result['hosts']):
+        container_ids = [outcome['container'] for outcome in host_result['containers'] if outcome['success']]
+        if container_ids:
+            changed.append((target_host, container_ids))
+    refresh_container_state(changed)
+    
+    return jsonify(result)
+
+@app.route('/api/fanout', methods=['POST'])
+def api_fanout():
+    """Run an allow-listed command on several hosts and stream each result as NDJSON"""
+    data = request.get_json(silent=True) or {}
+    config = load_config()
+    hosts = config.get('hosts', [])
+    commands = get_fanout_commands(config)
+    
+    name = data.get('command')
+    if name not in commands:
+        return jsonify({'success': False, 'message': f"Unknown command. Must be one of: {', '.join(sorted(commands))}"}), 400
+    
+    # Default to every host; an explicit list is resolved like the per-host endpoints
+    requested = data.get('hosts')
+    if requested:
+        targets = [find_host_by_hostname(hosts, hostname) for hostname in requested]
+        unknown = [hostname for hostname, host in zip(requested, targets) if host is None]
+        if unknown:
+            return jsonify({'success': False, 'message': f"Hosts not found in configuration: {', '.join(unknown)}"}), 404
+    else:
+        targets = hosts
+    
+    # Callers may tighten the configured limits but not raise them
+    host_timeout = config.get('fanout_host_timeout', config.get('ssh_timeout', 10))
+    deadline = config.get('fanout_deadline', 60)
+    try:
+        host_timeout = min(host_timeout, float(data.get('timeout', host_timeout)))
+        deadline = min(deadline, float(data.get('deadline', deadline)))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'timeout and deadline must be numbers'}), 400
+    
+    def generate():
+        started = time.time()
+        statuses = {}
+        for result in stream_fanout(targets, commands[name],
+                                    concurrency=config.get('fanout_concurrency', 20),
+                                    host_timeout=host_timeout,
+                                    deadline=deadline):
+            statuses[result['status']] = statuses.get(result['status'], 0) + 1
+            yield json.dumps(result) + '\n'
+        yield json.dumps({
+            'done': True,
+            'command': name,
+            'hosts': len(targets),
+            'statuses': statuses,
+            'duration': round(time.time() - started, 3)
+        }) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/nvtop-terminal/<hostname>', methods=['POST'])
 def start_nvtop_terminal(hostname):
     """Start a ttyd nvtop terminal for the specified host"""
@@ -461,8 +1073,9 @@ def list_nvtop_terminals():
 
 @app.route('/api/nvtop-stop/<hostname>', methods=['POST'])
 def stop_nvtop_terminal(hostname):
-    """Stop nvtop terminal for a specific host"""
-    result = get_terminal_manager().stop_nvtop_terminal(hostname)
+    """Stop a host's nvtop terminals, or just the one given as session_id"""
+    data = request.get_json(silent=True) or {}
+    result = get_terminal_manager().stop_nvtop_terminal(hostname, data.get('session_id'))
     return jsonify(result)
 
 @app.route('/api/update', methods=['POST'])
@@ -524,5 +1137,8 @@ if __name__ == '__main__':
     config = load_config()
     port = config.get('port', 5010)
     
-    app.logger.info(f"Starting MyControl application on port {port}")
-    app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
+    # Exit normally on SIGTERM so the atexit shutdown runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    app.logger.info(f"Starting MyControl development server on port {port}; use gunicorn -c gunicorn.conf.py wsgi:application in production")
+    app.run(debug=False, host='0.0.0.0', port=port, threaded=True)
\ No newline at end of file
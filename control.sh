@@ -59,6 +59,15 @@ stop_app() {
         PID=$(cat "$PID_FILE")
         log "Stopping MyControl (PID: $PID)..."
         kill "$PID"
+        # Wait for in-flight requests and background services to shut down
+        for _ in $(seq 1 30); do
+            ps -p "$PID" > /dev/null 2>&1 || break
+            sleep 1
+        done
+        if ps -p "$PID" > /dev/null 2>&1; then
+            warn "MyControl did not exit in time, killing it"
+            kill -9 "$PID" 2>/dev/null || true
+        fi
         rm -f "$PID_FILE"
         log "MyControl stopped"
     else
@@ -104,10 +113,10 @@ start_app() {
     log "Generating version information..."
     python -c "from libs.version import refresh_version, write_version_file; refresh_version(); write_version_file()" 2>/dev/null || true
     
-    # Start the application in background
-    log "Starting Flask application on port $PORT..."
+    # Start the application in background under gunicorn (see gunicorn.conf.py)
+    log "Starting MyControl on port $PORT..."
     cd "$SCRIPT_DIR"
-    nohup python app.py >> "$LOG_FILE" 2>&1 &
+    nohup gunicorn -c gunicorn.conf.py wsgi:application >> "$LOG_FILE" 2>&1 &
     APP_PID=$!
     
     # Save PID
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+"""
+gunicorn settings for MyControl.
+
+The fleet poller, SSH pool, event streams and terminals live in the
+application process, so exactly one worker runs. It is a gevent worker:
+each connection is served by a greenlet, and handlers waiting on futures
+from the shared event loop or on state changes yield to the others. Open
+live streams (/api/stream) and terminal WebSockets each hold a greenlet
+rather than an OS thread, so they do not starve ordinary requests.
+"""
+
+import signal
+from libs.config_utils import load_config
+
+_config = load_config()
+
+bind = f"0.0.0.0:{_config.get('port', 5010)}"
+
+# One worker process: application state is per-process and must not be duplicated
+workers = 1
+worker_class = 'gevent'
+worker_connections = _config.get('server_connections', 1000)
+
+# Don't import the app in the master; its background threads would not survive the fork
+preload_app = False
+
+timeout = 60
+graceful_timeout = 15
+keepalive = 5
+
+# gunicorn's own messages go to stderr, which control.sh appends to the application log
+accesslog = None
+errorlog = '-'
+
+def post_worker_init(worker):
+    """End live streams as soon as the worker is told to stop, so the graceful shutdown only waits for real requests"""
+    import gevent
+    from app import stop_live_streams
+    handle_exit = worker.handle_exit
+
+    def on_exit(sig, frame):
+        # Signal handlers must not block, so the streams are closed from a greenlet
+        gevent.spawn(stop_live_streams)
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, on_exit)
+    # Installing a handler makes the signal interrupt system calls again; gunicorn turns that off
+    signal.siginterrupt(signal.SIGTERM, False)
+
+def worker_exit(server, worker):
+    """Stop pollers, streams and terminals once in-flight requests have finished"""
+    from app import shutdown_background_services
+    shutdown_background_services()
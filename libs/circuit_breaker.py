@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import random
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of contacting a target whose circuit is open"""
+
+    def __init__(self, channel, target, retry_in):
+        self.channel = channel
+        self.target = target
+        self.retry_in = retry_in
+        super().__init__(f'{target} is unreachable over {channel}, retrying in {retry_in:.0f}s')
+
+class CircuitBreaker:
+    """
+    Tracks whether one target is reachable over one channel.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail immediately. Once the backoff expires, a single half-open
+    probe is let through: success closes the circuit, failure reopens it
+    with double the backoff (up to `max_backoff`). Backoffs are jittered so
+    the probes for hosts that failed together are spread out.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, channel, target, failure_threshold=3, base_backoff=5, max_backoff=300):
+        self.channel = channel
+        self.target = target
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.retry_at = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """Check whether calls are being refused right now, without claiming the half-open probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            return self.state == self.HALF_OPEN or time.monotonic() < self.retry_at
+
+    def retry_in(self):
+        """Seconds until the next half-open probe is allowed"""
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def allow(self):
+        """Check whether a call may go ahead; an expired open circuit lets exactly one probe through"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.retry_at:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def check(self):
+        """Like allow(), but raise CircuitOpenError when the call is refused"""
+        if not self.allow():
+            raise CircuitOpenError(self.channel, self.target, self.retry_in())
+
+    def record_success(self):
+        """The target answered; close the circuit"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.target} is reachable over {self.channel} again, closing circuit")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened = 0
+            self.last_error = None
+
+    def record_failure(self, error=None):
+        """The target did not answer; open the circuit once failures reach the threshold"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error is not None else None
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** self.opened)
+                # Equal jitter: wait between half and all of the backoff
+                backoff = random.uniform(backoff / 2, backoff)
+                self.opened += 1
+                self.retry_at = time.monotonic() + backoff
+                if self.state != self.OPEN:
+                    logger.warning(f"{self.target} is unreachable over {self.channel} ({self.last_error}), "
+                                   f"failing fast for {backoff:.0f}s")
+                self.state = self.OPEN
+
+    def record_abandoned(self):
+        """A call ended without telling us anything (e.g. cancelled); free the half-open probe"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.retry_at = time.monotonic()
+
+    def get_status(self):
+        """Describe the circuit for API responses and metrics"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in': round(max(0.0, self.retry_at - time.monotonic()), 1) if self.state != self.CLOSED else 0,
+                'last_error': self.last_error
+            }
+
+class HostHealth:
+    """
+    Circuit breakers for every (channel, target) pair that has been contacted.
+
+    Channels ('ssh', 'ipmi', 'icmp') are tracked separately, since a dead
+    BMC says nothing about whether the host's SSH daemon answers.
+    `channel_max_backoff` caps the backoff of individual channels below
+    `max_backoff`; pings are cheap, so a recovered host shows up quickly.
+    """
+
+    def __init__(self, failure_threshold=3, base_backoff=5, max_backoff=300, channel_max_backoff=None):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.channel_max_backoff = dict(channel_max_backoff if channel_max_backoff is not None else {'icmp': 30})
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _max_backoff(self, channel):
+        """Get the backoff cap for a channel"""
+        return min(self.max_backoff, self.channel_max_backoff.get(channel, self.max_backoff))
+
+    def configure(self, failure_threshold=None, base_backoff=None, max_backoff=None, channel_max_backoff=None):
+        """Update breaker settings; existing breakers pick them up immediately"""
+        with self._lock:
+            if failure_threshold is not None:
+                self.failure_threshold = max(1, int(failure_threshold))
+            if base_backoff is not None:
+                self.base_backoff = base_backoff
+            if max_backoff is not None:
+                self.max_backoff = max_backoff
+            if channel_max_backoff is not None:
+                self.channel_max_backoff.update(channel_max_backoff)
+            for (channel, _), breaker in self._breakers.items():
+                breaker.failure_threshold = self.failure_threshold
+                breaker.base_backoff = self.base_backoff
+                breaker.max_backoff = self._max_backoff(channel)
+
+    def breaker(self, channel, target):
+        """Get the breaker for a target over a channel, creating it on first use"""
+        key = (channel, target)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(key, CircuitBreaker(
+                    channel, target, self.failure_threshold, self.base_backoff, self._max_backoff(channel)))
+        return breaker
+
+    def is_open(self, channel, target):
+        """Check whether calls to a target over a channel are currently refused"""
+        breaker = self._breakers.get((channel, target))
+        return breaker is not None and breaker.is_open()
+
+    def get_stats(self):
+        """Get the status of every breaker, keyed by (channel, target)"""
+        return {key: breaker.get_status() for key, breaker in list(self._breakers.items())}
+
+# Global instance shared by the SSH pool, IPMI sessions and reachability prober
+_host_health = HostHealth()
+
+def get_host_health():
+    """Get the shared host health tracker"""
+    return _host_health
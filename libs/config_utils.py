@@ -2,30 +2,130 @@
 
 import json
 import logging
+import os
+import signal
 import socket
+import threading
+import time
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-def load_config():
-    """Load configuration from config.json"""
-    config_path = Path(__file__).parent.parent / 'config.json'
+class ConfigSnapshot:
+    """An immutable view of one parsed config.json and its host index"""
+
+    def __init__(self, config, signature=None):
+        self.config = config
+        self.signature = signature
+        self.host_index = build_host_index(config.get('hosts', []))
+
+def build_host_index(hosts):
+    """
+    Index host configurations by ipmi_host, ssh_host and name.
+    
+    Addresses are indexed host by host, so the first host whose ipmi_host
+    or ssh_host matches wins, as with a linear scan of the host list.
+    Display names only match keys that are no host's address.
+    """
+    index = {}
+    for host in hosts:
+        for field in ('ipmi_host', 'ssh_host'):
+            key = host.get(field)
+            if key and key not in index:
+                index[key] = host
+    for host in hosts:
+        key = host.get('name')
+        if key and key not in index:
+            index[key] = host
+    return index
+
+class ConfigManager:
+    """Caches config.json and reparses it only when the file changes"""
+
+    def __init__(self, config_path, check_interval=1.0):
+        self.config_path = Path(config_path)
+        self.check_interval = check_interval
+        self._snapshot = ConfigSnapshot({})
+        self._last_check = None
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        """Identify the current file contents by inode, size and modification time"""
+        try:
+            stat = os.stat(self.config_path)
+            return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def get_snapshot(self):
+        """Get the current config snapshot, reloading if the file has changed"""
+        now = time.monotonic()
+        if self._last_check is None or now - self._last_check >= self.check_interval:
+            with self._lock:
+                if self._last_check is None or now - self._last_check >= self.check_interval:
+                    self._last_check = now
+                    if self._file_signature() != self._snapshot.signature:
+                        self._reload()
+        return self._snapshot
+
+    def reload(self):
+        """Force the config to be reparsed, e.g. on SIGHUP"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            self._reload()
+        return self._snapshot
+
+    def _reload(self):
+        """Parse config.json and atomically swap in the new snapshot"""
+        signature = self._file_signature()
+        try:
+            with open(self.config_path, 'r') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            logger.error(f"Config file not found: {self.config_path}")
+            self._snapshot = ConfigSnapshot({}, signature)
+            return
+        except json.JSONDecodeError:
+            # Keep serving the last good config rather than an empty one
+            logger.error(f"Invalid JSON in config file: {self.config_path}")
+            self._snapshot = ConfigSnapshot(self._snapshot.config, signature)
+            return
+        
+        self._snapshot = ConfigSnapshot(config, signature)
+        logger.info(f"Loaded configuration from {self.config_path}")
+
+# Global instance for the application's config.json
+_config_manager = ConfigManager(Path(__file__).parent.parent / 'config.json')
+
+def get_config_manager():
+    """Get the shared config manager"""
+    return _config_manager
+
+def install_reload_signal_handler():
+    """Reload config.json on SIGHUP; only possible from the main thread"""
     try:
-        with open(config_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error(f"Config file not found: {config_path}")
-        return {}
-    except json.JSONDecodeError:
-        logger.error(f"Invalid JSON in config file: {config_path}")
-        return {}
+        signal.signal(signal.SIGHUP, lambda signum, frame: _config_manager.reload())
+        return True
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Could not install SIGHUP config reload handler: {e}")
+        return False
+
+def load_config():
+    """Load configuration from config.json (cached until the file changes)"""
+    return _config_manager.get_snapshot().config
 
 def find_host_by_hostname(hosts, hostname):
-    """Find a host configuration by hostname (IPMI or SSH)"""
-    for host in hosts:
-        if host.get('ipmi_host') == hostname or host.get('ssh_host') == hostname:
-            return host
-    return None
+    """Find a host configuration by hostname (IPMI host, SSH host or name)"""
+    snapshot = _config_manager.get_snapshot()
+    if hosts is snapshot.config.get('hosts'):
+        return snapshot.host_index.get(hostname)
+    
+    # Host list from somewhere other than the current snapshot, scan it
+    return build_host_index(hosts).get(hostname)
+
+def get_host_key(host):
+    """Get the identifier used for a host in URLs and caches (IPMI host, else SSH host)"""
+    return host.get('ipmi_host') or host.get('ssh_host')
 
 def get_local_hostname(config):
     """Get the local hostname for terminal URLs, with fallback to FQDN then hostname"""
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import contextvars
+import time
+import logging
+from libs.instrumentation import SSH_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# Deadline of the request being served, if any. Set in the web worker thread,
+# carried onto the shared event loop by run_async(), and inherited from there
+# by every task the request's coroutine starts.
+_current_deadline = contextvars.ContextVar('mycontrol_deadline', default=None)
+
+class Deadline:
+    """An absolute point in time by which a whole operation must finish"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.expires = time.monotonic() + timeout
+
+    def remaining(self):
+        """Seconds left before the deadline, never negative"""
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        """Check whether the deadline has passed"""
+        return time.monotonic() >= self.expires
+
+def current_deadline():
+    """Get the deadline of the operation being run, or None if it has none"""
+    return _current_deadline.get()
+
+def set_deadline(deadline):
+    """Make `deadline` current in this context; None clears it"""
+    _current_deadline.set(deadline)
+
+def budget(limit=None):
+    """
+    Get the seconds an operation may take: its own limit, cut short by the current deadline.
+
+    Returns None only when there is neither a limit nor a deadline.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return limit
+    remaining = deadline.remaining()
+    return remaining if limit is None else min(limit, remaining)
+
+async def within(deadline, coro):
+    """Run a coroutine with `deadline` as its current deadline; None runs it without one"""
+    token = _current_deadline.set(deadline)
+    try:
+        return await coro
+    finally:
+        _current_deadline.reset(token)
+
+def record_timeout(stage, target, timeout):
+    """Log and count an SSH operation that ran out of time"""
+    deadline = _current_deadline.get()
+    # A budget cut short by the request deadline is reported as such
+    cause = 'request deadline' if deadline is not None and deadline.expired() else f'{stage} timeout'
+    logger.warning(f"SSH {stage} to {target} timed out after {timeout:.1f}s ({cause})")
+    SSH_TIMEOUTS.inc(stage=stage)
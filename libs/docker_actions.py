@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import re
+import shlex
+import logging
+from libs.config_utils import get_host_key
+from libs.fanout import fanout
+from libs.ssh_pool import get_ssh_pool
+
+logger = logging.getLogger(__name__)
+
+DOCKER_ACTIONS = ('start', 'stop', 'restart')
+
+# Printed before the action runs, followed by every container it will act on
+SELECTED_MARKER = '__mycontrol_selected__'
+
+# Container ids/names and label selectors (key or key=value) accepted from clients
+_CONTAINER_REF_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+_LABEL_SELECTOR_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.\-/]*(=[^\n]*)?$')
+
+def is_valid_container_ref(ref):
+    """Check whether a string looks like a container id or name"""
+    return isinstance(ref, str) and bool(_CONTAINER_REF_PATTERN.match(ref))
+
+def is_valid_label_selector(selector):
+    """Check whether a string is a label selector docker ps --filter label= accepts"""
+    return isinstance(selector, str) and bool(_LABEL_SELECTOR_PATTERN.match(selector))
+
+def build_bulk_action_command(action, containers=(), selectors=()):
+    """
+    Build one remote command that applies an action to many containers.
+
+    Each selector is a list of label filters that must all match. Selectors
+    are resolved on the host with docker ps, merged with the explicit
+    containers without duplicates, and echoed after SELECTED_MARKER so every
+    container can be given an outcome.
+    """
+    refs = [shlex.quote(ref) for ref in containers]
+    for labels in selectors:
+        filters = ' '.join(f'--filter {shlex.quote("label=" + label)}' for label in labels)
+        refs.append(f'$(docker ps -aq {filters})')
+    return (
+        f"set -- $(printf '%s\\n' {' '.join(refs)} | awk 'NF && !seen[$0]++'); "
+        f'echo {SELECTED_MARKER} "$@"; '
+        f'[ $# -eq 0 ] || docker {action} "$@"'
+    )
+
+def parse_bulk_action_output(stdout, stderr):
+    """
+    Get per-container outcomes from a bulk action's output.
+
+    docker prints each container it acted on to stdout, and one error line
+    per failed container to stderr.
+    """
+    selected = []
+    done = set()
+    for line in stdout.splitlines():
+        if line.startswith(SELECTED_MARKER):
+            selected = line[len(SELECTED_MARKER):].split()
+        elif line.strip():
+            done.add(line.strip())
+
+    errors = [line.strip() for line in stderr.splitlines() if line.strip()]
+    outcomes = []
+    for ref in selected:
+        if ref in done:
+            outcomes.append({'container': ref, 'success': True, 'message': 'OK'})
+        else:
+            mentioned = re.compile(rf'(?<![\w.-]){re.escape(ref)}(?![\w.-])')
+            message = next((error for error in errors if mentioned.search(error)), 'No result reported by docker')
+            outcomes.append({'container': ref, 'success': False, 'message': message})
+    return outcomes
+
+async def bulk_docker_action(action, targets, concurrency=20, timeout=60):
+    """
+    Apply a Docker action to containers on several hosts.
+
+    targets is a list of (host, containers, selectors) tuples, as taken by
+    build_bulk_action_command. Each host gets a single docker invocation, and
+    hosts run concurrently.
+    """
+    commands = {
+        get_host_key(host): build_bulk_action_command(action, containers, selectors)
+        for host, containers, selectors in targets
+    }
+    hosts = [host for host, _, _ in targets]
+
+    results = [None] * len(hosts)
+    async for result in fanout(hosts, lambda host: commands[get_host_key(host)],
+                               concurrency=concurrency, host_timeout=timeout, deadline=timeout + 5):
+        host_result = {
+            'hostname': result['hostname'],
+            'name': result['name'],
+            'containers': []
+        }
+        if result['status'] in ('ok', 'failed'):
+            host_result['containers'] = parse_bulk_action_output(result['stdout'], result['stderr'])
+            failed = sum(1 for outcome in host_result['containers'] if not outcome['success'])
+            if not host_result['containers']:
+                host_result.update(success=False, message='No containers matched')
+            elif failed:
+                host_result.update(success=False, message=f'{failed} of {len(host_result["containers"])} containers failed')
+            else:
+                host_result.update(success=True, message=f'docker {action} succeeded for {len(host_result["containers"])} containers')
+        else:
+            host_result.update(success=False, message=result['message'])
+        results[result['index']] = host_result
+        # docker ps results shared from before the action are out of date
+        get_ssh_pool().invalidate_shared(hosts[result['index']].get('ssh_host'))
+
+    succeeded = sum(1 for host_result in results for outcome in host_result['containers'] if outcome['success'])
+    failed = sum(1 for host_result in results for outcome in host_result['containers'] if not outcome['success'])
+    logger.info(f"Bulk docker {action} on {len(hosts)} hosts: {succeeded} containers succeeded, {failed} failed")
+    return {
+        'success': all(host_result['success'] for host_result in results),
+        'action': action,
+        'hosts': results,
+        'summary': {'succeeded': succeeded, 'failed': failed}
+    }
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+
+import asyncio
+import itertools
+import json
+import shlex
+import threading
+import logging
+from libs.gpu_management import parse_container_lines, count_containers
+from libs.remote_stream import RemoteStream
+from libs.ssh_pool import get_ssh_pool
+
+logger = logging.getLogger(__name__)
+
+# Printed by the stream command between the docker ps seed and the event feed
+SEED_MARKER = '__mycontrol_docker_seeded__'
+
+# Container event actions that change what docker ps would show; others are ignored
+_TRACKED_ACTIONS = {'create', 'start', 'restart', 'die', 'pause', 'unpause', 'destroy', 'rename', 'update'}
+
+# Actions fully described by the event itself; the rest are re-read with a targeted docker ps
+_STATE_ONLY_ACTIONS = {'die', 'pause', 'destroy'}
+
+# Versions are drawn from one sequence shared by all trackers, so a version
+# handed out by a replaced tracker can never be mistaken for one of its successor's
+_versions = itertools.count(1)
+
+# Removed container ids remembered for delta readers before they must reload everything
+MAX_TOMBSTONES = 1000
+
+def build_docker_events_command():
+    """
+    Build the stream command: seed with docker ps, then follow docker events.
+
+    Events are replayed from just before the seed, so nothing that happens
+    while docker ps runs is missed.
+    """
+    return (
+        'since=$(date +%s); '
+        "docker ps -a --no-trunc --format '{{json .}}' && "
+        f'echo {SEED_MARKER} && '
+        "exec docker events --since \"$since\" --filter type=container --format '{{json .}}'"
+    )
+
+def build_docker_ps_command(container_ids):
+    """Build a docker ps command limited to the given container ids or id prefixes"""
+    filters = ' '.join(f'--filter id={shlex.quote(container_id)}' for container_id in sorted(container_ids))
+    return f"docker ps -a --no-trunc {filters} --format '{{{{json .}}}}'"
+
+def _patch_container(container, action, attributes):
+    """Apply what an event tells us to a container record"""
+    container = dict(container)
+    if action == 'create':
+        container.update(State='created', Status='Created')
+    elif action in ('start', 'restart', 'unpause'):
+        container.update(State='running', Status='Up Less than a second')
+    elif action == 'die':
+        container.update(State='exited', Status=f"Exited ({attributes.get('exitCode', '0')}) Less than a second ago", Ports='')
+    elif action == 'pause':
+        status = container.get('Status', '')
+        container.update(State='paused', Status=status if status.endswith('(Paused)') else f'{status} (Paused)')
+    elif action == 'rename' and attributes.get('name'):
+        container['Names'] = attributes['name']
+    return container
+
+class DockerStateTracker:
+    """
+    Container list for one host, kept current from a `docker events` stream.
+
+    The stream seeds the list with docker ps each time it (re)connects. Every
+    change bumps `version`, so readers can ask for just the containers
+    changed or removed since a version they have already seen. Events are
+    applied on the shared event loop; readers may call from any thread.
+    """
+
+    def __init__(self, ssh_host, ssh_username, ssh_password, on_change=None, refresh_delay=0.5):
+        self.on_change = on_change
+        self.refresh_delay = refresh_delay
+        self.version = 0
+        self.seeded = False
+        self._containers = {}
+        self._changed = {}
+        self._removed = {}
+        # Deltas are only complete for readers at or after this version
+        self._delta_floor = 0
+        self._seed = None
+        self._refresh_ids = set()
+        self._refresh_task = None
+        self._lock = threading.Lock()
+        self.stream = RemoteStream(
+            ssh_host, ssh_username, ssh_password,
+            build_docker_events_command(),
+            self._on_line,
+            name=f'Docker event stream for {ssh_host}',
+            on_start=self._on_start
+        )
+
+    def _on_start(self):
+        """Start collecting a fresh seed when the stream (re)connects"""
+        self.seeded = False
+        self._seed = []
+
+    def _on_line(self, line):
+        """Handle one line of seed or event output"""
+        if self._seed is not None:
+            if line == SEED_MARKER:
+                self._apply_seed(parse_container_lines('\n'.join(self._seed)))
+                self._seed = None
+            else:
+                self._seed.append(line)
+            return
+
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        self._apply_event(event)
+
+    def _apply_seed(self, containers):
+        """Replace the whole container list; readers of older versions must reload"""
+        with self._lock:
+            self.version = next(_versions)
+            self._containers = {container['ID']: container for container in containers if container.get('ID')}
+            self._changed = dict.fromkeys(self._containers, self.version)
+            self._removed.clear()
+            self._delta_floor = self.version
+            self.seeded = True
+        logger.info(f"Seeded {len(containers)} containers from {self.stream.ssh_host}")
+        self._notify()
+
+    def _set(self, container):
+        """Store a changed container; caller holds the lock"""
+        self.version = next(_versions)
+        self._containers[container['ID']] = container
+        self._changed[container['ID']] = self.version
+        self._removed.pop(container['ID'], None)
+
+    def _remove(self, container_id):
+        """Forget a container and leave a tombstone for delta readers; caller holds the lock"""
+        if self._containers.pop(container_id, None) is None:
+            return
+        self.version = next(_versions)
+        self._changed.pop(container_id, None)
+        self._removed[container_id] = self.version
+        if len(self._removed) > MAX_TOMBSTONES:
+            oldest = next(iter(self._removed))
+            self._delta_floor = self._removed.pop(oldest)
+
+    def _apply_event(self, event):
+        """Update the container list from one docker event"""
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        actor = event.get('Actor') or {}
+        container_id = event.get('id') or actor.get('ID')
+        if action not in _TRACKED_ACTIONS or not container_id:
+            return
+
+        attributes = actor.get('Attributes') or {}
+        with self._lock:
+            if action == 'destroy':
+                self._remove(container_id)
+            else:
+                container = self._containers.get(container_id) or {
+                    'ID': container_id,
+                    'Names': attributes.get('name', ''),
+                    'Image': attributes.get('image', event.get('from', '')),
+                    'Ports': ''
+                }
+                self._set(_patch_container(container, action, attributes))
+
+        if action not in _STATE_ONLY_ACTIONS:
+            self._schedule_refresh(container_id)
+        self._notify()
+
+    def _schedule_refresh(self, container_id):
+        """Re-read a container with docker ps, batching bursts of events into one command"""
+        self._refresh_ids.add(container_id)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh_pending())
+
+    async def _refresh_pending(self):
+        """Refresh queued containers until no more are queued"""
+        while self._refresh_ids:
+            await asyncio.sleep(self.refresh_delay)
+            container_ids, self._refresh_ids = self._refresh_ids, set()
+            try:
+                result = await self.refresh(container_ids)
+            except Exception as e:
+                result = {'success': False, 'message': str(e)}
+            if not result['success']:
+                logger.warning(f"Error refreshing containers on {self.stream.ssh_host}: {result['message']}")
+
+    async def refresh(self, container_ids, timeout=15):
+        """
+        Re-read the given containers (full ids or id prefixes) with docker ps.
+
+        Containers that no longer exist are removed. SSH errors propagate.
+        """
+        stream = self.stream
+        started_version = self.version
+        result = await get_ssh_pool().run(
+            stream.ssh_host, stream.ssh_username, stream.ssh_password,
+            build_docker_ps_command(container_ids),
+            timeout=timeout
+        )
+        if result.exit_status != 0:
+            return {'success': False, 'message': f"Command failed: {result.stderr or 'docker ps command failed'}"}
+
+        found = parse_container_lines(result.stdout)
+        # Containers touched by an event while docker ps ran may be newer than its output
+        overtaken = set()
+        with self._lock:
+            for container in found:
+                container_id = container.get('ID')
+                if not container_id:
+                    continue
+                if self._changed.get(container_id, 0) > started_version:
+                    overtaken.add(container_id)
+                elif container != self._containers.get(container_id):
+                    self._set(container)
+            for requested in container_ids:
+                if not any(container.get('ID', '').startswith(requested) for container in found):
+                    for container_id in [key for key in self._containers if key.startswith(requested)]:
+                        if self._changed.get(container_id, 0) > started_version:
+                            overtaken.add(container_id)
+                        else:
+                            self._remove(container_id)
+        for container_id in overtaken:
+            self._schedule_refresh(container_id)
+        self._notify()
+        return {'success': True, 'message': f'Refreshed {len(found)} containers'}
+
+    def _notify(self):
+        """Tell the owner that the container list changed"""
+        if self.on_change is not None:
+            self.on_change()
+
+    def is_synced(self):
+        """Check whether the list is seeded and events are flowing"""
+        return self.seeded and self.stream.connected
+
+    def get_snapshot(self):
+        """Get the current version and every container"""
+        with self._lock:
+            return {'version': self.version, 'containers': list(self._containers.values())}
+
+    def get_changes(self, since=None):
+        """
+        Get containers changed and ids removed after version `since`.
+
+        When `since` is missing or too old for the retained changes, the whole
+        list is returned with `reset` set.
+        """
+        with self._lock:
+            if since is None or since < self._delta_floor or since > self.version:
+                return {'version': self.version, 'reset': True, 'containers': list(self._containers.values()), 'removed': []}
+            return {
+                'version': self.version,
+                'reset': False,
+                'containers': [container for container_id, container in self._containers.items()
+                               if self._changed.get(container_id, 0) > since],
+                'removed': [container_id for container_id, version in self._removed.items() if version > since]
+            }
+
+    def get_result(self):
+        """Build a docker collector result from memory"""
+        snapshot = self.get_snapshot()
+        containers = snapshot['containers']
+        return {
+            'success': True,
+            'output': '\n'.join(json.dumps(container) for container in containers),
+            'containers': count_containers(containers),
+            'version': snapshot['version'],
+            'source': 'events'
+        }
+
+    def stop(self):
+        """Stop the event stream and any pending refresh"""
+        self.stream.stop()
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+
+class DockerStateManager:
+    """Keeps one Docker event tracker running per host; runs on the shared event loop"""
+
+    def __init__(self, on_change=None, publish_delay=0.25):
+        self._trackers = {}
+        self._publish_pending = set()
+        # Called with (host_key, tracker) at most once per publish_delay while changes arrive
+        self.on_change = on_change
+        self.publish_delay = publish_delay
+
+    def sync(self, targets):
+        """
+        Track exactly the given hosts.
+
+        targets maps host keys to (ssh_host, ssh_username, ssh_password).
+        Trackers are restarted when a host's credentials change.
+        """
+        for host_key in list(self._trackers):
+            tracker = self._trackers[host_key]
+            stream = tracker.stream
+            if targets.get(host_key) != (stream.ssh_host, stream.ssh_username, stream.ssh_password):
+                tracker.stop()
+                del self._trackers[host_key]
+
+        for host_key, (ssh_host, ssh_username, ssh_password) in targets.items():
+            if host_key not in self._trackers:
+                tracker = DockerStateTracker(ssh_host, ssh_username, ssh_password,
+                                             on_change=lambda key=host_key: self._tracker_changed(key))
+                tracker.stream.start()
+                self._trackers[host_key] = tracker
+
+    def _tracker_changed(self, host_key):
+        """Coalesce a burst of changes into one publish"""
+        if host_key in self._publish_pending:
+            return
+        self._publish_pending.add(host_key)
+        asyncio.get_running_loop().call_later(self.publish_delay, self._publish, host_key)
+
+    def _publish(self, host_key):
+        """Forward a tracker's changes to the on_change hook"""
+        self._publish_pending.discard(host_key)
+        tracker = self._trackers.get(host_key)
+        if tracker is not None and self.on_change is not None:
+            self.on_change(host_key, tracker)
+
+    def get(self, host_key):
+        """Get the tracker for a host, or None if it is not tracked"""
+        return self._trackers.get(host_key)
+
+    def stop_all(self):
+        """Stop every tracker"""
+        for tracker in self._trackers.values():
+            tracker.stop()
+        self._trackers.clear()
+
+# Global instance fed by the fleet poller
+_docker_state_manager = DockerStateManager()
+
+def get_docker_state_manager():
+    """Get the shared Docker state manager"""
+    return _docker_state_manager
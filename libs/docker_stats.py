@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import json
+import re
+import time
+import logging
+from libs.remote_stream import RemoteStream
+
+logger = logging.getLogger(__name__)
+
+DOCKER_STATS_COMMAND = "docker stats --format '{{json .}}'"
+
+# docker stats redraws the screen between refreshes, even when not on a terminal
+_ANSI_ESCAPE_PATTERN = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+_SIZE_PATTERN = re.compile(r'^\s*([\d.]+)\s*([A-Za-z]*)\s*$')
+_SIZE_UNITS = {
+    '': 1, 'b': 1,
+    'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3, 'tb': 1000 ** 4,
+    'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4
+}
+
+# Per-container numeric fields summed into the host aggregate
+_SUMMED_FIELDS = ('cpu_percent', 'memory_used', 'net_rx', 'net_tx', 'block_read', 'block_write', 'pids')
+
+def parse_size(text):
+    """Parse a docker size such as '12.5MiB' or '3kB' into bytes, or None"""
+    match = _SIZE_PATTERN.match(text or '')
+    if not match:
+        return None
+    multiplier = _SIZE_UNITS.get(match.group(2).lower())
+    if multiplier is None:
+        return None
+    return round(float(match.group(1)) * multiplier)
+
+def parse_size_pair(text):
+    """Parse a 'used / limit' or 'in / out' pair of docker sizes"""
+    parts = (text or '').split('/')
+    if len(parts) != 2:
+        return None, None
+    return parse_size(parts[0]), parse_size(parts[1])
+
+def parse_percent(text):
+    """Parse a docker percentage such as '12.50%', or None when unavailable"""
+    try:
+        return float((text or '').strip().rstrip('%'))
+    except ValueError:
+        return None
+
+def parse_stats_line(line):
+    """Parse one `docker stats --format '{{json .}}'` line into a stats record, or None"""
+    line = _ANSI_ESCAPE_PATTERN.sub('', line).strip()
+    if not line:
+        return None
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not data.get('ID'):
+        return None
+
+    memory_used, memory_limit = parse_size_pair(data.get('MemUsage'))
+    net_rx, net_tx = parse_size_pair(data.get('NetIO'))
+    block_read, block_write = parse_size_pair(data.get('BlockIO'))
+    try:
+        pids = int(data.get('PIDs'))
+    except (TypeError, ValueError):
+        pids = None
+    return {
+        'id': data['ID'][:12],
+        'name': data.get('Name', ''),
+        'cpu_percent': parse_percent(data.get('CPUPerc')),
+        'memory_used': memory_used,
+        'memory_limit': memory_limit,
+        'memory_percent': parse_percent(data.get('MemPerc')),
+        'net_rx': net_rx,
+        'net_tx': net_tx,
+        'block_read': block_read,
+        'block_write': block_write,
+        'pids': pids
+    }
+
+def summarize_container_stats(records):
+    """Sum per-container stats into a host aggregate"""
+    summary = {'containers': len(records)}
+    for field in _SUMMED_FIELDS:
+        values = [record[field] for record in records if record.get(field) is not None]
+        summary[field] = round(sum(values), 2) if values else None
+    return summary
+
+class ContainerStats:
+    """
+    Streams `docker stats` from one host and keeps the latest figures per container.
+
+    docker stats refreshes every running container about once a second over
+    a single SSH channel. Containers that stop drop out after `stale_after`
+    seconds without an update.
+    """
+
+    def __init__(self, ssh_host, ssh_username, ssh_password, stale_after=10):
+        self.stale_after = stale_after
+        self._latest = {}
+        self._last_prune = time.time()
+        self.stream = RemoteStream(
+            ssh_host, ssh_username, ssh_password,
+            DOCKER_STATS_COMMAND,
+            self._on_line,
+            name=f'Docker stats stream for {ssh_host}'
+        )
+
+    def _on_line(self, line):
+        """Store the figures from one stats line"""
+        record = parse_stats_line(line)
+        if record is None:
+            return
+        now = time.time()
+        record['timestamp'] = now
+        self._latest[record['id']] = record
+
+        # Stopped containers are no longer reported, so forget them once stale
+        if now - self._last_prune > self.stale_after:
+            self._last_prune = now
+            for container_id, latest in list(self._latest.items()):
+                if now - latest['timestamp'] > self.stale_after:
+                    del self._latest[container_id]
+
+    def get_stats(self):
+        """Get the latest stats for every container still being reported"""
+        cutoff = time.time() - self.stale_after
+        return [record for record in list(self._latest.values()) if record['timestamp'] >= cutoff]
+
+    def get_status(self):
+        """Describe the stream for API responses"""
+        return {
+            'connected': self.stream.connected,
+            'restarts': self.stream.restarts,
+            'last_error': self.stream.last_error
+        }
+
+class DockerStatsManager:
+    """Keeps one docker stats stream running per host; runs on the shared event loop"""
+
+    def __init__(self):
+        self._stats = {}
+
+    def sync(self, targets):
+        """
+        Stream stats from exactly the given hosts.
+
+        targets maps host keys to (ssh_host, ssh_username, ssh_password).
+        Streams are restarted when a host's credentials change.
+        """
+        for host_key in list(self._stats):
+            stream = self._stats[host_key].stream
+            if targets.get(host_key) != (stream.ssh_host, stream.ssh_username, stream.ssh_password):
+                stream.stop()
+                del self._stats[host_key]
+
+        for host_key, (ssh_host, ssh_username, ssh_password) in targets.items():
+            if host_key not in self._stats:
+                stats = ContainerStats(ssh_host, ssh_username, ssh_password)
+                stats.stream.start()
+                self._stats[host_key] = stats
+
+    def get(self, host_key):
+        """Get the stats stream for a host, or None if it is not streaming"""
+        return self._stats.get(host_key)
+
+    def stop_all(self):
+        """Stop every stream"""
+        for stats in self._stats.values():
+            stats.stream.stop()
+        self._stats.clear()
+
+# Global instance fed by the fleet poller
+_docker_stats_manager = DockerStatsManager()
+
+def get_docker_stats_manager():
+    """Get the shared docker stats manager"""
+    return _docker_stats_manager
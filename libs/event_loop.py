@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import logging
+from libs.deadlines import current_deadline, within
+
+logger = logging.getLogger(__name__)
+
+# Extra seconds run() waits past the caller's deadline, so the coroutine's own
+# deadline-bounded timeouts fire first and it can return a proper result
+DEADLINE_GRACE = 0.5
+
+class EventLoopService:
+    """Runs one long-lived asyncio event loop in a background thread"""
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the background event loop if it is not already running"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, name='event-loop', daemon=True)
+                self._thread.start()
+                logger.info("Background event loop started")
+        return self._loop
+
+    def _run(self):
+        """Thread target that runs the loop until stop() is called"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self):
+        """Get the running loop, starting it on first use"""
+        return self.start()
+
+    def is_loop_thread(self):
+        """Check whether the caller is running on the event loop thread"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the loop and block until it finishes.
+
+        A deadline current in the calling thread is carried onto the loop for
+        the coroutine, and also bounds how long the caller blocks.
+        """
+        if self.is_loop_thread():
+            raise RuntimeError('EventLoopService.run() cannot be called from the event loop thread')
+        deadline = current_deadline()
+        if deadline is not None:
+            coro = within(deadline, coro)
+            wait = deadline.remaining() + DEADLINE_GRACE
+            timeout = wait if timeout is None else min(timeout, wait)
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def call_soon(self, callback, *args):
+        """Schedule a plain callback on the loop from any thread"""
+        return self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout=5):
+        """Cancel outstanding tasks and stop the loop"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or loop.is_closed():
+                return
+
+            async def _cancel_tasks():
+                tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            try:
+                asyncio.run_coroutine_threadsafe(_cancel_tasks(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Error cancelling background tasks: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+            self._loop = None
+            self._thread = None
+            logger.info("Background event loop stopped")
+
+# Global instance owned by the application
+_event_loop_service = EventLoopService()
+
+def get_event_loop_service():
+    """Get the shared event loop service"""
+    return _event_loop_service
+
+def run_async(coro, timeout=None):
+    """Run a coroutine on the shared event loop from synchronous code"""
+    return _event_loop_service.run(coro, timeout)
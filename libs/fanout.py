@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import asyncio
+import asyncssh
+import queue
+import time
+import logging
+from libs.config_utils import get_host_key
+from libs.event_loop import get_event_loop_service
+from libs.ssh_pool import get_ssh_pool
+
+logger = logging.getLogger(__name__)
+
+# Commands that can be fanned out, by name; extended or overridden by `fanout_commands` in config
+DEFAULT_FANOUT_COMMANDS = {
+    'uptime': 'uptime',
+    'hostname': 'hostname',
+    'kernel': 'uname -a',
+    'disk': 'df -h',
+    'memory': 'free -m',
+    'nvidia-smi': 'nvidia-smi',
+    'docker-ps': "docker ps --format '{{.Names}}\\t{{.Image}}\\t{{.Status}}'"
+}
+
+# Per-stream output kept for each host; the rest is dropped and flagged as truncated
+MAX_OUTPUT = 64 * 1024
+
+def get_fanout_commands(config):
+    """Get the allow-listed fan-out commands by name"""
+    commands = dict(DEFAULT_FANOUT_COMMANDS)
+    commands.update(config.get('fanout_commands', {}))
+    return commands
+
+def _host_result(index, host, status, message, **fields):
+    """Build the result record for one host"""
+    result = {
+        'index': index,
+        'hostname': get_host_key(host),
+        'name': host.get('name', get_host_key(host)),
+        'success': status == 'ok',
+        'status': status,
+        'message': message
+    }
+    result.update(fields)
+    return result
+
+def _truncate(output):
+    """Cap command output at MAX_OUTPUT characters"""
+    output = output or ''
+    return (output[:MAX_OUTPUT], True) if len(output) > MAX_OUTPUT else (output, False)
+
+async def run_on_host(index, host, command, timeout):
+    """Run a command on one host within `timeout` seconds, covering connect and execution"""
+    ssh_host = host.get('ssh_host')
+    ssh_username = host.get('ssh_username')
+    ssh_password = host.get('ssh_password')
+
+    if not (ssh_host and ssh_username and ssh_password):
+        return _host_result(index, host, 'error', 'No SSH config', duration=0)
+
+    started = time.monotonic()
+    try:
+        process = await asyncio.wait_for(
+            get_ssh_pool().run(ssh_host, ssh_username, ssh_password, command, timeout=timeout),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        return _host_result(index, host, 'timeout', 'SSH timeout', duration=round(time.monotonic() - started, 3))
+    except asyncssh.Error as e:
+        return _host_result(index, host, 'error', f'SSH error: {str(e)}', duration=round(time.monotonic() - started, 3))
+    except Exception as e:
+        return _host_result(index, host, 'error', f'Error: {str(e)}', duration=round(time.monotonic() - started, 3))
+
+    stdout, stdout_truncated = _truncate(process.stdout)
+    stderr, stderr_truncated = _truncate(process.stderr)
+    exit_status = process.exit_status
+    return _host_result(
+        index, host,
+        'ok' if exit_status == 0 else 'failed',
+        'Command completed' if exit_status == 0 else f'Command exited with status {exit_status}',
+        exit_status=exit_status,
+        stdout=stdout,
+        stderr=stderr,
+        truncated=stdout_truncated or stderr_truncated,
+        duration=round(time.monotonic() - started, 3)
+    )
+
+async def fanout(hosts, command, concurrency=20, host_timeout=10, deadline=60):
+    """
+    Run a command on many hosts and yield each host's result as it completes.
+
+    `command` is a shell command, or a function that builds one for each host.
+
+    At most `concurrency` hosts run at once, each bounded by `host_timeout`.
+    Hosts still queued or running when `deadline` expires are cancelled and
+    reported with status "timeout". Results carry the host's position in
+    `hosts` as `index`, since they arrive in completion order.
+    """
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def bounded(index, host):
+        async with semaphore:
+            host_command = command(host) if callable(command) else command
+            return await run_on_host(index, host, host_command, host_timeout)
+
+    tasks = {asyncio.ensure_future(bounded(index, host)): index for index, host in enumerate(hosts)}
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+        if pending:
+            logger.warning(f"Fan-out hit its {deadline}s deadline with {len(pending)} hosts unfinished")
+        for task in pending:
+            task.cancel()
+            index = tasks[task]
+            yield _host_result(index, hosts[index], 'timeout', 'Fan-out deadline exceeded')
+    finally:
+        # Also reached when the consumer stops early
+        for task in tasks:
+            task.cancel()
+
+def stream_fanout(hosts, command, **options):
+    """
+    Run fanout() on the shared event loop and yield its results in this thread.
+
+    Closing the generator early (e.g. a client disconnect) cancels the
+    remaining hosts.
+    """
+    results = queue.Queue()
+
+    async def pump():
+        try:
+            async for result in fanout(hosts, command, **options):
+                results.put(result)
+        finally:
+            results.put(None)
+
+    future = get_event_loop_service().submit(pump())
+    try:
+        while True:
+            result = results.get()
+            if result is None:
+                break
+            yield result
+        future.result()
+    finally:
+        future.cancel()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+import asyncio
+import threading
+import time
+import logging
+from libs.config_utils import load_config, get_host_key
+from libs.event_loop import get_event_loop_service, run_async
+from libs.power_management import submit_power_check
+from libs.network_utils import get_prober
+from libs.ssh_utils import get_ssh_uptime, describe_uptime_error, parse_uptime
+from libs.gpu_management import get_gpu_info, get_gpu_metrics, get_docker_info, parse_container_lines, count_containers
+from libs.gpu_telemetry import get_gpu_telemetry_manager
+from libs.docker_state import get_docker_state_manager
+from libs.docker_stats import get_docker_stats_manager
+from libs.metrics_store import get_metrics_store, extract_samples, extract_gpu_samples
+from libs.instrumentation import PROBE_DURATION, PROBE_FAILURES
+from libs.circuit_breaker import get_host_health
+from libs.deadlines import budget, within
+
+logger = logging.getLogger(__name__)
+
+# Default poll interval in seconds for each metric; 0 disables polling for a metric
+DEFAULT_POLL_INTERVALS = {
+    'power': 30,
+    'ping': 10,
+    'uptime': 60,
+    'gpu': 0,
+    'gpu_metrics': 10,
+    'docker': 60
+}
+
+# Channel each metric is collected over; everything else goes over SSH
+METRIC_CHANNELS = {
+    'power': 'ipmi',
+    'ping': 'icmp'
+}
+
+def _circuit_target(host, metric):
+    """Get the (channel, address) a metric is collected from"""
+    channel = METRIC_CHANNELS.get(metric, 'ssh')
+    if channel == 'ipmi':
+        return channel, host.get('ipmi_host')
+    if channel == 'icmp':
+        return channel, host.get('ssh_host') or host.get('ipmi_host')
+    return channel, host.get('ssh_host')
+
+def _is_success(value):
+    """Check whether a collected value is a successful result"""
+    if isinstance(value, dict):
+        return bool(value.get('success'))
+    return value not in ('error', 'timeout', 'config_error')
+
+class FleetState:
+    """Thread-safe store of the latest snapshot of every metric for every host"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._hosts = {}
+        self.version = 0
+        self.closed = False
+
+    def update(self, host_key, metric, value):
+        """Record a new value for a host metric and return the stored entry"""
+        with self._lock:
+            self.version += 1
+            entry = {'value': value, 'updated': time.time(), 'version': self.version}
+            self._hosts.setdefault(host_key, {})[metric] = entry
+            self._changed.notify_all()
+            return entry
+
+    def wait_for_changes(self, since_version, timeout=None):
+        """
+        Block until an entry newer than since_version exists, timeout expires or the state is closed.
+
+        Returns the current version and the entries changed since since_version,
+        grouped by host. A since_version from a previous process (newer than the
+        current version) is treated as 0 so the caller receives everything.
+        """
+        with self._changed:
+            if since_version > self.version:
+                since_version = 0
+            self._changed.wait_for(lambda: self.closed or self.version > since_version, timeout)
+            changes = {}
+            for host_key, metrics in self._hosts.items():
+                changed = {metric: entry for metric, entry in metrics.items() if entry['version'] > since_version}
+                if changed:
+                    changes[host_key] = changed
+            return self.version, changes
+
+    def close(self):
+        """Wake every waiter for good; wait_for_changes returns at once from now on"""
+        with self._lock:
+            self.closed = True
+            self._changed.notify_all()
+
+    def get(self, host_key, metric):
+        """Get the latest entry for a host metric, or None if never collected"""
+        with self._lock:
+            return self._hosts.get(host_key, {}).get(metric)
+
+    def get_host(self, host_key):
+        """Get all metric entries for one host"""
+        with self._lock:
+            return dict(self._hosts.get(host_key, {}))
+
+    def snapshot(self):
+        """Get a copy of all metric entries for all hosts"""
+        with self._lock:
+            return {host_key: dict(metrics) for host_key, metrics in self._hosts.items()}
+
+    def prune(self, host_keys):
+        """Forget hosts that are no longer configured"""
+        with self._lock:
+            for host_key in list(self._hosts):
+                if host_key not in host_keys:
+                    del self._hosts[host_key]
+
+class FleetPoller:
+    """Polls every configured host on a per-metric schedule into a FleetState"""
+
+    def __init__(self, state=None, config_loader=load_config, tick=1.0, telemetry=None, history=None, docker=None, docker_stats=None):
+        self.state = state or FleetState()
+        self.telemetry = telemetry or get_gpu_telemetry_manager()
+        self.history = history or get_metrics_store()
+        self.telemetry.on_sample = self._record_gpu_sample
+        self.docker = docker or get_docker_state_manager()
+        self.docker.on_change = self._record_docker_change
+        self.docker_stats = docker_stats or get_docker_stats_manager()
+        self.config_loader = config_loader
+        self.tick = tick
+        self._config = {}
+        self._next_due = {}
+        self._running = {}
+        self._task = None
+
+    def start(self):
+        """Start the scheduler on the shared event loop"""
+        if self._task is None or self._task.done():
+            self._task = get_event_loop_service().submit(self._run())
+            logger.info("Fleet poller started")
+
+    def stop(self):
+        """Stop the scheduler; in-flight collections are cancelled with the loop"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            get_event_loop_service().call_soon(self.telemetry.stop_all)
+            get_event_loop_service().call_soon(self.docker.stop_all)
+            get_event_loop_service().call_soon(self.docker_stats.stop_all)
+            logger.info("Fleet poller stopped")
+
+    def is_running(self):
+        """Check whether the background scheduler is active"""
+        return self._task is not None and not self._task.done()
+
+    def get_intervals(self, config=None):
+        """Get the effective poll interval for each metric"""
+        config = config if config is not None else self._config
+        intervals = dict(DEFAULT_POLL_INTERVALS)
+        intervals.update(config.get('poll_intervals', {}))
+        return intervals
+
+    async def _run(self):
+        """Scheduler loop: start every collection whose interval has elapsed"""
+        while True:
+            try:
+                self._schedule(self.config_loader())
+            except Exception as e:
+                logger.error(f"Fleet poller scheduling error: {e}")
+            await asyncio.sleep(self.tick)
+
+    def _schedule(self, config):
+        """Start due collections for all hosts in the given config"""
+        self._config = config
+        intervals = self.get_intervals(config)
+        now = time.monotonic()
+        host_keys = set()
+
+        for host in config.get('hosts', []):
+            host_key = get_host_key(host)
+            if not host_key:
+                continue
+            host_keys.add(host_key)
+
+            for metric, interval in intervals.items():
+                if not interval or metric not in self._collectors():
+                    continue
+                if (host_key, metric) in self._running:
+                    continue
+                if now < self._next_due.get((host_key, metric), 0):
+                    continue
+                self._start_collection(host, metric, config)
+
+        self.state.prune(host_keys)
+        self.history.prune(host_keys)
+        self._sync_gpu_telemetry(config)
+        self._sync_docker_tracking(config)
+        self._sync_docker_stats(config)
+
+    def _stream_targets(self, config, metric, has_data=None):
+        """Get SSH targets for reachable hosts whose last collection of a metric succeeded"""
+        targets = {}
+        for host in config.get('hosts', []):
+            host_key = get_host_key(host)
+            ping = self.state.get(host_key, 'ping')
+            entry = self.state.get(host_key, metric)
+            if not (ping and ping['value'].get('status') == 'online'):
+                continue
+            if not (entry and entry['value'].get('success')):
+                continue
+            if has_data is not None and not has_data(entry['value']):
+                continue
+            targets[host_key] = (host['ssh_host'], host.get('ssh_username'), host.get('ssh_password'))
+        return targets
+
+    def _sync_gpu_telemetry(self, config):
+        """Stream GPU telemetry from reachable hosts whose last GPU query found GPUs"""
+        targets = {}
+        if config.get('gpu_telemetry_enabled', True):
+            targets = self._stream_targets(config, 'gpu_metrics', lambda value: value.get('gpus'))
+        self.telemetry.sync(
+            targets,
+            interval_ms=config.get('gpu_telemetry_interval_ms', 1000),
+            max_samples=config.get('gpu_telemetry_samples', 300)
+        )
+
+    def _sync_docker_tracking(self, config):
+        """Follow Docker events on reachable hosts where docker ps works"""
+        targets = {}
+        if config.get('docker_events_enabled', True):
+            targets = self._stream_targets(config, 'docker')
+        self.docker.sync(targets)
+
+    def _sync_docker_stats(self, config):
+        """Stream docker stats from reachable hosts with running containers"""
+        targets = {}
+        if config.get('docker_stats_enabled', True):
+            targets = self._stream_targets(config, 'docker', lambda value: value.get('containers', {}).get('running'))
+        self.docker_stats.sync(targets)
+
+    def _collectors(self):
+        """Map metric names to their collector coroutines"""
+        return {
+            'power': self._collect_power,
+            'ping': self._collect_ping,
+            'uptime': self._collect_uptime,
+            'gpu': self._collect_gpu,
+            'gpu_metrics': self._collect_gpu_metrics,
+            'docker': self._collect_docker
+        }
+
+    def _start_collection(self, host, metric, config):
+        """Start one collection task and track it until it finishes"""
+        key = (get_host_key(host), metric)
+        interval = self.get_intervals(config).get(metric) or 0
+        self._next_due[key] = time.monotonic() + interval
+
+        # Collections are shared, so they run to their own timeouts rather than the deadline of whoever started them
+        task = asyncio.ensure_future(within(None, self._collect(host, metric, config)))
+        self._running[key] = task
+
+        def _done(finished):
+            if self._running.get(key) is finished:
+                del self._running[key]
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _collect(self, host, metric, config):
+        """Run a collector and store its result; hosts with an open circuit keep their last entry"""
+        host_key = get_host_key(host)
+        previous = self.state.get(host_key, metric)
+        if previous is not None and get_host_health().is_open(*_circuit_target(host, metric)):
+            return previous
+        started = time.monotonic()
+        try:
+            value = await self._collectors()[metric](host, config)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error collecting {metric} for {host_key}: {e}")
+            value = {'success': False, 'message': f'Collector error: {str(e)}'}
+        PROBE_DURATION.observe(time.monotonic() - started, metric=metric)
+        if not _is_success(value):
+            PROBE_FAILURES.inc(metric=metric)
+        entry = self.state.update(host_key, metric, value)
+        self.history.record_many(host_key, extract_samples(metric, value), entry['updated'])
+        return entry
+
+    def _record_gpu_sample(self, host_key, sample):
+        """Add a streamed GPU telemetry sample to the history store"""
+        self.history.record_many(host_key, extract_gpu_samples(sample['gpus']), sample['timestamp'])
+
+    def _record_docker_change(self, host_key, tracker):
+        """Store the container list of a host after Docker events changed it"""
+        if tracker.is_synced():
+            value = tracker.get_result()
+            entry = self.state.update(host_key, 'docker', value)
+            self.history.record_many(host_key, extract_samples('docker', value), entry['updated'])
+
+    async def collect_now(self, host, metric, config=None):
+        """Collect a metric immediately, sharing any collection already in flight"""
+        config = config if config is not None else (self._config or self.config_loader())
+        task = self._running.get((get_host_key(host), metric))
+        if task is None:
+            task = self._start_collection(host, metric, config)
+        return await asyncio.shield(task)
+
+    def _is_usable(self, entry, metric):
+        """Check whether a cached entry can be served without collecting again"""
+        if entry is None:
+            return False
+        interval = self.get_intervals().get(metric) or 0
+        if interval and self.is_running():
+            return True
+        return time.time() - entry['updated'] <= interval
+
+    def get_or_collect(self, host, metric):
+        """
+        Get the cached entry for a host metric.
+
+        A live collection is only run on a cold cache, or when the metric is not
+        being polled and the cached entry is older than the metric's interval.
+        """
+        return self.get_or_collect_many([host], metric)[0]
+
+    def get_or_collect_many(self, hosts, metric):
+        """
+        Get cached entries for several hosts, collecting any missing ones concurrently.
+
+        Under a deadline, collections still running when it expires keep going
+        in the background; their hosts get their previous entry, or a failed
+        placeholder if they were never collected.
+        """
+        entries = [self.state.get(get_host_key(host), metric) for host in hosts]
+        missing = [index for index, entry in enumerate(entries) if not self._is_usable(entry, metric)]
+
+        if missing:
+            async def collect_missing():
+                tasks = [asyncio.ensure_future(self.collect_now(hosts[index], metric)) for index in missing]
+                done, pending = await asyncio.wait(tasks, timeout=budget())
+                for task in pending:
+                    task.cancel()
+                return [task.result() if task in done else None for task in tasks]
+
+            for index, entry in zip(missing, run_async(collect_missing())):
+                if entry is not None:
+                    entries[index] = entry
+                elif entries[index] is None:
+                    entries[index] = {
+                        'value': {'success': False, 'message': 'Timed out waiting for host'},
+                        'updated': time.time(),
+                        'version': 0
+                    }
+
+        return entries
+
+    def get_cached(self, host, metric):
+        """
+        Get the cached entry for a host metric without ever blocking.
+
+        Returns None while the metric has never been collected. Missing or stale
+        entries get a background collection started so a later read finds them.
+        """
+        entry = self.state.get(get_host_key(host), metric)
+        if not self._is_usable(entry, metric):
+            get_event_loop_service().submit(self.collect_now(host, metric))
+        return entry
+
+    def refresh(self, host, metric, wait=False):
+        """Collect a metric again ahead of schedule, optionally waiting for the result"""
+        if wait:
+            return run_async(self.collect_now(host, metric))
+        get_event_loop_service().call_soon(self._next_due.pop, (get_host_key(host), metric), None)
+        return None
+
+    async def _get_ping_status(self, host, config):
+        """Get the last known ping status, collecting it first if unknown"""
+        entry = self.state.get(get_host_key(host), 'ping')
+        if entry is None:
+            entry = await self.collect_now(host, 'ping', config)
+        return entry['value'].get('status')
+
+    async def _collect_power(self, host, config):
+        """Collect chassis power state via IPMI"""
+        future = submit_power_check(host, config.get('ipmitool_path', 'ipmitool'), config.get('ipmi_concurrency', 10))
+        if future is None:
+            return 'config_error'
+        return await asyncio.wrap_future(future)
+
+    async def _collect_ping(self, host, config):
+        """Collect network reachability"""
+        ping_target = host.get('ssh_host') or host.get('ipmi_host')
+        if not ping_target:
+            return {'success': False, 'status': 'error', 'message': 'No host address configured'}
+        return await get_prober().probe(ping_target, config.get('ping_timeout', 3))
+
+    async def _collect_uptime(self, host, config):
+        """Collect uptime via SSH for reachable hosts"""
+        ssh_host = host.get('ssh_host')
+        ssh_username = host.get('ssh_username')
+        ssh_password = host.get('ssh_password')
+
+        if not ssh_host or not ssh_username:
+            return {'success': False, 'uptime': 'No SSH config'}
+
+        if await self._get_ping_status(host, config) != 'online':
+            return {'success': False, 'uptime': 'Host unreachable'}
+
+        try:
+            uptime = await get_ssh_uptime(ssh_host, ssh_username, ssh_password, config.get('ssh_timeout', 10))
+        except Exception as e:
+            error = describe_uptime_error(e)
+            return {'success': False, 'uptime': error, 'message': error}
+        return dict({'success': True, 'uptime': uptime}, **parse_uptime(uptime))
+
+    async def _collect_ssh_command(self, host, config, collector):
+        """Run an SSH-backed collector for reachable hosts"""
+        ssh_host = host.get('ssh_host')
+        ssh_username = host.get('ssh_username')
+        ssh_password = host.get('ssh_password')
+
+        if not ssh_host:
+            return {'success': False, 'message': 'No SSH host configured for this server'}
+        if not ssh_username:
+            return {'success': False, 'message': 'No SSH username configured for this server'}
+
+        if await self._get_ping_status(host, config) != 'online':
+            return {'success': False, 'message': 'Host unreachable'}
+
+        return await collector(ssh_host, ssh_username, ssh_password, config.get('ssh_timeout', 10))
+
+    async def _collect_gpu(self, host, config):
+        """Collect nvidia-smi output"""
+        return await self._collect_ssh_command(host, config, get_gpu_info)
+
+    async def _collect_gpu_metrics(self, host, config):
+        """Collect parsed per-GPU metrics from nvidia-smi query mode"""
+        return await self._collect_ssh_command(host, config, get_gpu_metrics)
+
+    async def _collect_docker(self, host, config):
+        """Collect docker ps output along with running and total container counts"""
+        tracker = self.docker.get(get_host_key(host))
+        if tracker is not None and tracker.is_synced():
+            # Kept current by Docker events, no need to run docker ps
+            return tracker.get_result()
+        result = await self._collect_ssh_command(host, config, get_docker_info)
+        if result.get('success'):
+            result['containers'] = count_containers(parse_container_lines(result['output']))
+        return result
+
+# Global instance shared by all read endpoints
+_fleet_poller = FleetPoller()
+
+def get_fleet_poller():
+    """Get the shared fleet poller"""
+    return _fleet_poller
@@ -2,147 +2,255 @@
 
 import asyncio
 import asyncssh
+import json
 import logging
+from libs.ssh_pool import get_ssh_pool
+from libs.event_loop import run_async
 
 logger = logging.getLogger(__name__)
 
-def get_gpu_info_sync(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
+async def get_gpu_info(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
     """Get GPU information via SSH by running nvidia-smi"""
     try:
-        async def run_nvidia_smi():
-            try:
-                async with asyncssh.connect(
-                    ssh_host,
-                    username=ssh_username,
-                    password=ssh_password,
-                    known_hosts=None,
-                    client_keys=None
-                ) as conn:
-                    result = await asyncio.wait_for(
-                        conn.run('nvidia-smi', check=False),
-                        timeout=15
-                    )
-                    
-                    if result.exit_status == 0:
-                        return {'success': True, 'output': result.stdout}
-                    else:
-                        # Command failed, could be no nvidia-smi installed
-                        error_msg = result.stderr or 'nvidia-smi command failed'
-                        return {'success': False, 'message': f'Command failed: {error_msg}'}
-                        
-            except asyncio.TimeoutError:
-                return {'success': False, 'message': 'Command timed out'}
-            except asyncssh.Error as e:
-                return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
-            except Exception as e:
-                return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+        result = await get_ssh_pool().run_shared(
+            ssh_host, ssh_username, ssh_password,
+            'nvidia-smi',
+            timeout=ssh_timeout
+        )
         
-        # Run the async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(run_nvidia_smi())
-            return result
-        finally:
-            loop.close()
+        if result.exit_status == 0:
+            return {'success': True, 'output': result.stdout}
+        else:
+            # Command failed, could be no nvidia-smi installed
+            error_msg = result.stderr or 'nvidia-smi command failed'
+            return {'success': False, 'message': f'Command failed: {error_msg}'}
             
-    except ImportError:
-        return {'success': False, 'message': 'asyncssh module not available'}
+    except asyncio.TimeoutError as e:
+        return {'success': False, 'message': str(e) or 'Command timed out'}
+    except asyncssh.Error as e:
+        return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
     except Exception as e:
-        logger.error(f"Error getting GPU info for {ssh_host}: {e}")
-        return {'success': False, 'message': f'Server error: {str(e)}'}
+        return {'success': False, 'message': f'Unexpected error: {str(e)}'}
 
-def get_gpu_topo_info_sync(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
+async def get_gpu_topo_info(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
     """Get GPU topology information via SSH by running nvidia-smi topo -m"""
     try:
-        async def run_nvidia_smi_topo():
-            try:
-                async with asyncssh.connect(
-                    ssh_host,
-                    username=ssh_username,
-                    password=ssh_password,
-                    known_hosts=None,
-                    client_keys=None
-                ) as conn:
-                    result = await asyncio.wait_for(
-                        conn.run('nvidia-smi topo -m', check=False),
-                        timeout=15
-                    )
-                    
-                    if result.exit_status == 0:
-                        return {'success': True, 'output': result.stdout}
-                    else:
-                        # Command failed, could be no nvidia-smi installed or topo not supported
-                        error_msg = result.stderr or 'nvidia-smi topo -m command failed'
-                        return {'success': False, 'message': f'Command failed: {error_msg}'}
-                        
-            except asyncio.TimeoutError:
-                return {'success': False, 'message': 'Command timed out'}
-            except asyncssh.Error as e:
-                return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
-            except Exception as e:
-                return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+        result = await get_ssh_pool().run_shared(
+            ssh_host, ssh_username, ssh_password,
+            'nvidia-smi topo -m',
+            timeout=ssh_timeout
+        )
         
-        # Run the async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(run_nvidia_smi_topo())
-            return result
-        finally:
-            loop.close()
+        if result.exit_status == 0:
+            return {'success': True, 'output': result.stdout}
+        else:
+            # Command failed, could be no nvidia-smi installed or topo not supported
+            error_msg = result.stderr or 'nvidia-smi topo -m command failed'
+            return {'success': False, 'message': f'Command failed: {error_msg}'}
             
+    except asyncio.TimeoutError as e:
+        return {'success': False, 'message': str(e) or 'Command timed out'}
+    except asyncssh.Error as e:
+        return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
+    except Exception as e:
+        return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+
+def get_gpu_topo_info_sync(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
+    """Synchronous wrapper for async GPU topology info"""
+    try:
+        return run_async(get_gpu_topo_info(ssh_host, ssh_username, ssh_password, ssh_timeout))
     except ImportError:
         return {'success': False, 'message': 'asyncssh module not available'}
     except Exception as e:
         logger.error(f"Error getting GPU topology info for {ssh_host}: {e}")
         return {'success': False, 'message': f'Server error: {str(e)}'}
 
-def get_docker_info_sync(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
+# nvidia-smi --query-gpu fields and the record keys and types they parse into.
+# Free-text fields go last so commas inside them survive splitting.
+GPU_QUERY_FIELDS = [
+    ('index', 'index', int),
+    ('uuid', 'uuid', str),
+    ('utilization.gpu', 'utilization_gpu', float),
+    ('utilization.memory', 'utilization_memory', float),
+    ('memory.used', 'memory_used', float),
+    ('memory.total', 'memory_total', float),
+    ('temperature.gpu', 'temperature', float),
+    ('power.draw', 'power_draw', float),
+    ('power.limit', 'power_limit', float),
+    ('clocks.sm', 'clock_sm', float),
+    ('clocks.mem', 'clock_mem', float),
+    ('fan.speed', 'fan_speed', float),
+    ('name', 'name', str)
+]
+
+# nvidia-smi --query-compute-apps fields, parsed the same way
+GPU_APP_QUERY_FIELDS = [
+    ('gpu_uuid', 'gpu_uuid', str),
+    ('pid', 'pid', int),
+    ('used_memory', 'used_memory', float),
+    ('process_name', 'name', str)
+]
+
+# Separates the GPU and compute app sections of the combined query output
+_GPU_QUERY_SEPARATOR = '--mycontrol-apps--'
+
+def build_gpu_query_command():
+    """Build one shell command that queries GPUs and compute apps in CSV form"""
+    gpu_fields = ','.join(field for field, _, _ in GPU_QUERY_FIELDS)
+    app_fields = ','.join(field for field, _, _ in GPU_APP_QUERY_FIELDS)
+    return (
+        f'nvidia-smi --query-gpu={gpu_fields} --format=csv,noheader,nounits'
+        f' && echo {_GPU_QUERY_SEPARATOR}'
+        f' && nvidia-smi --query-compute-apps={app_fields} --format=csv,noheader,nounits'
+    )
+
+def build_gpu_stream_command(interval_ms=1000):
+    """Build an nvidia-smi command that prints --query-gpu CSV every interval_ms"""
+    gpu_fields = ','.join(field for field, _, _ in GPU_QUERY_FIELDS)
+    return f'nvidia-smi --query-gpu={gpu_fields} --format=csv,noheader,nounits -lms {int(interval_ms)}'
+
+def parse_csv_records(text, fields):
+    """Parse noheader,nounits CSV lines into typed dicts; N/A values become None"""
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        values = [value.strip() for value in line.split(',', len(fields) - 1)]
+        if len(values) != len(fields):
+            continue
+        record = {}
+        for value, (_, key, cast) in zip(values, fields):
+            if cast is str:
+                record[key] = value
+                continue
+            try:
+                record[key] = cast(value)
+            except ValueError:
+                # [N/A], [Not Supported] and similar placeholders
+                record[key] = None
+        records.append(record)
+    return records
+
+def parse_gpu_query_output(output):
+    """
+    Parse combined --query-gpu and --query-compute-apps output.
+    
+    Returns a list of per-GPU records, each with its compute processes.
+    """
+    gpu_text, _, apps_text = output.partition(_GPU_QUERY_SEPARATOR)
+    gpus = parse_csv_records(gpu_text, GPU_QUERY_FIELDS)
+    by_uuid = {}
+    for gpu in gpus:
+        gpu['processes'] = []
+        by_uuid[gpu['uuid']] = gpu
+    
+    for app in parse_csv_records(apps_text, GPU_APP_QUERY_FIELDS):
+        gpu = by_uuid.get(app.pop('gpu_uuid'))
+        if gpu is not None:
+            gpu['processes'].append(app)
+    return gpus
+
+def summarize_gpus(gpus):
+    """Aggregate per-GPU records into host-level totals for cross-host comparison"""
+    utilizations = [gpu['utilization_gpu'] for gpu in gpus if gpu['utilization_gpu'] is not None]
+    return {
+        'count': len(gpus),
+        'utilization_avg': round(sum(utilizations) / len(utilizations), 1) if utilizations else None,
+        'memory_used': sum(gpu['memory_used'] or 0 for gpu in gpus),
+        'memory_total': sum(gpu['memory_total'] or 0 for gpu in gpus),
+        'power_draw': round(sum(gpu['power_draw'] or 0 for gpu in gpus), 2),
+        'temperature_max': max((gpu['temperature'] for gpu in gpus if gpu['temperature'] is not None), default=None),
+        'processes': sum(len(gpu['processes']) for gpu in gpus)
+    }
+
+async def get_gpu_metrics(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
+    """Get structured per-GPU metrics via SSH by running nvidia-smi query mode"""
+    try:
+        result = await get_ssh_pool().run_shared(
+            ssh_host, ssh_username, ssh_password,
+            build_gpu_query_command(),
+            timeout=ssh_timeout
+        )
+        
+        if result.exit_status == 0:
+            gpus = parse_gpu_query_output(result.stdout)
+            return {'success': True, 'gpus': gpus, 'summary': summarize_gpus(gpus)}
+        else:
+            # Command failed, could be no nvidia-smi installed
+            error_msg = result.stderr or 'nvidia-smi query command failed'
+            return {'success': False, 'message': f'Command failed: {error_msg}'}
+            
+    except asyncio.TimeoutError as e:
+        return {'success': False, 'message': str(e) or 'Command timed out'}
+    except asyncssh.Error as e:
+        return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
+    except Exception as e:
+        return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+
+async def get_docker_info(ssh_host, ssh_username, ssh_password, ssh_timeout=10):
     """Get Docker containers information via SSH by running docker ps -a"""
     try:
-        async def run_docker_ps():
-            try:
-                async with asyncssh.connect(
-                    ssh_host,
-                    username=ssh_username,
-                    password=ssh_password,
-                    known_hosts=None,
-                    client_keys=None
-                ) as conn:
-                    result = await asyncio.wait_for(
-                        conn.run('docker ps -a --format json', check=False),
-                        timeout=15
-                    )
-                    
-                    if result.exit_status == 0:
-                        return {'success': True, 'output': result.stdout}
-                    else:
-                        # Command failed, could be no docker installed or permission denied
-                        error_msg = result.stderr or 'docker ps -a command failed'
-                        return {'success': False, 'message': f'Command failed: {error_msg}'}
-                        
-            except asyncio.TimeoutError:
-                return {'success': False, 'message': 'Command timed out'}
-            except asyncssh.Error as e:
-                return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
-            except Exception as e:
-                return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+        result = await get_ssh_pool().run_shared(
+            ssh_host, ssh_username, ssh_password,
+            'docker ps -a --format json',
+            timeout=ssh_timeout
+        )
         
-        # Run the async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(run_docker_ps())
-            return result
-        finally:
-            loop.close()
+        if result.exit_status == 0:
+            return {'success': True, 'output': result.stdout}
+        else:
+            # Command failed, could be no docker installed or permission denied
+            error_msg = result.stderr or 'docker ps -a command failed'
+            return {'success': False, 'message': f'Command failed: {error_msg}'}
             
-    except ImportError:
-        return {'success': False, 'message': 'asyncssh module not available'}
+    except asyncio.TimeoutError as e:
+        return {'success': False, 'message': str(e) or 'Command timed out'}
+    except asyncssh.Error as e:
+        return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
     except Exception as e:
-        logger.error(f"Error getting Docker info for {ssh_host}: {e}")
-        return {'success': False, 'message': f'Server error: {str(e)}'}
+        return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+
+def parse_container_lines(output):
+    """Parse `docker ps --format '{{json .}}'` output into container dicts, skipping bad lines"""
+    containers = []
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        try:
+            containers.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return containers
+
+def container_state(container):
+    """Get a container's state, deriving it from the status text when docker ps has no State field"""
+    state = container.get('State')
+    if state:
+        return state
+    status = container.get('Status', '')
+    if status.startswith('Up'):
+        return 'paused' if '(Paused)' in status else 'running'
+    for prefix, state in (('Exited', 'exited'), ('Created', 'created'), ('Restarting', 'restarting'), ('Dead', 'dead')):
+        if status.startswith(prefix):
+            return state
+    return 'unknown'
+
+def count_containers(containers):
+    """Count running and total containers"""
+    running = sum(1 for container in containers if container_state(container) == 'running')
+    return {'total': len(containers), 'running': running}
+
+def container_record(container):
+    """Convert a docker ps record into the compact form served to the dashboard"""
+    return {
+        'id': container.get('ID', '')[:12],
+        'name': container.get('Names', ''),
+        'image': container.get('Image', ''),
+        'state': container_state(container),
+        'status': container.get('Status', ''),
+        'ports': [port for port in (container.get('Ports') or '').split(', ') if port],
+        'created': container.get('CreatedAt', '')
+    }
 
 def parse_docker_output_to_html(docker_output, hostname):
     """Parse docker ps -a JSON output and convert to HTML table"""
@@ -226,47 +334,36 @@ def parse_docker_output_to_html(docker_output, hostname):
     except Exception as e:
         return f'<div class="gpu-error">Error parsing Docker output: {str(e)}</div>'
 
-def docker_action_sync(ssh_host, ssh_username, ssh_password, container_id, action, ssh_timeout=10):
+async def docker_action(ssh_host, ssh_username, ssh_password, container_id, action, ssh_timeout=30):
     """Perform Docker action (start/stop) on a container via SSH"""
     try:
-        async def run_docker_action():
-            try:
-                async with asyncssh.connect(
-                    ssh_host,
-                    username=ssh_username,
-                    password=ssh_password,
-                    known_hosts=None,
-                    client_keys=None
-                ) as conn:
-                    command = f'docker {action} {container_id}'
-                    result = await asyncio.wait_for(
-                        conn.run(command, check=False),
-                        timeout=30  # Longer timeout for start/stop operations
-                    )
-                    
-                    if result.exit_status == 0:
-                        return {'success': True, 'message': f'Container {action} successful'}
-                    else:
-                        # Command failed
-                        error_msg = result.stderr or f'docker {action} command failed'
-                        return {'success': False, 'message': f'Command failed: {error_msg}'}
-                        
-            except asyncio.TimeoutError:
-                return {'success': False, 'message': f'Docker {action} command timed out'}
-            except asyncssh.Error as e:
-                return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
-            except Exception as e:
-                return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+        command = f'docker {action} {container_id}'
+        result = await get_ssh_pool().run(
+            ssh_host, ssh_username, ssh_password,
+            command,
+            timeout=ssh_timeout
+        )
+        # docker ps results shared from before the action are out of date
+        get_ssh_pool().invalidate_shared(ssh_host)
         
-        # Run the async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(run_docker_action())
-            return result
-        finally:
-            loop.close()
+        if result.exit_status == 0:
+            return {'success': True, 'message': f'Container {action} successful'}
+        else:
+            # Command failed
+            error_msg = result.stderr or f'docker {action} command failed'
+            return {'success': False, 'message': f'Command failed: {error_msg}'}
             
+    except asyncio.TimeoutError as e:
+        return {'success': False, 'message': str(e) or f'Docker {action} command timed out'}
+    except asyncssh.Error as e:
+        return {'success': False, 'message': f'SSH connection failed: {str(e)}'}
+    except Exception as e:
+        return {'success': False, 'message': f'Unexpected error: {str(e)}'}
+
+def docker_action_sync(ssh_host, ssh_username, ssh_password, container_id, action, ssh_timeout=30):
+    """Synchronous wrapper for async Docker action"""
+    try:
+        return run_async(docker_action(ssh_host, ssh_username, ssh_password, container_id, action, ssh_timeout))
     except ImportError:
         return {'success': False, 'message': 'asyncssh module not available'}
     except Exception as e:
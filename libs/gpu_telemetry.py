@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+import time
+import logging
+from collections import deque
+from libs.gpu_management import GPU_QUERY_FIELDS, build_gpu_stream_command, parse_csv_records, summarize_gpus
+from libs.remote_stream import RemoteStream
+
+logger = logging.getLogger(__name__)
+
+class GPUTelemetry:
+    """
+    Streams `nvidia-smi --query-gpu ... -lms` from one host into a ring buffer.
+
+    nvidia-smi prints one CSV line per GPU each interval. Lines are grouped
+    into samples by GPU index, and a sample is published once it has as many
+    GPUs as the previous one, so readers never see a partial sample.
+    """
+
+    def __init__(self, ssh_host, ssh_username, ssh_password, interval_ms=1000, max_samples=300, on_sample=None):
+        self.interval_ms = interval_ms
+        self.on_sample = on_sample
+        self.samples = deque(maxlen=max_samples)
+        self._current = None
+        self._published = False
+        self._gpu_count = None
+        self.stream = RemoteStream(
+            ssh_host, ssh_username, ssh_password,
+            build_gpu_stream_command(interval_ms),
+            self._on_line,
+            name=f'GPU telemetry stream for {ssh_host}'
+        )
+
+    def _on_line(self, line):
+        """Add one GPU line to the sample being assembled"""
+        records = parse_csv_records(line, GPU_QUERY_FIELDS)
+        if not records:
+            return
+        gpu = records[0]
+
+        current = self._current
+        if current is None or gpu['index'] is None or gpu['index'] <= current['gpus'][-1]['index']:
+            # A repeated index starts the next interval's sample
+            if current is not None:
+                self._gpu_count = len(current['gpus'])
+                self._publish()
+            self._current = current = {'timestamp': time.time(), 'gpus': []}
+            self._published = False
+
+        current['gpus'].append(gpu)
+        if len(current['gpus']) == self._gpu_count:
+            self._publish()
+
+    def _publish(self):
+        """Make the sample being assembled visible to readers"""
+        if not self._published:
+            self.samples.append(self._current)
+            self._published = True
+            if self.on_sample is not None:
+                self.on_sample(self._current)
+
+    def latest(self):
+        """Get the most recent complete sample, or None"""
+        try:
+            return self.samples[-1]
+        except IndexError:
+            return None
+
+    def history(self, seconds=None):
+        """Get samples from the last `seconds`, oldest first"""
+        samples = list(self.samples)
+        if seconds is None:
+            return samples
+        cutoff = time.time() - seconds
+        return [sample for sample in samples if sample['timestamp'] >= cutoff]
+
+    def is_fresh(self, sample=None):
+        """Check whether a sample is recent enough to stand in for a live query"""
+        sample = sample or self.latest()
+        max_age = max(3, 3 * self.interval_ms / 1000)
+        return sample is not None and time.time() - sample['timestamp'] <= max_age
+
+    def get_status(self):
+        """Describe the stream for API responses"""
+        return {
+            'connected': self.stream.connected,
+            'restarts': self.stream.restarts,
+            'last_error': self.stream.last_error,
+            'interval_ms': self.interval_ms,
+            'samples': len(self.samples)
+        }
+
+def merge_gpu_sample(sample, polled_gpus):
+    """
+    Combine a streamed sample with compute processes from the last full query.
+
+    The -lms stream only carries --query-gpu fields, so processes come from
+    the periodic gpu_metrics poll, matched by GPU UUID.
+    """
+    processes = {gpu['uuid']: gpu.get('processes', []) for gpu in polled_gpus or []}
+    gpus = [dict(gpu, processes=processes.get(gpu['uuid'], [])) for gpu in sample['gpus']]
+    return {'success': True, 'gpus': gpus, 'summary': summarize_gpus(gpus), 'source': 'stream'}
+
+class GPUTelemetryManager:
+    """Keeps one telemetry stream running per GPU host; runs on the shared event loop"""
+
+    def __init__(self, on_sample=None):
+        self._telemetry = {}
+        # Called with (host_key, sample) for every published sample
+        self.on_sample = on_sample
+
+    def sync(self, targets, interval_ms=1000, max_samples=300):
+        """
+        Run streams for exactly the given hosts.
+
+        targets maps host keys to (ssh_host, ssh_username, ssh_password).
+        Streams are restarted when a host's credentials or the interval change.
+        """
+        for host_key in list(self._telemetry):
+            telemetry = self._telemetry[host_key]
+            stream = telemetry.stream
+            target = targets.get(host_key)
+            if target != (stream.ssh_host, stream.ssh_username, stream.ssh_password) or telemetry.interval_ms != interval_ms:
+                stream.stop()
+                del self._telemetry[host_key]
+
+        for host_key, (ssh_host, ssh_username, ssh_password) in targets.items():
+            if host_key not in self._telemetry:
+                telemetry = GPUTelemetry(ssh_host, ssh_username, ssh_password, interval_ms, max_samples,
+                                         on_sample=lambda sample, key=host_key: self._sample_published(key, sample))
+                telemetry.stream.start()
+                self._telemetry[host_key] = telemetry
+
+    def _sample_published(self, host_key, sample):
+        """Forward a published sample to the on_sample hook"""
+        if self.on_sample is not None:
+            self.on_sample(host_key, sample)
+
+    def get(self, host_key):
+        """Get the telemetry for a host, or None if it is not streaming"""
+        return self._telemetry.get(host_key)
+
+    def stop_all(self):
+        """Stop every stream"""
+        for telemetry in self._telemetry.values():
+            telemetry.stream.stop()
+        self._telemetry.clear()
+
+# Global instance fed by the fleet poller
+_gpu_telemetry_manager = GPUTelemetryManager()
+
+def get_gpu_telemetry_manager():
+    """Get the shared GPU telemetry manager"""
+    return _gpu_telemetry_manager
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+
+# Every Counter and Histogram, in creation order, for render_instrumentation()
+_registry = []
+
+def escape_label_value(value):
+    """Escape a label value for the Prometheus text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(labels):
+    """Render a label dict as {name="value",...}, or an empty string"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items()) + '}'
+
+def format_value(value):
+    """Render a sample value the way Prometheus expects"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NaN'
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def render_family(name, help_text, metric_type, samples):
+    """
+    Render one metric family.
+
+    samples is a list of (labels dict, value) pairs, or (suffix, labels, value)
+    triples for families such as histograms whose samples add a name suffix.
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    for sample in samples:
+        suffix, labels, value = sample if len(sample) == 3 else ('', *sample)
+        lines.append(f'{name}{suffix}{format_labels(labels)} {format_value(value)}')
+    return lines
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels"""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        """Increase the counter for the given label values"""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        """Render the counter in text exposition format"""
+        with self._lock:
+            values = list(self._values.items())
+        samples = [(dict(zip(self.labelnames, key)), value) for key, value in values]
+        return render_family(self.name, self.help_text, 'counter', samples)
+
+class Histogram:
+    """Observations counted into cumulative buckets, optionally split by labels"""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        """Record one observation for the given label values"""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            # Per-bucket counts followed by the sum and count of observations
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def render(self):
+        """Render bucket, sum and count samples in text exposition format"""
+        with self._lock:
+            values = [(key, list(value)) for key, value in self._values.items()]
+        samples = []
+        for key, value in values:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, value):
+                samples.append(('_bucket', dict(labels, le=format_value(float(bound))), count))
+            samples.append(('_bucket', dict(labels, le='+Inf'), value[-1]))
+            samples.append(('_sum', labels, round(value[-2], 6)))
+            samples.append(('_count', labels, value[-1]))
+        return render_family(self.name, self.help_text, 'histogram', samples)
+
+# Internal instrumentation shared by the collectors
+PROBE_DURATION = Histogram(
+    'mycontrol_probe_duration_seconds',
+    'Time taken by each host probe, by metric',
+    ('metric',)
+)
+PROBE_FAILURES = Counter(
+    'mycontrol_probe_failures_total',
+    'Host probes that failed or returned an error, by metric',
+    ('metric',)
+)
+PROBES_COALESCED = Counter(
+    'mycontrol_probes_coalesced_total',
+    'Remote probes answered by an identical probe in flight or just finished instead of running again',
+    ('probe', 'source')
+)
+SSH_TIMEOUTS = Counter(
+    'mycontrol_ssh_timeouts_total',
+    'SSH operations that ran out of time, by stage (connect, auth, channel, command)',
+    ('stage',)
+)
+REQUEST_TIMEOUTS = Counter(
+    'mycontrol_request_timeouts_total',
+    'HTTP requests that stopped waiting for hosts when their deadline expired, by endpoint',
+    ('endpoint',)
+)
+
+def render_instrumentation():
+    """Render all internal instrumentation metrics"""
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return lines
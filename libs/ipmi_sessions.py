@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import asyncio
+import itertools
+import os
+import time
+import logging
+from collections import deque
+from libs.circuit_breaker import get_host_health
+
+logger = logging.getLogger(__name__)
+
+# Prompt printed by ipmitool shell before reading each command
+_SHELL_PROMPT = 'ipmitool> '
+
+class IPMISession:
+    """
+    A long-lived `ipmitool ... shell` process holding one RMCP+ session to a BMC.
+
+    Commands are written to the shell as soon as they are submitted, each
+    followed by an `echo` of a unique marker. Output is read back in order
+    and split on those markers, so several commands can be in flight at once.
+    """
+
+    def __init__(self, ipmitool_path, hostname, username, password):
+        self.ipmitool_path = ipmitool_path
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.commands_run = 0
+        self._process = None
+        self._closed = False
+        self._pending = deque()
+        self._stderr = []
+        self._markers = itertools.count(1)
+        self._drain_lock = asyncio.Lock()
+
+    async def start(self):
+        """Start the ipmitool shell; the BMC handshake happens on the first command"""
+        logger.info(f"Starting IPMI shell session for {self.hostname}")
+        # -E reads the password from IPMI_PASSWORD so it never shows up in ps
+        env = dict(os.environ, IPMI_PASSWORD=self.password)
+        self._process = await asyncio.create_subprocess_exec(
+            self.ipmitool_path, '-I', 'lanplus',
+            '-H', self.hostname,
+            '-U', self.username,
+            '-E', 'shell',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env
+        )
+        asyncio.ensure_future(self._read_stdout())
+        asyncio.ensure_future(self._read_stderr())
+
+    def is_alive(self):
+        """Check whether the shell process is still running"""
+        return self._process is not None and not self._closed and self._process.returncode is None
+
+    def is_idle(self):
+        """Check whether no command is waiting for output"""
+        return not self._pending
+
+    async def _read_stdout(self):
+        """Split shell output on command markers and resolve the waiting commands"""
+        lines = []
+        try:
+            while True:
+                line = await self._process.stdout.readline()
+                if not line:
+                    break
+                text = line.decode(errors='replace').rstrip('\r\n')
+                while text.startswith(_SHELL_PROMPT):
+                    text = text[len(_SHELL_PROMPT):]
+                if self._pending and text == self._pending[0][0]:
+                    _, future = self._pending.popleft()
+                    errors = '\n'.join(self._stderr)
+                    self._stderr.clear()
+                    if not future.done():
+                        future.set_result(('\n'.join(lines), errors))
+                    lines = []
+                else:
+                    lines.append(text)
+        finally:
+            self._fail_pending(ConnectionError(f'IPMI shell for {self.hostname} exited'))
+
+    async def _read_stderr(self):
+        """Collect error output for the command currently being answered"""
+        while True:
+            line = await self._process.stderr.readline()
+            if not line:
+                break
+            self._stderr.append(line.decode(errors='replace').rstrip('\r\n'))
+
+    def _fail_pending(self, error):
+        """Fail every command still waiting for output"""
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def run(self, command, timeout=10):
+        """
+        Run one ipmitool command in the shell.
+
+        Returns (stdout, stderr) text. A command that times out leaves the
+        session in an unknown state, so the shell is killed and must be
+        restarted by the caller.
+        """
+        if not self.is_alive():
+            raise ConnectionError(f'IPMI shell for {self.hostname} is not running')
+
+        marker = f'__mycontrol_{next(self._markers)}__'
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((marker, future))
+        self._process.stdin.write(f'{command}\necho {marker}\n'.encode())
+        self.last_used = time.monotonic()
+        try:
+            async with self._drain_lock:
+                await self._process.stdin.drain()
+            result = await asyncio.wait_for(future, timeout)
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise ConnectionError(f'IPMI shell for {self.hostname} exited') from e
+        except asyncio.TimeoutError:
+            logger.warning(f"IPMI command '{command}' timed out for {self.hostname}, restarting session")
+            self.kill()
+            raise
+        self.commands_run += 1
+        self.last_used = time.monotonic()
+        return result
+
+    def kill(self):
+        """Terminate the shell immediately"""
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+        self._closed = True
+        self._fail_pending(ConnectionError(f'IPMI shell for {self.hostname} was closed'))
+
+    async def close(self, timeout=2):
+        """Ask the shell to exit, killing it if it does not"""
+        if not self.is_alive():
+            return
+        self._closed = True
+        try:
+            self._process.stdin.write(b'exit\n')
+            self._process.stdin.close()
+            await asyncio.wait_for(self._process.wait(), timeout)
+        except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError):
+            self.kill()
+
+class IPMISessionManager:
+    """
+    Keeps one persistent ipmitool shell per BMC and routes commands to it.
+
+    All coroutines must run on the shared event loop service.
+    """
+
+    def __init__(self, enabled=True, idle_timeout=60, max_concurrency=10):
+        self.enabled = enabled
+        self.idle_timeout = idle_timeout
+        self.max_concurrency = max_concurrency
+        # Sessions are keyed by (ipmitool_path, host, username, password) so
+        # changed credentials never reuse a session opened with the old ones
+        self._sessions = {}
+        self._start_locks = {}
+        self._semaphore = None
+        self._semaphore_size = 0
+        self._maintenance_task = None
+
+    def configure(self, enabled=None, idle_timeout=None, max_concurrency=None):
+        """Update session settings; running sessions pick them up on next use"""
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+        if max_concurrency is not None:
+            self.max_concurrency = max(1, int(max_concurrency))
+
+    def _get_semaphore(self):
+        """Get the semaphore bounding concurrent IPMI commands, resizing it if needed"""
+        if self._semaphore is None or self._semaphore_size != self.max_concurrency:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_size = self.max_concurrency
+        return self._semaphore
+
+    def _ensure_maintenance(self):
+        """Start the periodic idle eviction task on first use"""
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.ensure_future(self._maintenance())
+
+    async def _maintenance(self):
+        """Close sessions that have been idle longer than idle_timeout"""
+        while True:
+            await asyncio.sleep(max(1, self.idle_timeout / 2))
+            now = time.monotonic()
+            for key, session in list(self._sessions.items()):
+                if not session.is_alive():
+                    del self._sessions[key]
+                elif session.is_idle() and now - session.last_used > self.idle_timeout:
+                    logger.info(f"Closing idle IPMI session for {session.hostname}")
+                    del self._sessions[key]
+                    await session.close()
+
+    async def _get_session(self, key):
+        """Get the live session for a BMC, starting one if needed; returns (session, fresh)"""
+        lock = self._start_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            session = self._sessions.get(key)
+            if session is not None and session.is_alive():
+                return session, False
+            if session is not None:
+                logger.info(f"IPMI session for {session.hostname} died, restarting")
+            session = IPMISession(*key)
+            await session.start()
+            self._sessions[key] = session
+            return session, True
+
+    async def run(self, ipmitool_path, hostname, username, password, command, timeout=10):
+        """
+        Run an ipmitool command over the BMC's persistent session.
+
+        A reused session that has exited, or whose BMC side has expired and
+        answers with errors only, is restarted once and the command retried.
+        Raises CircuitOpenError without contacting a BMC that keeps failing.
+        """
+        breaker = get_host_health().breaker('ipmi', hostname)
+        breaker.check()
+        try:
+            output, errors = await self._run(ipmitool_path, hostname, username, password, command, timeout)
+        except asyncio.CancelledError:
+            breaker.record_abandoned()
+            raise
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            breaker.record_failure(e)
+            raise
+        except BaseException:
+            breaker.record_abandoned()
+            raise
+        if output.strip() or not errors:
+            breaker.record_success()
+        else:
+            breaker.record_failure(errors.splitlines()[-1])
+        return output, errors
+
+    async def _run(self, ipmitool_path, hostname, username, password, command, timeout):
+        """Run a command over the BMC's session, restarting it once if it went stale"""
+        self._ensure_maintenance()
+        key = (ipmitool_path, hostname, username, password)
+        async with self._get_semaphore():
+            for attempt in range(2):
+                session, fresh = await self._get_session(key)
+                try:
+                    output, errors = await session.run(command, timeout)
+                except ConnectionError:
+                    if attempt or fresh:
+                        raise
+                    continue
+                if not output.strip() and errors and not fresh and not attempt:
+                    logger.info(f"IPMI session for {hostname} returned only errors, reconnecting")
+                    await session.close()
+                    continue
+                return output, errors
+
+    async def close_all(self):
+        """Close every session"""
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+
+    def get_stats(self):
+        """Get the commands run over each live session"""
+        return {
+            session.hostname: {'commands': session.commands_run, 'age': round(time.monotonic() - session.created, 1)}
+            for session in list(self._sessions.values()) if session.is_alive()
+        }
+
+# Global instance shared by all IPMI helpers
+_ipmi_session_manager = IPMISessionManager()
+
+def get_ipmi_session_manager():
+    """Get the shared IPMI session manager"""
+    return _ipmi_session_manager
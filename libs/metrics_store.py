@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+import logging
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# (resolution seconds, number of buckets): 1s for 1h, 1m for 24h, 10m for 30d
+DEFAULT_TIERS = [(1, 3600), (60, 1440), (600, 4320)]
+
+# Numeric GPU record fields kept as history
+GPU_HISTORY_FIELDS = (
+    'utilization_gpu', 'utilization_memory', 'memory_used', 'memory_total',
+    'temperature', 'power_draw', 'clock_sm', 'clock_mem', 'fan_speed'
+)
+
+_NAN = float('nan')
+
+class _Tier:
+    """
+    A fixed-size ring of per-bucket means at one resolution.
+
+    head is the newest bucket number (timestamp // resolution); the value for
+    bucket b lives at b % size and is valid while head - size < b <= head.
+    Buckets skipped without samples are filled with NaN.
+    """
+
+    __slots__ = ('resolution', 'size', 'values', 'head', 'sum', 'count')
+
+    def __init__(self, resolution, size):
+        self.resolution = resolution
+        self.size = size
+        self.values = array('f', [_NAN]) * size
+        self.head = None
+        self.sum = 0.0
+        self.count = 0
+
+    def add(self, timestamp, value):
+        """Fold a sample into its bucket's running mean"""
+        bucket = int(timestamp // self.resolution)
+        if self.head is None or bucket > self.head:
+            if self.head is not None:
+                for skipped in range(max(self.head + 1, bucket - self.size + 1), bucket):
+                    self.values[skipped % self.size] = _NAN
+            self.head = bucket
+            self.sum = 0.0
+            self.count = 0
+        elif bucket < self.head:
+            # Late samples for closed buckets are dropped
+            return
+        self.sum += value
+        self.count += 1
+        self.values[bucket % self.size] = self.sum / self.count
+
+    def covers(self, seconds):
+        """Check whether this tier retains the last `seconds` of history"""
+        return seconds <= self.resolution * self.size
+
+    def points(self, start, end):
+        """Get [timestamp, value] pairs for buckets between start and end"""
+        if self.head is None:
+            return []
+        first = max(int(start // self.resolution), self.head - self.size + 1)
+        last = min(int(end // self.resolution), self.head)
+        points = []
+        for bucket in range(first, last + 1):
+            value = self.values[bucket % self.size]
+            if not math.isnan(value):
+                points.append([bucket * self.resolution, round(value, 3)])
+        return points
+
+class MetricsStore:
+    """
+    Array-backed time series history for host and GPU metrics.
+
+    Every series keeps one ring per tier, so memory is fixed per series and
+    each sample costs one update per tier. With the default tiers a series
+    takes about 37 KB. Series are optionally saved to and restored from SQLite.
+    """
+
+    def __init__(self, tiers=None, db_path=None):
+        self.tiers = list(tiers or DEFAULT_TIERS)
+        self.db_path = db_path
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, host_key, metric, value, timestamp=None):
+        """Add one sample; None and NaN values are ignored"""
+        if value is None:
+            return
+        value = float(value)
+        if math.isnan(value):
+            return
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            tiers = self._series.get((host_key, metric))
+            if tiers is None:
+                tiers = self._series[(host_key, metric)] = [_Tier(resolution, size) for resolution, size in self.tiers]
+            for tier in tiers:
+                tier.add(timestamp, value)
+
+    def record_many(self, host_key, samples, timestamp=None):
+        """Add several named samples taken at the same time"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        for metric, value in samples.items():
+            self.record(host_key, metric, value, timestamp)
+
+    def query(self, host_key, metric, seconds=3600, step=None, end=None):
+        """
+        Get the last `seconds` of a series as [timestamp, value] pairs.
+
+        Uses the finest tier that retains the whole range and is at least as
+        coarse as `step`. Returns (resolution, points), or (None, []) when
+        the series does not exist.
+        """
+        end = end if end is not None else time.time()
+        with self._lock:
+            tiers = self._series.get((host_key, metric))
+            if tiers is None:
+                return None, []
+            candidates = [tier for tier in tiers if tier.covers(seconds) and tier.resolution >= (step or 0)]
+            tier = candidates[0] if candidates else tiers[-1]
+            return tier.resolution, tier.points(end - seconds, end)
+
+    def list_metrics(self, host_key):
+        """Get the names of all series recorded for a host"""
+        with self._lock:
+            return sorted(metric for key, metric in self._series if key == host_key)
+
+    def prune(self, host_keys):
+        """Forget series for hosts that are no longer configured"""
+        with self._lock:
+            for key in list(self._series):
+                if key[0] not in host_keys:
+                    del self._series[key]
+
+    def get_stats(self):
+        """Get the number of series and the memory held by their rings"""
+        with self._lock:
+            series = len(self._series)
+        per_series = sum(size * array('f').itemsize for _, size in self.tiers)
+        return {'series': series, 'bytes': series * per_series}
+
+    def _connect(self):
+        """Open the SQLite database, creating the table on first use"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.db_path)
+        db.execute('''CREATE TABLE IF NOT EXISTS series (
+            host TEXT, metric TEXT, resolution INTEGER, size INTEGER, head INTEGER, data BLOB,
+            sum REAL DEFAULT 0, count INTEGER DEFAULT 0,
+            PRIMARY KEY (host, metric, resolution))''')
+        # Databases saved before the head bucket's running mean was kept lack its columns
+        columns = {row[1] for row in db.execute('PRAGMA table_info(series)')}
+        if 'sum' not in columns:
+            db.execute('ALTER TABLE series ADD COLUMN sum REAL DEFAULT 0')
+            db.execute('ALTER TABLE series ADD COLUMN count INTEGER DEFAULT 0')
+        return db
+
+    def save(self):
+        """Write every series to SQLite; rings are copied under the lock and written outside it"""
+        if not self.db_path:
+            return
+        with self._lock:
+            rows = [
+                (host_key, metric, tier.resolution, tier.size, tier.head, tier.values.tobytes(), tier.sum, tier.count)
+                for (host_key, metric), tiers in self._series.items()
+                for tier in tiers if tier.head is not None
+            ]
+        db = self._connect()
+        try:
+            with db:
+                db.execute('DELETE FROM series')
+                db.executemany('INSERT INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        finally:
+            db.close()
+        logger.info(f"Saved {len(rows)} metric history rings to {self.db_path}")
+
+    def load(self):
+        """Restore series saved by save(); rings from a different tier layout are skipped"""
+        if not self.db_path or not os.path.exists(self.db_path):
+            return
+        db = self._connect()
+        try:
+            rows = db.execute('SELECT host, metric, resolution, size, head, data, sum, count FROM series').fetchall()
+        finally:
+            db.close()
+
+        layout = {resolution: index for index, (resolution, _) in enumerate(self.tiers)}
+        restored = 0
+        with self._lock:
+            for host_key, metric, resolution, size, head, data, total, count in rows:
+                index = layout.get(resolution)
+                if index is None or self.tiers[index][1] != size:
+                    continue
+                tiers = self._series.get((host_key, metric))
+                if tiers is None:
+                    tiers = self._series[(host_key, metric)] = [_Tier(r, s) for r, s in self.tiers]
+                tier = tiers[index]
+                tier.values = array('f')
+                tier.values.frombytes(data)
+                tier.head = head
+                # Samples landing in the head bucket after a restart keep averaging into it
+                tier.sum, tier.count = total or 0.0, count or 0
+                if not tier.count and not math.isnan(tier.values[head % size]):
+                    # Saved without its running mean; count the stored mean as one sample
+                    tier.sum, tier.count = float(tier.values[head % size]), 1
+                restored += 1
+        logger.info(f"Restored {restored} metric history rings from {self.db_path}")
+
+async def autosave(store, interval):
+    """Periodically save the store from a worker thread; runs on the shared event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, store.save)
+        except Exception as e:
+            logger.error(f"Error saving metric history: {e}")
+
+def extract_samples(metric, value):
+    """Turn a poller result into named numeric samples for the history store"""
+    if metric == 'power':
+        if value in ('on', 'off'):
+            return {'power.on': 1 if value == 'on' else 0}
+        return {}
+    if not isinstance(value, dict) or not value.get('success'):
+        return {}
+    if metric == 'ping':
+        return {
+            'ping.online': 1 if value.get('status') == 'online' else 0,
+            'ping.rtt_ms': value.get('rtt_ms'),
+            'ping.loss': value.get('loss')
+        }
+    if metric == 'uptime':
+        return {'uptime.load1': value.get('load1'), 'uptime.load5': value.get('load5'), 'uptime.load15': value.get('load15')}
+    if metric == 'docker' and 'containers' in value:
+        return {
+            'docker.containers_running': value['containers']['running'],
+            'docker.containers_total': value['containers']['total']
+        }
+    if metric == 'gpu_metrics':
+        return extract_gpu_samples(value.get('gpus', []))
+    return {}
+
+def extract_gpu_samples(gpus):
+    """Turn per-GPU records into samples named gpu<index>.<field>"""
+    samples = {}
+    for gpu in gpus:
+        for field in GPU_HISTORY_FIELDS:
+            samples[f"gpu{gpu['index']}.{field}"] = gpu.get(field)
+    return samples
+
+# Global instance fed by the fleet poller and GPU telemetry streams
+_metrics_store = MetricsStore()
+
+def get_metrics_store():
+    """Get the shared metrics history store"""
+    return _metrics_store
@@ -1,27 +1,193 @@
 #!/usr/bin/env python3
 
-import subprocess
+import asyncio
+import itertools
+import socket
+import statistics
+import struct
+import time
 import logging
+from collections import deque
+from libs.circuit_breaker import get_host_health
 
 logger = logging.getLogger(__name__)
 
-def check_host_ping(hostname):
-    """Check if a host is reachable via ping"""
-    try:
-        # Use ping command (works on both Linux and macOS)
-        # -c 1: send only 1 packet
-        # -W 3: timeout after 3 seconds
-        cmd = ['ping', '-c', '1', '-W', '3', hostname]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-        
-        if result.returncode == 0:
-            return {'success': True, 'status': 'online', 'message': 'Host is reachable'}
+# ICMP echo request/reply types for IPv4 and IPv6
+_ICMP_ECHO = {socket.AF_INET: (8, 0), socket.AF_INET6: (128, 129)}
+
+def _icmp_checksum(data):
+    """Compute the RFC 1071 internet checksum"""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+class ReachabilityProber:
+    """
+    Checks host reachability from the shared event loop without spawning ping.
+
+    Unprivileged ICMP datagram sockets are used where the kernel allows them
+    (net.ipv4.ping_group_range); otherwise a TCP connect to the fallback port
+    is timed instead. A refused connection still proves the host is up.
+    """
+
+    def __init__(self, timeout=3, window=10, tcp_port=22):
+        self.timeout = timeout
+        self.window = window
+        self.tcp_port = tcp_port
+        self._icmp_available = {}
+        self._sequence = itertools.count(1)
+        self._history = {}
+        self._last_results = {}
+
+    def _open_icmp_socket(self, family):
+        """Open a non-blocking ICMP datagram socket, or None if not permitted"""
+        if self._icmp_available.get(family) is False:
+            return None
+        proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        try:
+            sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+        except OSError as e:
+            if family not in self._icmp_available:
+                logger.info(f"ICMP datagram sockets unavailable ({e}), using TCP port {self.tcp_port} probes")
+            self._icmp_available[family] = False
+            return None
+        self._icmp_available[family] = True
+        sock.setblocking(False)
+        return sock
+
+    async def _probe_icmp(self, sock, address, family, timeout):
+        """Send one echo request and return the round trip time in seconds"""
+        loop = asyncio.get_running_loop()
+        request_type, reply_type = _ICMP_ECHO[family]
+        sequence = next(self._sequence) & 0xffff
+        payload = struct.pack('!d', time.monotonic())
+        # The kernel rewrites the identifier and routes replies back to this socket
+        header = struct.pack('!BBHHH', request_type, 0, 0, 0, sequence)
+        checksum = _icmp_checksum(header + payload) if family == socket.AF_INET else 0
+        packet = struct.pack('!BBHHH', request_type, 0, checksum, 0, sequence) + payload
+
+        # Connecting a datagram socket never blocks; loop.sock_connect() would
+        # try to resolve the address for an ICMP socket type and fail
+        sock.connect(address)
+        start = time.monotonic()
+        await loop.sock_sendall(sock, packet)
+
+        async def wait_for_reply():
+            while True:
+                data = await loop.sock_recv(sock, 1024)
+                if len(data) >= 8:
+                    reply, _, _, _, reply_sequence = struct.unpack('!BBHHH', data[:8])
+                    if reply == reply_type and reply_sequence == sequence:
+                        return time.monotonic() - start
+
+        return await asyncio.wait_for(wait_for_reply(), timeout)
+
+    async def _probe_tcp(self, address, family, timeout):
+        """Time a TCP handshake to the fallback port and return it in seconds"""
+        start = time.monotonic()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(address[0], self.tcp_port, family=family), timeout)
+        except ConnectionRefusedError:
+            # Something answered with a RST, so the host itself is reachable
+            return time.monotonic() - start
+        writer.close()
+        return time.monotonic() - start
+
+    async def _probe_once(self, hostname, timeout):
+        """Probe a host once, returning (rtt seconds or None, method)"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        addresses = await asyncio.wait_for(
+            loop.getaddrinfo(hostname, None, type=socket.SOCK_DGRAM), timeout)
+        family, _, _, _, sockaddr = addresses[0]
+        address = (sockaddr[0], 0) + tuple(sockaddr[2:])
+        # Name resolution and the probe share one timeout window
+        timeout = max(0, deadline - time.monotonic())
+
+        sock = self._open_icmp_socket(family)
+        if sock is not None:
+            try:
+                return await self._probe_icmp(sock, address, family, timeout), 'icmp'
+            except (asyncio.TimeoutError, OSError):
+                return None, 'icmp'
+            finally:
+                sock.close()
+
+        try:
+            return await self._probe_tcp(address, family, timeout), 'tcp'
+        except (asyncio.TimeoutError, OSError):
+            return None, 'tcp'
+
+    def _record(self, hostname, rtt):
+        """Add a probe result to the host's sliding window and summarise it"""
+        history = self._history.get(hostname)
+        if history is None or history.maxlen != self.window:
+            history = self._history[hostname] = deque(history or (), maxlen=self.window)
+        history.append(rtt)
+
+        replies = [sample for sample in history if sample is not None]
+        stats = {
+            'samples': len(history),
+            'loss': round(100.0 * (len(history) - len(replies)) / len(history), 1),
+            'rtt_ms': round(rtt * 1000, 3) if rtt is not None else None,
+            'rtt_avg_ms': round(statistics.fmean(replies) * 1000, 3) if replies else None,
+            'jitter_ms': None
+        }
+        if len(replies) > 1:
+            # Mean difference between consecutive replies, as in RFC 3550
+            differences = [abs(b - a) for a, b in zip(replies, replies[1:])]
+            stats['jitter_ms'] = round(statistics.fmean(differences) * 1000, 3)
+        return stats
+
+    async def probe(self, hostname, timeout=None):
+        """
+        Check if a host is reachable and return its RTT, loss and jitter.
+
+        Hosts that keep failing are only probed again once their circuit
+        breaker allows it; until then the last result is returned with
+        `circuit_open` set and `retry_in` giving the seconds until the next probe.
+        """
+        breaker = get_host_health().breaker('icmp', hostname)
+        last = self._last_results.get(hostname)
+        if last is not None and not breaker.allow():
+            return dict(last, circuit_open=True, retry_in=round(breaker.retry_in(), 1))
+
+        timeout = timeout or self.timeout
+        try:
+            rtt, method = await self._probe_once(hostname, timeout)
+        except asyncio.TimeoutError:
+            rtt, method = None, None
+        except asyncio.CancelledError:
+            breaker.record_abandoned()
+            raise
+        except socket.gaierror as e:
+            result = {'success': False, 'status': 'error', 'message': f'Ping error: {str(e)}'}
+            breaker.record_failure(e)
+            self._last_results[hostname] = result
+            return result
+        except Exception as e:
+            logger.error(f"Error pinging {hostname}: {e}")
+            breaker.record_abandoned()
+            return {'success': False, 'status': 'error', 'message': f'Ping error: {str(e)}'}
+
+        result = {'success': True, 'method': method}
+        result.update(self._record(hostname, rtt))
+        if rtt is not None:
+            result.update({'status': 'online', 'message': 'Host is reachable'})
+            breaker.record_success()
         else:
-            return {'success': True, 'status': 'offline', 'message': 'Host is not reachable'}
-            
-    except subprocess.TimeoutExpired:
-        return {'success': True, 'status': 'offline', 'message': 'Ping timeout'}
-    except Exception as e:
-        logger.error(f"Error pinging {hostname}: {e}")
-        return {'success': False, 'status': 'error', 'message': f'Ping error: {str(e)}'}
\ No newline at end of file
+            result.update({'status': 'offline', 'message': 'Host is not reachable'})
+            breaker.record_failure('no reply')
+        self._last_results[hostname] = result
+        return result
+
+# Global instance so every caller shares the per-host sliding windows
+_prober = ReachabilityProber()
+
+def get_prober():
+    """Get the shared reachability prober"""
+    return _prober
@@ -1,12 +1,97 @@
 #!/usr/bin/env python3
 
+import asyncio
 import subprocess
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from libs.event_loop import get_event_loop_service, run_async
+from libs.ipmi_sessions import get_ipmi_session_manager
+from libs.circuit_breaker import CircuitOpenError, get_host_health
 
 logger = logging.getLogger(__name__)
 
+# Shared executor for IPMI sweeps, sized by the configured concurrency limit
+_sweep_executor = None
+_sweep_executor_size = 0
+_sweep_lock = threading.RLock()
+
+# In-flight power checks keyed by BMC address, so a dead BMC that outlives one
+# sweep deadline is not queried again by the next sweep
+_inflight_checks = {}
+
+# Last power state each BMC reported, shown while its circuit is open
+_last_power_states = {}
+
+def _parse_power_status(hostname, output):
+    """Map ipmitool chassis power status output to 'on', 'off' or 'unknown', remembering it for the BMC"""
+    if 'Chassis Power is on' in output:
+        logger.info(f"{hostname}: Power is ON")
+        status = 'on'
+    elif 'Chassis Power is off' in output:
+        logger.info(f"{hostname}: Power is OFF")
+        status = 'off'
+    else:
+        logger.warning(f"{hostname}: Unknown power status: {output}")
+        status = 'unknown'
+    _last_power_states[hostname] = status
+    return status
+
+def _last_power_status(hostname, error):
+    """Get the state a BMC whose circuit is open last reported, or 'timeout' if it never answered"""
+    logger.debug(f"Skipping IPMI power check: {error}")
+    return _last_power_states.get(hostname, 'timeout')
+
+def _run_ipmitool(hostname, cmd, timeout):
+    """Run a one-shot ipmitool command, failing fast if the BMC keeps failing"""
+    breaker = get_host_health().breaker('ipmi', hostname)
+    breaker.check()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        breaker.record_failure(e)
+        raise
+    except BaseException:
+        breaker.record_abandoned()
+        raise
+    if result.returncode == 0:
+        breaker.record_success()
+    else:
+        breaker.record_failure(result.stderr.strip())
+    return result
+
+async def get_power_status_async(hostname, username, password, ipmitool_path='ipmitool'):
+    """Check the power status of a host over its persistent IPMI session"""
+    try:
+        output, errors = await get_ipmi_session_manager().run(
+            ipmitool_path, hostname, username, password,
+            'chassis power status',
+            timeout=10
+        )
+        
+        if output.strip():
+            return _parse_power_status(hostname, output.strip())
+        else:
+            logger.error(f"IPMI command failed for {hostname}: {errors}")
+            return 'error'
+            
+    except CircuitOpenError as e:
+        return _last_power_status(hostname, e)
+    except asyncio.TimeoutError:
+        logger.error(f"IPMI timeout for {hostname}")
+        return 'timeout'
+    except FileNotFoundError:
+        logger.error(f"ipmitool not found at path: {ipmitool_path}")
+        return 'error'
+    except Exception as e:
+        logger.error(f"Error checking power status for {hostname}: {e}")
+        return 'error'
+
 def get_power_status(hostname, username, password, ipmitool_path='ipmitool'):
     """Check the power status of a host via IPMI"""
+    if get_ipmi_session_manager().enabled:
+        return run_async(get_power_status_async(hostname, username, password, ipmitool_path))
+    
     try:
         cmd = [
             ipmitool_path, '-I', 'lanplus', 
@@ -17,23 +102,16 @@ def get_power_status(hostname, username, password, ipmitool_path='ipmitool'):
         ]
         
         logger.info(f"Checking power status for {hostname}")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        result = _run_ipmitool(hostname, cmd, 10)
         
         if result.returncode == 0:
-            output = result.stdout.strip()
-            if 'Chassis Power is on' in output:
-                logger.info(f"{hostname}: Power is ON")
-                return 'on'
-            elif 'Chassis Power is off' in output:
-                logger.info(f"{hostname}: Power is OFF")
-                return 'off'
-            else:
-                logger.warning(f"{hostname}: Unknown power status: {output}")
-                return 'unknown'
+            return _parse_power_status(hostname, result.stdout.strip())
         else:
             logger.error(f"IPMI command failed for {hostname}: {result.stderr}")
             return 'error'
             
+    except CircuitOpenError as e:
+        return _last_power_status(hostname, e)
     except subprocess.TimeoutExpired:
         logger.error(f"IPMI timeout for {hostname}")
         return 'timeout'
@@ -44,8 +122,41 @@ def get_power_status(hostname, username, password, ipmitool_path='ipmitool'):
         logger.error(f"Error checking power status for {hostname}: {e}")
         return 'error'
 
+async def power_on_host_async(hostname, username, password, ipmitool_path='ipmitool'):
+    """Power on a host over its persistent IPMI session"""
+    try:
+        logger.info(f"Powering on {hostname}")
+        output, errors = await get_ipmi_session_manager().run(
+            ipmitool_path, hostname, username, password,
+            'chassis power on',
+            timeout=15
+        )
+        
+        if 'Chassis Power Control' in output:
+            logger.info(f"{hostname}: Power on command successful")
+            return {'success': True, 'message': 'Power on command sent successfully'}
+        else:
+            logger.error(f"Power on command failed for {hostname}: {errors}")
+            return {'success': False, 'message': f'Power on failed: {errors}'}
+            
+    except CircuitOpenError as e:
+        logger.warning(f"Power on skipped: {e}")
+        return {'success': False, 'message': f'BMC unreachable, retrying in {e.retry_in:.0f}s'}
+    except asyncio.TimeoutError:
+        logger.error(f"Power on timeout for {hostname}")
+        return {'success': False, 'message': 'Command timeout'}
+    except FileNotFoundError:
+        logger.error(f"ipmitool not found at path: {ipmitool_path}")
+        return {'success': False, 'message': 'ipmitool not found'}
+    except Exception as e:
+        logger.error(f"Error powering on {hostname}: {e}")
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
 def power_on_host(hostname, username, password, ipmitool_path='ipmitool'):
     """Power on a host via IPMI"""
+    if get_ipmi_session_manager().enabled:
+        return run_async(power_on_host_async(hostname, username, password, ipmitool_path))
+    
     try:
         cmd = [
             ipmitool_path, '-I', 'lanplus', 
@@ -56,7 +167,7 @@ def power_on_host(hostname, username, password, ipmitool_path='ipmitool'):
         ]
         
         logger.info(f"Powering on {hostname}")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+        result = _run_ipmitool(hostname, cmd, 15)
         
         if result.returncode == 0:
             logger.info(f"{hostname}: Power on command successful")
@@ -65,6 +176,9 @@ def power_on_host(hostname, username, password, ipmitool_path='ipmitool'):
             logger.error(f"Power on command failed for {hostname}: {result.stderr}")
             return {'success': False, 'message': f'Power on failed: {result.stderr}'}
             
+    except CircuitOpenError as e:
+        logger.warning(f"Power on skipped: {e}")
+        return {'success': False, 'message': f'BMC unreachable, retrying in {e.retry_in:.0f}s'}
     except subprocess.TimeoutExpired:
         logger.error(f"Power on timeout for {hostname}")
         return {'success': False, 'message': 'Command timeout'}
@@ -73,4 +187,98 @@ def power_on_host(hostname, username, password, ipmitool_path='ipmitool'):
         return {'success': False, 'message': 'ipmitool not found'}
     except Exception as e:
         logger.error(f"Error powering on {hostname}: {e}")
-        return {'success': False, 'message': f'Error: {str(e)}'}
\ No newline at end of file
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+def _get_sweep_executor(max_concurrency):
+    """Get the shared IPMI sweep executor, resizing it if the limit changed"""
+    global _sweep_executor, _sweep_executor_size
+    if _sweep_executor is None or _sweep_executor_size != max_concurrency:
+        if _sweep_executor is not None:
+            # Let checks already running on the old executor finish in the background
+            _sweep_executor.shutdown(wait=False)
+        _sweep_executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='ipmi-sweep')
+        _sweep_executor_size = max_concurrency
+    return _sweep_executor
+
+def _forget_inflight(ipmi_host, future):
+    """Drop a finished power check from the in-flight table"""
+    with _sweep_lock:
+        if _inflight_checks.get(ipmi_host) is future:
+            del _inflight_checks[ipmi_host]
+
+def submit_power_check(host, ipmitool_path='ipmitool', max_concurrency=10):
+    """
+    Queue a power status check for one host on the shared IPMI executor.
+    
+    Returns a concurrent.futures.Future resolving to the power status, or None
+    if the host has no IPMI credentials configured. A check that is already in
+    flight for the same BMC is shared rather than started again.
+    """
+    ipmi_host = host.get('ipmi_host')
+    ipmi_username = host.get('ipmi_username')
+    ipmi_password = host.get('ipmi_password')
+    
+    if not (ipmi_host and ipmi_username and ipmi_password):
+        return None
+    
+    with _sweep_lock:
+        future = _inflight_checks.get(ipmi_host)
+        if future is None:
+            session_manager = get_ipmi_session_manager()
+            if session_manager.enabled:
+                # Persistent sessions are driven from the event loop, which also
+                # bounds concurrency, so no thread is tied up per check
+                session_manager.configure(max_concurrency=max_concurrency)
+                future = get_event_loop_service().submit(
+                    get_power_status_async(ipmi_host, ipmi_username, ipmi_password, ipmitool_path))
+            else:
+                executor = _get_sweep_executor(max(1, int(max_concurrency)))
+                future = executor.submit(get_power_status, ipmi_host, ipmi_username, ipmi_password, ipmitool_path)
+            _inflight_checks[ipmi_host] = future
+            future.add_done_callback(lambda f, h=ipmi_host: _forget_inflight(h, f))
+        return future
+
+def get_power_statuses(hosts, ipmitool_path='ipmitool', max_concurrency=10, sweep_timeout=5):
+    """
+    Check the power status of multiple hosts concurrently.
+    
+    At most max_concurrency IPMI commands run at once, and the sweep
+    returns after sweep_timeout seconds even if some BMCs have not answered.
+    Those hosts are reported as 'pending' while their check keeps running in
+    the background; a check that hits its own ipmitool timeout reports 'timeout'.
+    Hosts whose BMC is failing fast report the power state it last returned.
+    
+    Args:
+        hosts (list): Host configurations from config.json
+        ipmitool_path (str): Path to the ipmitool binary
+        max_concurrency (int): Maximum number of concurrent IPMI checks
+        sweep_timeout (float): Deadline in seconds for the whole sweep
+        
+    Returns:
+        list: Power status strings in the same order as hosts
+    """
+    statuses = [None] * len(hosts)
+    futures = {}
+    
+    for index, host in enumerate(hosts):
+        future = submit_power_check(host, ipmitool_path, max_concurrency)
+        if future is None:
+            statuses[index] = 'config_error'
+        else:
+            futures[index] = future
+    
+    if futures:
+        wait(list(futures.values()), timeout=sweep_timeout)
+    
+    for index, future in futures.items():
+        if future.done():
+            try:
+                statuses[index] = future.result()
+            except Exception as e:
+                logger.error(f"Error collecting power status for {hosts[index].get('ipmi_host')}: {e}")
+                statuses[index] = 'error'
+        else:
+            logger.warning(f"IPMI sweep deadline reached before {hosts[index].get('ipmi_host')} answered")
+            statuses[index] = 'pending'
+    
+    return statuses
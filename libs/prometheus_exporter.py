@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import time
+from libs.config_utils import get_host_key
+from libs.gpu_telemetry import merge_gpu_sample
+from libs.docker_stats import summarize_container_stats
+from libs.instrumentation import render_family, render_instrumentation
+
+# Per-GPU families: (record field, metric name, help text, scale to base units)
+_GPU_FAMILIES = [
+    ('utilization_gpu', 'mycontrol_gpu_utilization_percent', 'GPU core utilization', 1),
+    ('utilization_memory', 'mycontrol_gpu_memory_utilization_percent', 'GPU memory controller utilization', 1),
+    ('memory_used', 'mycontrol_gpu_memory_used_bytes', 'GPU memory in use', 1024 * 1024),
+    ('memory_total', 'mycontrol_gpu_memory_total_bytes', 'Total GPU memory', 1024 * 1024),
+    ('temperature', 'mycontrol_gpu_temperature_celsius', 'GPU core temperature', 1),
+    ('power_draw', 'mycontrol_gpu_power_draw_watts', 'GPU power draw', 1),
+    ('power_limit', 'mycontrol_gpu_power_limit_watts', 'GPU power limit', 1),
+    ('clock_sm', 'mycontrol_gpu_sm_clock_hertz', 'GPU SM clock', 1000000),
+    ('clock_mem', 'mycontrol_gpu_memory_clock_hertz', 'GPU memory clock', 1000000),
+    ('fan_speed', 'mycontrol_gpu_fan_speed_percent', 'GPU fan speed', 1)
+]
+
+def _value(entry):
+    """Get the collected value of a cached entry, or None"""
+    return entry['value'] if entry is not None else None
+
+def _gpu_records(host_key, metrics_entry, telemetry_manager):
+    """Get the freshest GPU records for a host: telemetry stream first, then the last query"""
+    telemetry = telemetry_manager.get(host_key)
+    polled = _value(metrics_entry)
+    polled_gpus = polled.get('gpus') if polled and polled.get('success') else None
+    if telemetry is not None:
+        sample = telemetry.latest()
+        if telemetry.is_fresh(sample):
+            return merge_gpu_sample(sample, polled_gpus)['gpus']
+    return polled_gpus or []
+
+def render_metrics(config, state, telemetry_manager, ssh_pool, ipmi_session_manager, docker_stats_manager=None, host_health=None):
+    """
+    Render fleet and internal metrics in Prometheus text exposition format.
+
+    Everything is read from cached collector state, so a scrape never
+    contacts a host.
+    """
+    families = {}
+
+    def add(name, help_text, metric_type, labels, value):
+        if value is None:
+            return
+        families.setdefault(name, (help_text, metric_type, []))[2].append((labels, value))
+
+    now = time.time()
+    for host in config.get('hosts', []):
+        host_key = get_host_key(host)
+        if not host_key:
+            continue
+        labels = {'host': host_key, 'name': host.get('name', host_key)}
+        entries = state.get_host(host_key)
+
+        for metric, entry in entries.items():
+            add('mycontrol_collection_age_seconds', 'Seconds since a metric was last collected',
+                'gauge', dict(labels, metric=metric), round(now - entry['updated'], 3))
+
+        power = _value(entries.get('power'))
+        if power in ('on', 'off'):
+            add('mycontrol_host_power_on', 'Chassis power state from IPMI (1 = on)', 'gauge', labels, power == 'on')
+
+        ping = _value(entries.get('ping'))
+        if ping and ping.get('success'):
+            add('mycontrol_host_up', 'Host answers reachability probes (1 = online)', 'gauge', labels, ping.get('status') == 'online')
+            if ping.get('rtt_ms') is not None:
+                add('mycontrol_host_ping_rtt_seconds', 'Last reachability probe round trip time', 'gauge', labels, round(ping['rtt_ms'] / 1000, 6))
+            if ping.get('jitter_ms') is not None:
+                add('mycontrol_host_ping_jitter_seconds', 'Reachability probe jitter over the sliding window', 'gauge', labels, round(ping['jitter_ms'] / 1000, 6))
+            if ping.get('loss') is not None:
+                add('mycontrol_host_ping_loss_ratio', 'Reachability probe loss over the sliding window', 'gauge', labels, round(ping['loss'] / 100, 4))
+
+        uptime = _value(entries.get('uptime'))
+        if uptime and uptime.get('success'):
+            add('mycontrol_host_uptime_seconds', 'Host uptime from the uptime command', 'gauge', labels, uptime.get('uptime_seconds'))
+            for window in ('1', '5', '15'):
+                add(f'mycontrol_host_load{window}', f'{window} minute load average', 'gauge', labels, uptime.get(f'load{window}'))
+
+        docker = _value(entries.get('docker'))
+        if docker and docker.get('success') and 'containers' in docker:
+            add('mycontrol_containers_running', 'Running Docker containers', 'gauge', labels, docker['containers']['running'])
+            add('mycontrol_containers', 'Docker containers in any state', 'gauge', labels, docker['containers']['total'])
+
+        container_stats = docker_stats_manager.get(host_key) if docker_stats_manager is not None else None
+        if container_stats is not None:
+            summary = summarize_container_stats(container_stats.get_stats())
+            if summary['containers']:
+                add('mycontrol_containers_cpu_percent', 'CPU used by all running containers (100 = one core)', 'gauge', labels, summary['cpu_percent'])
+                add('mycontrol_containers_memory_used_bytes', 'Memory used by all running containers', 'gauge', labels, summary['memory_used'])
+
+        for gpu in _gpu_records(host_key, entries.get('gpu_metrics'), telemetry_manager):
+            gpu_labels = dict(labels, gpu=gpu['index'], uuid=gpu['uuid'], model=gpu['name'])
+            for field, name, help_text, scale in _GPU_FAMILIES:
+                if gpu.get(field) is not None:
+                    add(name, help_text, 'gauge', gpu_labels, gpu[field] * scale)
+            add('mycontrol_gpu_processes', 'Compute processes running on the GPU', 'gauge', gpu_labels, len(gpu.get('processes', [])))
+
+        telemetry = telemetry_manager.get(host_key)
+        if telemetry is not None:
+            status = telemetry.get_status()
+            add('mycontrol_gpu_telemetry_connected', 'GPU telemetry stream is connected (1 = connected)', 'gauge', labels, status['connected'])
+            add('mycontrol_gpu_telemetry_restarts_total', 'GPU telemetry stream restarts', 'counter', labels, status['restarts'])
+
+    for target, stats in ssh_pool.get_stats().items():
+        add('mycontrol_ssh_pool_connections', 'Open pooled SSH connections', 'gauge', {'target': target}, stats['connections'])
+        add('mycontrol_ssh_pool_channels', 'SSH channels in use on pooled connections', 'gauge', {'target': target}, stats['channels'])
+
+    ipmi_sessions = ipmi_session_manager.get_stats()
+    add('mycontrol_ipmi_sessions', 'Open persistent IPMI shell sessions', 'gauge', {}, len(ipmi_sessions))
+    for bmc, stats in ipmi_sessions.items():
+        add('mycontrol_ipmi_session_commands', 'Commands run over the current IPMI session', 'gauge', {'bmc': bmc}, stats['commands'])
+
+    if host_health is not None:
+        for (channel, target), status in host_health.get_stats().items():
+            labels = {'channel': channel, 'target': target}
+            add('mycontrol_circuit_open', 'Calls to the target over the channel are failing fast (1 = open or half-open)', 'gauge', labels, status['state'] != 'closed')
+            add('mycontrol_circuit_failures', 'Consecutive failures reaching the target over the channel', 'gauge', labels, status['failures'])
+
+    lines = []
+    for name, (help_text, metric_type, samples) in families.items():
+        lines.extend(render_family(name, help_text, metric_type, samples))
+    lines.extend(render_instrumentation())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+import logging
+from libs.ssh_pool import get_ssh_pool
+
+logger = logging.getLogger(__name__)
+
+class RemoteStream:
+    """
+    Runs a long-lived command on a host over a pooled SSH connection.
+
+    Each stdout line is passed to on_line as it arrives, and on_start (if
+    given) is called each time the command is (re)started. When the command
+    exits or the connection drops, it is restarted with exponential backoff.
+    Must be started and stopped on the shared event loop.
+    """
+
+    def __init__(self, ssh_host, ssh_username, ssh_password, command, on_line,
+                 name=None, min_backoff=1, max_backoff=60, on_start=None):
+        self.ssh_host = ssh_host
+        self.ssh_username = ssh_username
+        self.ssh_password = ssh_password
+        self.command = command
+        self.on_line = on_line
+        self.on_start = on_start
+        self.name = name or f'{command} on {ssh_host}'
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connected = False
+        self.restarts = 0
+        self.last_error = None
+        self.last_line = None
+        self._task = None
+
+    def start(self):
+        """Start streaming if not already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        """Stop streaming; closing the channel ends the remote command"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def is_running(self):
+        """Check whether the stream task is active (connected or waiting to restart)"""
+        return self._task is not None and not self._task.done()
+
+    async def _run_once(self):
+        """Run the command until it exits, feeding its output to on_line"""
+        async with get_ssh_pool().connection(self.ssh_host, self.ssh_username, self.ssh_password) as conn:
+            process = await conn.create_process(self.command)
+            try:
+                self.connected = True
+                logger.info(f"Started {self.name}")
+                if self.on_start is not None:
+                    self.on_start()
+                async for line in process.stdout:
+                    self.last_line = time.time()
+                    try:
+                        self.on_line(line.rstrip('\r\n'))
+                    except Exception as e:
+                        logger.error(f"Error handling output of {self.name}: {e}")
+                await process.wait()
+                errors = (await process.stderr.read()).strip()
+                return f'exited with status {process.exit_status}' + (f': {errors}' if errors else '')
+            finally:
+                self.connected = False
+                process.close()
+
+    async def _run(self):
+        """Keep the command running, restarting it with backoff when it stops"""
+        backoff = self.min_backoff
+        while True:
+            started = time.monotonic()
+            try:
+                self.last_error = await self._run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+
+            # A stream that stayed up for a while starts over with a short backoff
+            if time.monotonic() - started > self.max_backoff:
+                backoff = self.min_backoff
+            logger.warning(f"{self.name} stopped ({self.last_error}), restarting in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            self.restarts += 1
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+import logging
+from libs.deadlines import Deadline, budget, within
+from libs.instrumentation import PROBES_COALESCED
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Shares one execution between identical concurrent calls, and caches the result briefly.
+
+    Callers asking for a key that is already running wait for that run
+    instead of starting another. Results accepted by `cache_if` are then
+    served for `ttl` seconds. Errors are shared with the callers already
+    waiting, but never cached. Must be used on the shared event loop.
+
+    The shared run does not inherit any caller's deadline; each caller
+    waits for it only as long as its own deadline allows.
+    """
+
+    def __init__(self, name, ttl=0, cache_if=None):
+        self.name = name
+        self.ttl = ttl
+        self.cache_if = cache_if
+        self._inflight = {}
+        # key -> (expiry, result)
+        self._results = {}
+
+    async def run(self, key, factory, timeout=None):
+        """
+        Get the result for `key`, calling factory() for a new coroutine only if nothing can be shared.
+
+        A new run gets a deadline of its own `timeout` seconds (None for no
+        deadline). Raises asyncio.TimeoutError if the caller's deadline
+        expires first; the run carries on for the others.
+        """
+        cached = self._results.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                PROBES_COALESCED.inc(probe=self.name, source='cache')
+                return cached[1]
+            del self._results[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(within(Deadline(timeout) if timeout is not None else None, factory()))
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished: self._finished(key, finished))
+        else:
+            PROBES_COALESCED.inc(probe=self.name, source='in_flight')
+        # A caller that gives up must not cancel the run for the others
+        return await asyncio.wait_for(asyncio.shield(task), budget())
+
+    def _finished(self, key, task):
+        """Stop sharing a finished run and cache its result if allowed"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None or not self.ttl:
+            return
+        result = task.result()
+        if self.cache_if is None or self.cache_if(result):
+            now = time.monotonic()
+            self._results = {k: v for k, v in self._results.items() if v[0] > now}
+            self._results[key] = (now + self.ttl, result)
+
+    def invalidate(self, match=None):
+        """Drop cached results, or only those whose key satisfies match(key); runs in flight are kept"""
+        if match is None:
+            self._results.clear()
+        else:
+            self._results = {k: v for k, v in self._results.items() if not match(k)}
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+import asyncio
+import asyncssh
+import time
+import logging
+from contextlib import asynccontextmanager
+from libs.single_flight import SingleFlight
+from libs.circuit_breaker import get_host_health
+from libs.deadlines import budget, current_deadline, record_timeout
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean a pooled connection has gone away underneath us
+_STALE_CONNECTION_ERRORS = (asyncssh.ConnectionLost, asyncssh.DisconnectError, asyncssh.ChannelOpenError, BrokenPipeError, ConnectionResetError)
+
+class SSHTimeoutError(asyncio.TimeoutError):
+    """An SSH stage (connect, auth, channel or command) ran out of time"""
+
+    def __init__(self, stage, ssh_host, timeout, by_deadline=False):
+        self.stage = stage
+        self.ssh_host = ssh_host
+        self.timeout = timeout
+        # The caller's deadline ran out rather than the stage's own budget
+        self.by_deadline = by_deadline
+        super().__init__(f'SSH {stage} to {ssh_host} timed out after {timeout:.1f}s')
+
+def _stage_timeout(stage, ssh_host, timeout):
+    """Report a stage that ran out of time and build the error to raise"""
+    record_timeout(stage, ssh_host, timeout)
+    deadline = current_deadline()
+    return SSHTimeoutError(stage, ssh_host, timeout, deadline is not None and deadline.expired())
+
+class _HandshakeTracker(asyncssh.SSHClient):
+    """Notes when the TCP connection is up, so connect and auth can have separate budgets"""
+
+    def __init__(self):
+        self.connected = asyncio.Event()
+
+    def connection_made(self, conn):
+        self.connected.set()
+
+class _PooledConnection:
+    """An authenticated SSH connection and its channel bookkeeping"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.channels = 0
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+    def is_alive(self):
+        """Check whether the underlying connection is still open"""
+        return not self.conn.is_closed()
+
+class SSHConnectionPool:
+    """
+    Keeps authenticated asyncssh connections alive and shares them between callers.
+    
+    All methods are coroutines and must run on the shared event loop service.
+    """
+
+    def __init__(self, max_connections_per_host=2, max_channels_per_connection=8,
+                 idle_timeout=300, keepalive_interval=30, shared_result_ttl=2, connect_timeout=5, auth_timeout=10):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_channels_per_connection = max_channels_per_connection
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        # Budgets for the TCP connect and for key exchange plus authentication
+        self.connect_timeout = connect_timeout
+        self.auth_timeout = auth_timeout
+        # Pools are keyed by (host, username, password) so changed credentials
+        # never reuse a connection authenticated with the old ones
+        self._pools = {}
+        self._conditions = {}
+        # Connections being opened per pool key, counted against max_connections_per_host
+        self._opening = {}
+        self._maintenance_task = None
+        # Read-only probes shared between identical concurrent callers; only successful runs are cached
+        self._shared = SingleFlight('ssh', ttl=shared_result_ttl, cache_if=lambda result: result.exit_status == 0)
+
+    def configure(self, max_connections_per_host=None, max_channels_per_connection=None,
+                  idle_timeout=None, keepalive_interval=None, shared_result_ttl=None, connect_timeout=None, auth_timeout=None):
+        """Update pool limits; existing connections pick them up on next use"""
+        if max_connections_per_host is not None:
+            self.max_connections_per_host = max(1, int(max_connections_per_host))
+        if max_channels_per_connection is not None:
+            self.max_channels_per_connection = max(1, int(max_channels_per_connection))
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+        if keepalive_interval is not None:
+            self.keepalive_interval = keepalive_interval
+        if shared_result_ttl is not None:
+            self._shared.ttl = shared_result_ttl
+        if connect_timeout is not None:
+            self.connect_timeout = connect_timeout
+        if auth_timeout is not None:
+            self.auth_timeout = auth_timeout
+
+    def _ensure_maintenance(self):
+        """Start the periodic idle eviction and health check task on first use"""
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.ensure_future(self._maintenance())
+
+    async def _maintenance(self):
+        """Evict idle or dead connections at the keepalive interval"""
+        while True:
+            await asyncio.sleep(max(1, min(self.keepalive_interval, self.idle_timeout)))
+            now = time.monotonic()
+            for key, entries in list(self._pools.items()):
+                for entry in list(entries):
+                    if not entry.is_alive():
+                        logger.info(f"Dropping dead SSH connection to {key[0]}")
+                        entries.remove(entry)
+                    elif entry.channels == 0 and now - entry.last_used > self.idle_timeout:
+                        logger.info(f"Closing idle SSH connection to {key[0]}")
+                        entries.remove(entry)
+                        entry.conn.close()
+                if not entries:
+                    del self._pools[key]
+
+    async def _open_connection(self, ssh_host, ssh_username, ssh_password):
+        """
+        Open and authenticate a new SSH connection.
+
+        Raises CircuitOpenError without connecting to a host that keeps failing.
+        Rejected credentials do not count against the host, since it answered.
+        """
+        breaker = get_host_health().breaker('ssh', ssh_host)
+        breaker.check()
+        logger.info(f"Opening SSH connection to {ssh_username}@{ssh_host}")
+        try:
+            conn = await self._connect(ssh_host, ssh_username, ssh_password)
+        except asyncssh.PermissionDenied:
+            breaker.record_success()
+            raise
+        except SSHTimeoutError as e:
+            # Running out of the caller's time says nothing about the host
+            if e.by_deadline:
+                breaker.record_abandoned()
+            else:
+                breaker.record_failure(e)
+            raise
+        except (OSError, asyncio.TimeoutError, asyncssh.Error) as e:
+            breaker.record_failure(e)
+            raise
+        except BaseException:
+            breaker.record_abandoned()
+            raise
+        breaker.record_success()
+        return _PooledConnection(conn)
+
+    async def _connect(self, ssh_host, ssh_username, ssh_password):
+        """Connect within connect_timeout, then complete key exchange and auth within auth_timeout"""
+        tracker = _HandshakeTracker()
+        connecting = asyncio.ensure_future(asyncssh.connect(
+            ssh_host,
+            username=ssh_username,
+            password=ssh_password,
+            known_hosts=None,
+            client_keys=None,
+            client_factory=lambda: tracker,
+            keepalive_interval=self.keepalive_interval,
+            keepalive_count_max=3
+        ))
+        connected = asyncio.ensure_future(tracker.connected.wait())
+        try:
+            timeout = budget(self.connect_timeout)
+            await asyncio.wait([connecting, connected], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not connecting.done() and not connected.done():
+                raise _stage_timeout('connect', ssh_host, timeout)
+
+            timeout = budget(self.auth_timeout)
+            try:
+                return await asyncio.wait_for(asyncio.shield(connecting), timeout)
+            except asyncio.TimeoutError:
+                raise _stage_timeout('auth', ssh_host, timeout) from None
+        finally:
+            connected.cancel()
+            # Abandons the handshake if a budget ran out or the caller gave up
+            connecting.cancel()
+
+    async def _acquire(self, ssh_host, ssh_username, ssh_password):
+        """Reserve a channel slot on a healthy connection, opening one if needed"""
+        self._ensure_maintenance()
+        key = (ssh_host, ssh_username, ssh_password)
+        condition = self._conditions.setdefault(key, asyncio.Condition())
+
+        async with condition:
+            while True:
+                entries = self._pools.setdefault(key, [])
+
+                # Drop connections that closed since they were last used
+                entries[:] = [entry for entry in entries if entry.is_alive()]
+
+                # Prefer the least busy live connection with a free channel
+                available = [entry for entry in entries if entry.channels < self.max_channels_per_connection]
+                if available:
+                    entry = min(available, key=lambda e: e.channels)
+                    entry.channels += 1
+                    return entry
+
+                if len(entries) + self._opening.get(key, 0) < self.max_connections_per_host:
+                    # Reserve the slot, then connect without holding the lock
+                    self._opening[key] = self._opening.get(key, 0) + 1
+                    break
+
+                # Every connection is saturated or still opening, wait for a change
+                timeout = budget()
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout)
+                except asyncio.TimeoutError:
+                    raise _stage_timeout('channel', ssh_host, timeout) from None
+
+        entry = None
+        try:
+            entry = await self._open_connection(ssh_host, ssh_username, ssh_password)
+        finally:
+            async with condition:
+                self._opening[key] -= 1
+                if not self._opening[key]:
+                    del self._opening[key]
+                if entry is not None:
+                    entry.channels += 1
+                    self._pools.setdefault(key, []).append(entry)
+                # Waiters can use the new connection's spare channels, or retry opening after a failure
+                condition.notify_all()
+        return entry
+
+    async def _release(self, ssh_host, ssh_username, ssh_password, entry, discard=False):
+        """Return a channel slot to the pool"""
+        key = (ssh_host, ssh_username, ssh_password)
+        condition = self._conditions.setdefault(key, asyncio.Condition())
+        async with condition:
+            entry.channels -= 1
+            entry.last_used = time.monotonic()
+            if discard or not entry.is_alive():
+                entries = self._pools.get(key, [])
+                if entry in entries:
+                    entries.remove(entry)
+                entry.conn.close()
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def connection(self, ssh_host, ssh_username, ssh_password):
+        """Borrow a pooled connection for the duration of the block"""
+        entry = await self._acquire(ssh_host, ssh_username, ssh_password)
+        discard = False
+        try:
+            yield entry.conn
+        except _STALE_CONNECTION_ERRORS:
+            discard = True
+            raise
+        finally:
+            await self._release(ssh_host, ssh_username, ssh_password, entry, discard)
+
+    @asynccontextmanager
+    async def dedicated_connection(self, ssh_host, ssh_username, ssh_password):
+        """
+        Open a connection of its own for the duration of the block.
+
+        For long-lived sessions such as web terminals: the connection does
+        not count against max_connections_per_host or max_channels_per_connection,
+        so holding it open never makes pooled commands wait.
+        """
+        entry = await self._open_connection(ssh_host, ssh_username, ssh_password)
+        try:
+            yield entry.conn
+        finally:
+            entry.conn.close()
+
+    async def run(self, ssh_host, ssh_username, ssh_password, command, timeout=None, check=False):
+        """
+        Run a command over a pooled connection, reconnecting once if it went stale.
+
+        `timeout` bounds the command itself; connecting and authenticating have
+        their own budgets, and the current deadline, if any, caps them all.
+        """
+        for attempt in range(2):
+            connected = False
+            try:
+                async with self.connection(ssh_host, ssh_username, ssh_password) as conn:
+                    connected = True
+                    command_timeout = budget(timeout)
+                    try:
+                        return await asyncio.wait_for(conn.run(command, check=check), timeout=command_timeout)
+                    except asyncio.TimeoutError:
+                        raise _stage_timeout('command', ssh_host, command_timeout) from None
+            except _STALE_CONNECTION_ERRORS as e:
+                # Connect and auth failures are not retried, only dropped connections
+                if attempt or not connected:
+                    raise
+                logger.warning(f"Pooled SSH connection to {ssh_host} failed ({e}), reconnecting")
+
+    async def run_shared(self, ssh_host, ssh_username, ssh_password, command, timeout=None):
+        """
+        Run a read-only command, sharing the run with identical concurrent callers.
+
+        Callers asking for the same command on the same host while it runs, or
+        up to shared_result_ttl seconds after it succeeded, get the same result.
+        The shared run is bounded by `timeout` plus the connect and auth budgets,
+        never by a caller's deadline; each caller stops waiting at its own.
+        """
+        limit = None if timeout is None else self.connect_timeout + self.auth_timeout + timeout
+        # What this caller may wait: its own deadline, or else the shared run's limit
+        applied = budget(limit)
+        started = time.monotonic()
+        try:
+            return await self._shared.run(
+                (ssh_host, ssh_username, command),
+                lambda: self.run(ssh_host, ssh_username, ssh_password, command, timeout=timeout),
+                timeout=limit
+            )
+        except SSHTimeoutError:
+            raise
+        except asyncio.TimeoutError:
+            # This caller's deadline ran out while the shared run goes on, or the
+            # run failed with a timeout of its own; callers without a deadline
+            # have no budget, so report how long they waited
+            raise _stage_timeout('command', ssh_host, applied if applied is not None else time.monotonic() - started) from None
+
+    def invalidate_shared(self, ssh_host):
+        """Forget shared results for a host, e.g. after changing its state"""
+        self._shared.invalidate(lambda key: key[0] == ssh_host)
+
+    def get_stats(self):
+        """Get the number of pooled connections and open channels per host"""
+        stats = {}
+        for (host, username, _), entries in list(self._pools.items()):
+            host_stats = stats.setdefault(f'{username}@{host}', {'connections': 0, 'channels': 0})
+            host_stats['connections'] += len(entries)
+            host_stats['channels'] += sum(entry.channels for entry in entries)
+        return stats
+
+# Global instance shared by all SSH-backed helpers
+_ssh_pool = SSHConnectionPool()
+
+def get_ssh_pool():
+    """Get the shared SSH connection pool"""
+    return _ssh_pool
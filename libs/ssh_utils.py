@@ -2,77 +2,46 @@
 
 import asyncio
 import asyncssh
-from concurrent.futures import ThreadPoolExecutor
 import logging
+import re
+from libs.ssh_pool import get_ssh_pool
 
 logger = logging.getLogger(__name__)
 
 async def get_ssh_uptime(ssh_host, ssh_username, ssh_password, timeout=10):
-    """Get uptime via SSH connection"""
-    try:
-        async with asyncssh.connect(
-            ssh_host,
-            username=ssh_username,
-            password=ssh_password,
-            known_hosts=None,
-            client_keys=None
-        ) as conn:
-            result = await asyncio.wait_for(
-                conn.run('uptime', check=True),
-                timeout=timeout
-            )
-            return result.stdout.strip()
-    except asyncio.TimeoutError:
+    """Get uptime via a pooled SSH connection; raises if it could not be read"""
+    result = await get_ssh_pool().run(ssh_host, ssh_username, ssh_password, 'uptime', timeout=timeout, check=True)
+    return result.stdout.strip()
+
+def describe_uptime_error(error):
+    """Turn an exception from get_ssh_uptime() into the text shown in place of the uptime"""
+    if isinstance(error, asyncio.TimeoutError):
         return 'SSH timeout'
-    except asyncssh.Error as e:
-        return f'SSH error: {str(e)}'
-    except Exception as e:
-        return f'Error: {str(e)}'
+    if isinstance(error, asyncssh.Error):
+        return f'SSH error: {str(error)}'
+    return f'Error: {str(error)}'
 
-def get_uptime_sync(ssh_host, ssh_username, ssh_password, timeout=10):
-    """Synchronous wrapper for async SSH uptime"""
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(
-            get_ssh_uptime(ssh_host, ssh_username, ssh_password, timeout)
-        )
-    except Exception as e:
-        return f'Error: {str(e)}'
-    finally:
-        loop.close()
+_UPTIME_PATTERN = re.compile(r'up\s+(?:(\d+)\s+days?,\s*)?(?:(\d+):(\d+)|(\d+)\s+mins?)?')
+_LOAD_PATTERN = re.compile(r'load averages?:\s*([\d.]+),?\s+([\d.]+),?\s+([\d.]+)')
 
-def get_host_uptimes(hosts, ssh_timeout=10):
-    """Get uptime for multiple hosts in parallel"""
-    if not hosts:
-        return []
+def parse_uptime(uptime):
+    """
+    Parse `uptime` output into uptime seconds and load averages.
+    
+    Handles the Linux and macOS formats; fields that cannot be found are left out.
+    """
+    parsed = {}
+    match = _UPTIME_PATTERN.search(uptime)
+    if match and any(match.groups()):
+        days, hours, minutes, only_minutes = match.groups()
+        seconds = int(days or 0) * 86400
+        if hours is not None:
+            seconds += int(hours) * 3600 + int(minutes) * 60
+        elif only_minutes is not None:
+            seconds += int(only_minutes) * 60
+        parsed['uptime_seconds'] = seconds
     
-    with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
-        futures = []
-        
-        for host in hosts:
-            ssh_host = host.get('ssh_host')
-            ssh_username = host.get('ssh_username')
-            ssh_password = host.get('ssh_password')
-            
-            if ssh_host and ssh_username and ssh_password:
-                uptime_future = executor.submit(get_uptime_sync, ssh_host, ssh_username, ssh_password, ssh_timeout)
-            else:
-                uptime_future = None
-            
-            futures.append((host, uptime_future))
-        
-        # Collect results
-        results = []
-        for host, uptime_future in futures:
-            if uptime_future:
-                try:
-                    uptime = uptime_future.result(timeout=ssh_timeout + 1)
-                except Exception as e:
-                    uptime = f'Error: {str(e)}'
-            else:
-                uptime = 'No SSH config'
-            
-            results.append((host, uptime))
-        
-        return results
\ No newline at end of file
+    match = _LOAD_PATTERN.search(uptime)
+    if match:
+        parsed['load1'], parsed['load5'], parsed['load15'] = (float(value) for value in match.groups())
+    return parsed
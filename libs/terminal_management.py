@@ -2,139 +2,317 @@
 
 import subprocess
 import os
-import signal
+import socket
+import threading
 import time
 import tempfile
 import stat
+import uuid
 import logging
+from libs.web_terminal import WebTerminalSession
 
 # Get the app logger to ensure proper logging configuration
 logger = logging.getLogger('app')
 
+# How long a new ttyd gets to start listening, and how often its port is probed meanwhile
+TTYD_READY_TIMEOUT = 5
+TTYD_READY_POLL_INTERVAL = 0.02
+
+# Terminals older than this are no longer listed
+TERMINAL_LIST_MAX_AGE = 3600
+
+# Terminal backends: a ttyd process and port per session, or WebSocket sessions on the app's own port
+TERMINAL_BACKENDS = ('ttyd', 'websocket')
+
+class PortAllocator:
+    """Hands out ports from a fixed range, tracking which ones are in use"""
+    
+    def __init__(self, first_port, count):
+        self.first_port = first_port
+        self.count = count
+        self._in_use = set()
+    
+    def _is_bindable(self, port):
+        """Check that nothing outside this allocator is listening on a port"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(('0.0.0.0', port))
+                return True
+            except OSError:
+                return False
+    
+    def allocate(self):
+        """Reserve the lowest free port in the range, or return None if all are taken"""
+        for port in range(self.first_port, self.first_port + self.count):
+            if port not in self._in_use and self._is_bindable(port):
+                self._in_use.add(port)
+                return port
+        return None
+    
+    def release(self, port):
+        """Return a port to the range"""
+        self._in_use.discard(port)
+    
+    def in_use(self):
+        """Number of ports currently reserved"""
+        return len(self._in_use)
+
 class TerminalManager:
-    """Manages ttyd terminal processes"""
+    """
+    Manages ttyd terminal processes.
     
-    def __init__(self, ttyd_base_port=7681, local_hostname='localhost'):
-        self.ttyd_base_port = ttyd_base_port
+    Every launch is its own session, so a host can have any number of SSH
+    and nvtop terminals open at once. With the ttyd backend each session is
+    a ttyd process on its own port; it ends when ttyd exits (with --once,
+    after its client disconnects), and the process is then reaped and its
+    port reused. With the websocket backend each session is a PTY on a
+    dedicated SSH connection (outside the shared pool), served at
+    /terminal/<session_id>.
+    """
+    
+    def __init__(self, ttyd_base_port=7681, local_hostname='localhost', ttyd_port_count=1000, backend='ttyd'):
         self.local_hostname = local_hostname
-        self.ssh_processes = {}
-        self.nvtop_processes = {}
+        self.ports = PortAllocator(ttyd_base_port, ttyd_port_count)
+        self.backend = backend if backend in TERMINAL_BACKENDS else 'ttyd'
+        # Active sessions by session id
+        self.sessions = {}
+        self._lock = threading.Lock()
+        # Tool availability by version command, checked once per process
+        self._tools = {}
+        if self.backend == 'ttyd':
+            self._check_ttyd_available()
+    
+    def _check_tool_available(self, version_cmd):
+        """Check if a tool runs, remembering the answer; restart the app after installing it"""
+        key = tuple(version_cmd)
+        if key not in self._tools:
+            try:
+                subprocess.run(version_cmd, capture_output=True, check=True)
+                self._tools[key] = True
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                self._tools[key] = False
+                logger.warning(f"{version_cmd[0]} is not available; terminals that need it are disabled")
+        return self._tools[key]
     
     def _check_ttyd_available(self):
         """Check if ttyd is available"""
-        try:
-            subprocess.run(['ttyd', '--version'], capture_output=True, check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        return self._check_tool_available(['ttyd', '--version'])
     
-    def _check_sshpass_available(self):
+    def _check_sshpass_available(self, sshpass_path='sshpass'):
         """Check if sshpass is available"""
-        try:
-            subprocess.run(['sshpass', '-V'], capture_output=True, check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        return self._check_tool_available([sshpass_path, '-V'])
     
-    def _kill_existing_process(self, hostname, process_dict):
-        """Kill any existing process for a hostname"""
-        if hostname in process_dict:
+    def _end_session(self, session_id):
+        """Forget a session whose ttyd has exited, releasing its port and script; caller holds the lock"""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return
+        if session['port'] is not None:
+            self.ports.release(session['port'])
+        if session.get('script_path'):
             try:
-                os.kill(process_dict[hostname]['pid'], signal.SIGTERM)
-                time.sleep(0.5)  # Give it time to shutdown
-            except ProcessLookupError:
-                pass  # Process already dead
+                os.unlink(session['script_path'])
+            except OSError:
+                pass
     
-    def start_ssh_terminal(self, hostname, ssh_host, ssh_username=None):
-        """Start a ttyd SSH terminal"""
-        if not self._check_ttyd_available():
-            return {'success': False, 'message': 'ttyd not installed. Please install ttyd to use SSH terminals.'}
+    def _is_alive(self, session):
+        """Check whether a session's ttyd process or web terminal is still running"""
+        if session['web'] is not None:
+            return session['web'].is_alive()
+        # poll() waits on just this child without blocking, so it is reaped rather than left a zombie
+        return session['process'].poll() is None
+    
+    def _reap(self):
+        """End sessions that have exited; caller holds the lock"""
+        for session_id, session in list(self.sessions.items()):
+            if not self._is_alive(session):
+                self._end_session(session_id)
+    
+    def _terminate(self, sessions):
+        """Stop the given sessions and wait for their ttyd processes to exit"""
+        for session in sessions:
+            if session['web'] is not None:
+                session['web'].close()
+            else:
+                session['process'].terminate()
+        for session in sessions:
+            if session['web'] is None:
+                try:
+                    session['process'].wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    session['process'].kill()
+                    session['process'].wait()
+        with self._lock:
+            self._reap()
+    
+    def _wait_until_listening(self, process, port):
+        """
+        Wait until ttyd accepts connections on its port.
         
-        # Generate a unique port for this terminal session
-        terminal_port = self.ttyd_base_port + hash(hostname) % 1000
+        Returns False if the process exits first. A bare TCP connection is
+        not a terminal client, so it does not use up ttyd's --once session.
+        """
+        deadline = time.monotonic() + TTYD_READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                return False
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=TTYD_READY_POLL_INTERVAL * 5):
+                    return True
+            except OSError:
+                time.sleep(TTYD_READY_POLL_INTERVAL)
+        # Still starting after the timeout; let the browser retry rather than failing the launch
+        logger.warning(f"ttyd on port {port} is not listening after {TTYD_READY_TIMEOUT}s")
+        return process.poll() is None
+    
+    def _launch(self, kind, hostname, ssh_host, ssh_username, build_cmd, script_path=None):
+        """
+        Start ttyd on a freshly allocated port and register the session.
         
-        # Kill any existing SSH process for this host
-        self._kill_existing_process(hostname, self.ssh_processes)
+        build_cmd is called with the port and returns the ttyd command line.
+        """
+        with self._lock:
+            self._reap()
+            port = self.ports.allocate()
+        if port is None:
+            if script_path:
+                os.unlink(script_path)
+            return {'success': False, 'message': 'No free terminal ports; close some terminals and try again'}
         
+        session_id = uuid.uuid4().hex[:12]
         try:
-            if ssh_username:
-                # Use configured username, but still prompt for password
-                cmd = [
-                    'ttyd',
-                    '--port', str(terminal_port),
-                    '--interface', '0.0.0.0',  # Bind to all interfaces for remote access
-                    '--once',  # Close after one client disconnects
-                    '--writable',  # Allow keyboard input
-                    'ssh', 
-                    '-o', 'StrictHostKeyChecking=no',
-                    '-o', 'UserKnownHostsFile=/dev/null',
-                    '-o', 'LogLevel=ERROR',
-                    f'{ssh_username}@{ssh_host}'
-                ]
-            else:
-                # Fallback to manual authentication (original behavior)
-                cmd = [
-                    'ttyd',
-                    '--port', str(terminal_port),
-                    '--interface', '0.0.0.0',  # Bind to all interfaces for remote access
-                    '--once',  # Close after one client disconnects
-                    '--writable',  # Allow keyboard input
-                    'ssh', 
-                    '-o', 'StrictHostKeyChecking=no',
-                    '-o', 'UserKnownHostsFile=/dev/null',
-                    '-o', 'LogLevel=ERROR',
-                    ssh_host
-                ]
-            
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Store process info
-            self.ssh_processes[hostname] = {
-                'pid': process.pid,
-                'port': terminal_port,
+            process = subprocess.Popen(build_cmd(port), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except Exception:
+            with self._lock:
+                self.ports.release(port)
+            if script_path:
+                os.unlink(script_path)
+            raise
+        
+        # Store process info
+        with self._lock:
+            self.sessions[session_id] = {
+                'id': session_id,
+                'kind': kind,
+                'hostname': hostname,
                 'host': ssh_host,
+                'username': ssh_username,
+                'pid': process.pid,
+                'process': process,
+                'web': None,
+                'port': port,
+                'script_path': script_path,
                 'started': time.time()
             }
-            
-            # Give ttyd a moment to start up
-            time.sleep(1)
-            
-            # Check if process is still running
-            if process.poll() is not None:
-                # Process died, get error output
-                _, stderr = process.communicate()
-                return {
-                    'success': False, 
-                    'message': f'Failed to start terminal: {stderr.decode()}'
-                }
-            
-            logger.info(f"Started SSH terminal for {hostname} on port {terminal_port} with username: {ssh_username or 'manual'}")
-            
-            return {
-                'success': True,
-                'terminal_url': f'http://{self.local_hostname}:{terminal_port}',
-                'message': 'SSH terminal started successfully'
+        
+        # Return as soon as ttyd is listening
+        if not self._wait_until_listening(process, port):
+            # Process died, get error output
+            stdout, stderr = process.communicate()
+            with self._lock:
+                self._end_session(session_id)
+            logger.error(f"{kind} terminal process for {hostname} died immediately. stdout: {stdout.decode()}, stderr: {stderr.decode()}")
+            return {'success': False, 'message': f'Failed to start terminal: {stderr.decode()}'}
+        
+        return {
+            'success': True,
+            'session_id': session_id,
+            'port': port,
+            'terminal_url': f'http://{self.local_hostname}:{port}'
+        }
+    
+    def _start_web_terminal(self, kind, hostname, ssh_host, ssh_username, ssh_password, command=None, writable=True):
+        """Register a WebSocket terminal session; the PTY opens when the browser connects"""
+        if not (ssh_username and ssh_password):
+            return {'success': False, 'message': 'Browser terminals need ssh_username and ssh_password configured for the host'}
+        
+        session_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._reap()
+            self.sessions[session_id] = {
+                'id': session_id,
+                'kind': kind,
+                'hostname': hostname,
+                'host': ssh_host,
+                'username': ssh_username,
+                'pid': None,
+                'process': None,
+                'web': WebTerminalSession(session_id, ssh_host, ssh_username, ssh_password, command, writable),
+                'port': None,
+                'script_path': None,
+                'started': time.time()
             }
-            
+        logger.info(f"Created {kind} web terminal {session_id} for {hostname}")
+        return {
+            'success': True,
+            'session_id': session_id,
+            'terminal_url': f'/terminal/{session_id}'
+        }
+    
+    def get_web_session(self, session_id):
+        """Get a live WebSocket terminal session by id, or None"""
+        with self._lock:
+            self._reap()
+            session = self.sessions.get(session_id)
+        return session if session is not None and session['web'] is not None else None
+    
+    def start_ssh_terminal(self, hostname, ssh_host, ssh_username=None, ssh_password=None):
+        """Start an SSH terminal"""
+        if self.backend == 'websocket':
+            result = self._start_web_terminal('ssh', hostname, ssh_host, ssh_username, ssh_password)
+            if result['success']:
+                result['message'] = 'SSH terminal started successfully'
+            return result
+        
+        if not self._check_ttyd_available():
+            return {'success': False, 'message': 'ttyd not installed. Please install ttyd to use SSH terminals.'}
+        
+        # Use configured username, but still prompt for password; otherwise fall back to manual authentication
+        target = f'{ssh_username}@{ssh_host}' if ssh_username else ssh_host
+        
+        def build_cmd(port):
+            return [
+                'ttyd',
+                '--port', str(port),
+                '--interface', '0.0.0.0',  # Bind to all interfaces for remote access
+                '--once',  # Close after one client disconnects
+                '--writable',  # Allow keyboard input
+                'ssh',
+                '-o', 'StrictHostKeyChecking=no',
+                '-o', 'UserKnownHostsFile=/dev/null',
+                '-o', 'LogLevel=ERROR',
+                target
+            ]
+        
+        try:
+            result = self._launch('ssh', hostname, ssh_host, ssh_username, build_cmd)
+            if result['success']:
+                result['message'] = 'SSH terminal started successfully'
+                logger.info(f"Started SSH terminal {result['session_id']} for {hostname} on port {result['port']} with username: {ssh_username or 'manual'}")
+            return result
+        
         except Exception as e:
             logger.error(f"Error starting SSH terminal for {hostname}: {e}")
             return {'success': False, 'message': f'Error: {str(e)}'}
     
     def start_nvtop_terminal(self, hostname, ssh_host, ssh_username, ssh_password=None, nvtop_path="nvtop", sshpass_path="sshpass"):
-        """Start a ttyd nvtop terminal"""
+        """Start a read-only nvtop terminal"""
+        if self.backend == 'websocket':
+            result = self._start_web_terminal('nvtop', hostname, ssh_host, ssh_username, ssh_password,
+                                              command=nvtop_path, writable=False)
+            if result['success']:
+                result['message'] = 'nvtop terminal started successfully'
+            return result
+        
         if not self._check_ttyd_available():
             return {'success': False, 'message': 'ttyd not installed. Please install ttyd to use nvtop terminal.'}
         
-        # Generate a unique port for this nvtop session
-        nvtop_port = self.ttyd_base_port + hash(f"{hostname}_nvtop") % 1000
-        
-        # Kill any existing nvtop process for this host
-        self._kill_existing_process(hostname, self.nvtop_processes)
-        
         try:
+            script_path = None
             if ssh_password:
                 # Check if sshpass is available for password authentication
-                if not self._check_sshpass_available():
+                if not self._check_sshpass_available(sshpass_path):
                     return {'success': False, 'message': 'sshpass not installed. Please install sshpass to use password-based SSH terminals.'}
                 
                 # Create a temporary script for password-based SSH similar to working SSH terminal
@@ -149,113 +327,93 @@ export SSHPASS='{ssh_password}'
                 os.chmod(script_path, stat.S_IRWXU)
                 
                 # Start ttyd with the script
-                cmd = [
-                    'ttyd',
-                    '--port', str(nvtop_port),
-                    '--interface', '0.0.0.0',  # Bind to all interfaces for remote access
-                    '--once',  # Close after one client disconnects
-                    '/bin/bash', script_path
-                ]
+                def build_cmd(port):
+                    return [
+                        'ttyd',
+                        '--port', str(port),
+                        '--interface', '0.0.0.0',  # Bind to all interfaces for remote access
+                        '--once',  # Close after one client disconnects
+                        '/bin/bash', script_path
+                    ]
             else:
                 # Use key-based authentication, similar to working SSH terminal
-                cmd = [
-                    'ttyd',
-                    '--port', str(nvtop_port),
-                    '--interface', '0.0.0.0',  # Bind to all interfaces for remote access
-                    '--once',  # Close after one client disconnects
-                    'ssh',
-                    '-t',
-                    '-o', 'StrictHostKeyChecking=no',
-                    '-o', 'UserKnownHostsFile=/dev/null',
-                    '-o', 'LogLevel=ERROR',
-                    f'{ssh_username}@{ssh_host}',
-                    f'export TERM=xterm-256color; {nvtop_path}'
-                ]
-            
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Store process info
-            self.nvtop_processes[hostname] = {
-                'pid': process.pid,
-                'port': nvtop_port,
-                'host': ssh_host,
-                'started': time.time()
-            }
-            
-            # Give ttyd a moment to start up
-            time.sleep(1)
-            
-            # Check if process is still running
-            if process.poll() is not None:
-                # Process died, get error output
-                stdout, stderr = process.communicate()
-                logger.error(f"nvtop terminal process died immediately. stdout: {stdout.decode()}, stderr: {stderr.decode()}")
-                return {
-                    'success': False, 
-                    'message': f'Failed to start nvtop terminal: {stderr.decode()}'
-                }
-            
-            logger.info(f"Started nvtop terminal for {hostname} on port {nvtop_port}")
-            
-            return {
-                'success': True,
-                'terminal_url': f'http://{self.local_hostname}:{nvtop_port}',
-                'message': 'nvtop terminal started successfully'
-            }
+                def build_cmd(port):
+                    return [
+                        'ttyd',
+                        '--port', str(port),
+                        '--interface', '0.0.0.0',  # Bind to all interfaces for remote access
+                        '--once',  # Close after one client disconnects
+                        'ssh',
+                        '-t',
+                        '-o', 'StrictHostKeyChecking=no',
+                        '-o', 'UserKnownHostsFile=/dev/null',
+                        '-o', 'LogLevel=ERROR',
+                        f'{ssh_username}@{ssh_host}',
+                        f'export TERM=xterm-256color; {nvtop_path}'
+                    ]
             
+            result = self._launch('nvtop', hostname, ssh_host, ssh_username, build_cmd, script_path)
+            if result['success']:
+                result['message'] = 'nvtop terminal started successfully'
+                logger.info(f"Started nvtop terminal {result['session_id']} for {hostname} on port {result['port']}")
+            return result
+        
         except Exception as e:
             logger.error(f"Error starting nvtop terminal for {hostname}: {e}")
             return {'success': False, 'message': f'Error: {str(e)}'}
     
     def list_ssh_terminals(self):
         """List active SSH terminals"""
-        return self._list_terminals(self.ssh_processes)
+        return self._list_terminals('ssh')
     
     def list_nvtop_terminals(self):
         """List active nvtop terminals"""
-        return self._list_terminals(self.nvtop_processes)
+        return self._list_terminals('nvtop')
     
-    def _list_terminals(self, process_dict):
-        """List active terminals for a given process dictionary"""
-        active_terminals = []
+    def _list_terminals(self, kind):
+        """List active terminals of one kind"""
         current_time = time.time()
-        
-        # Clean up dead processes
-        for hostname in list(process_dict.keys()):
-            try:
-                # Check if process is still alive
-                os.kill(process_dict[hostname]['pid'], 0)
-                # Add to active list if it's been running for less than 1 hour
-                if current_time - process_dict[hostname]['started'] < 3600:
-                    active_terminals.append({
-                        'hostname': hostname,
-                        'port': process_dict[hostname]['port'],
-                        'host': process_dict[hostname]['host'],
-                        'url': f"http://{self.local_hostname}:{process_dict[hostname]['port']}"
-                    })
-            except ProcessLookupError:
-                # Process is dead, remove it
-                del process_dict[hostname]
-        
-        return active_terminals
+        with self._lock:
+            self._reap()
+            return [
+                {
+                    'session_id': session['id'],
+                    'hostname': session['hostname'],
+                    'port': session['port'],
+                    'host': session['host'],
+                    'username': session['username'],
+                    'started': session['started'],
+                    'url': f"/terminal/{session['id']}" if session['web'] is not None else f"http://{self.local_hostname}:{session['port']}"
+                }
+                for session in self.sessions.values()
+                if session['kind'] == kind and current_time - session['started'] < TERMINAL_LIST_MAX_AGE
+            ]
     
-    def stop_ssh_terminal(self, hostname):
-        """Stop SSH terminal for a specific host"""
-        return self._stop_terminal(hostname, self.ssh_processes, 'SSH terminal')
+    def stop_ssh_terminal(self, hostname, session_id=None):
+        """Stop one SSH terminal for a host, or all of them"""
+        return self._stop_terminal('ssh', hostname, session_id, 'SSH terminal')
     
-    def stop_nvtop_terminal(self, hostname):
-        """Stop nvtop terminal for a specific host"""
-        return self._stop_terminal(hostname, self.nvtop_processes, 'nvtop terminal')
+    def stop_nvtop_terminal(self, hostname, session_id=None):
+        """Stop one nvtop terminal for a host, or all of them"""
+        return self._stop_terminal('nvtop', hostname, session_id, 'nvtop terminal')
     
-    def _stop_terminal(self, hostname, process_dict, terminal_type):
-        """Stop a terminal for a specific host"""
-        if hostname in process_dict:
-            try:
-                os.kill(process_dict[hostname]['pid'], signal.SIGTERM)
-                del process_dict[hostname]
-                return {'success': True, 'message': f'{terminal_type} stopped'}
-            except ProcessLookupError:
-                del process_dict[hostname]
-                return {'success': True, 'message': f'{terminal_type} was already stopped'}
-        else:
-            return {'success': False, 'message': f'No active {terminal_type} found'}
\ No newline at end of file
+    def _stop_terminal(self, kind, hostname, session_id, terminal_type):
+        """Stop terminals of one kind for a host, optionally just the given session"""
+        with self._lock:
+            self._reap()
+            matching = [
+                session for session in self.sessions.values()
+                if session['kind'] == kind and session['hostname'] == hostname
+                and (session_id is None or session['id'] == session_id)
+            ]
+        if not matching:
+            return {'success': False, 'message': f'No active {terminal_type} found'}
+        
+        self._terminate(matching)
+        return {'success': True, 'message': f'{len(matching)} {terminal_type}(s) stopped' if len(matching) > 1 else f'{terminal_type} stopped'}
+    
+    def stop_all(self):
+        """Stop every terminal"""
+        with self._lock:
+            sessions = list(self.sessions.values())
+        self._terminate(sessions)
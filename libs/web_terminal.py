@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import asyncio
+import asyncssh
+import json
+import queue
+import threading
+import time
+import logging
+from libs.event_loop import get_event_loop_service
+from libs.ssh_pool import get_ssh_pool
+
+logger = logging.getLogger(__name__)
+
+# Sessions nobody connects to within this many seconds are dropped
+UNCLAIMED_SESSION_TIMEOUT = 60
+
+# Largest chunk of terminal output sent in one WebSocket message
+OUTPUT_CHUNK = 64 * 1024
+
+# Largest number of columns or rows accepted from the browser
+MAX_TERMINAL_SIZE = 1000
+
+def terminal_size(cols, rows):
+    """Parse a terminal size sent by the browser, clamped to 1..MAX_TERMINAL_SIZE; raises on non-numeric values"""
+    return (min(MAX_TERMINAL_SIZE, max(1, int(cols))), min(MAX_TERMINAL_SIZE, max(1, int(rows))))
+
+class WebTerminalSession:
+    """
+    A browser terminal: a PTY on its own SSH connection, bridged to one WebSocket.
+
+    The PTY runs on the shared event loop. The WebSocket handler thread
+    feeds keystrokes and resizes to it, and a sender thread forwards its
+    output. A session can be attached once; it ends when the remote
+    command exits or the browser disconnects.
+    """
+
+    def __init__(self, session_id, ssh_host, ssh_username, ssh_password, command=None, writable=True):
+        self.session_id = session_id
+        self.ssh_host = ssh_host
+        self.ssh_username = ssh_username
+        self.ssh_password = ssh_password
+        # None opens the user's login shell
+        self.command = command
+        self.writable = writable
+        self.created = time.time()
+        self.attached = False
+        self.finished = False
+        self._input = asyncio.Queue()
+        self._attach_lock = threading.Lock()
+
+    def is_alive(self):
+        """Check whether the session is running or still waiting for its browser"""
+        if self.finished:
+            return False
+        return self.attached or time.time() - self.created < UNCLAIMED_SESSION_TIMEOUT
+
+    def close(self):
+        """End the session from any thread"""
+        self.finished = True
+        get_event_loop_service().call_soon(self._input.put_nowait, None)
+
+    async def _bridge(self, output, cols, rows):
+        """Run the PTY, passing output to the queue and applying input until either side ends"""
+        try:
+            async with get_ssh_pool().dedicated_connection(self.ssh_host, self.ssh_username, self.ssh_password) as conn:
+                process = await conn.create_process(
+                    self.command,
+                    term_type='xterm-256color',
+                    term_size=(cols, rows),
+                    stderr=asyncssh.STDOUT,
+                    errors='replace'
+                )
+
+                async def forward_output():
+                    while True:
+                        data = await process.stdout.read(OUTPUT_CHUNK)
+                        if not data:
+                            break
+                        output.put(data)
+
+                async def apply_input():
+                    while True:
+                        message = await self._input.get()
+                        if message is None:
+                            break
+                        if message.get('type') == 'resize':
+                            try:
+                                cols, rows = terminal_size(message['cols'], message['rows'])
+                            except (KeyError, TypeError, ValueError):
+                                # A bad message must not end the session
+                                logger.debug(f"Ignoring malformed resize for web terminal {self.session_id}: {message}")
+                                continue
+                            process.change_terminal_size(cols, rows)
+                        elif message.get('type') == 'input' and self.writable:
+                            process.stdin.write(message.get('data', ''))
+
+                tasks = [asyncio.ensure_future(forward_output()), asyncio.ensure_future(apply_input())]
+                try:
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    process.close()
+        except Exception as e:
+            logger.error(f"Web terminal {self.session_id} to {self.ssh_host} failed: {e}")
+            output.put(f'\r\n\x1b[31mConnection failed: {e}\x1b[0m\r\n')
+        finally:
+            self.finished = True
+            output.put(None)
+
+    def attach(self, ws, cols=80, rows=24):
+        """
+        Serve the session over a WebSocket; blocks until the session ends.
+
+        Returns False without serving if the session was already attached.
+        """
+        with self._attach_lock:
+            if self.attached or self.finished:
+                return False
+            self.attached = True
+
+        output = queue.Queue()
+
+        def send_output():
+            while True:
+                data = output.get()
+                if data is None:
+                    break
+                try:
+                    ws.send(data)
+                except Exception:
+                    break
+            # Ends the receive loop below if the browser is still connected
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+        sender = threading.Thread(target=send_output, name=f'web-terminal-{self.session_id}', daemon=True)
+        sender.start()
+        future = get_event_loop_service().submit(self._bridge(output, cols, rows))
+        logger.info(f"Web terminal {self.session_id} attached to {self.ssh_username}@{self.ssh_host}")
+
+        try:
+            while not future.done():
+                message = ws.receive()
+                if message is None:
+                    break
+                try:
+                    message = json.loads(message)
+                except (TypeError, ValueError):
+                    continue
+                if isinstance(message, dict):
+                    get_event_loop_service().call_soon(self._input.put_nowait, message)
+        except Exception:
+            # The browser went away
+            pass
+        finally:
+            self.close()
+            sender.join(timeout=5)
+            logger.info(f"Web terminal {self.session_id} to {self.ssh_host} closed")
+        return True
@@ -2,8 +2,11 @@
 document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('timestamp').textContent = new Date().toLocaleString();
     initializeRefreshTimer();
-    loadUptimes();
-    loadPingStatus();
+    if (window.EventSource) {
+        connectFleetStream();
+    } else {
+        loadFleetStatus();
+    }
 });
 
 // Auto-refresh management
@@ -34,7 +37,12 @@ function startRefreshTimer(interval) {
     }
     if (interval > 0) {
         refreshTimeout = setTimeout(function() {
-            window.location.reload();
+            if (isFleetStreamOpen()) {
+                // Live updates are already arriving, no need to reload
+                startRefreshTimer(interval);
+            } else {
+                window.location.reload();
+            }
         }, interval * 1000);
     }
 }
@@ -67,10 +75,12 @@ function powerOnHost(hostname, button) {
         if (data.success) {
             button.textContent = 'Power On Sent';
             button.style.backgroundColor = '#007bff';
-            // Refresh page after 3 seconds to show updated status
-            setTimeout(() => {
-                window.location.reload();
-            }, 3000);
+            if (!isFleetStreamOpen()) {
+                // Refresh page after 3 seconds to show updated status
+                setTimeout(() => {
+                    window.location.reload();
+                }, 3000);
+            }
         } else {
             button.textContent = 'Failed';
             button.style.backgroundColor = '#dc3545';
@@ -231,10 +241,52 @@ function openSSHTerminal(hostname, button) {
     });
 }
 
+function formatMetric(value, unit) {
+    return value === null || value === undefined ? 'N/A' : `${value}${unit || ''}`;
+}
+
+// Build a per-GPU table from the structured /api/gpu-metrics records
+function renderGpuMetrics(container, gpus) {
+    container.innerHTML = '';
+    if (!gpus.length) {
+        container.textContent = 'No GPUs found';
+        return;
+    }
+    const table = document.createElement('table');
+    table.className = 'gpu-metrics-table';
+    const headerRow = table.createTHead().insertRow();
+    ['GPU', 'Name', 'Util', 'Memory', 'Temp', 'Power', 'Clocks (SM / Mem)', 'Processes'].forEach(label => {
+        const th = document.createElement('th');
+        th.textContent = label;
+        headerRow.appendChild(th);
+    });
+    const body = table.createTBody();
+    gpus.forEach(gpu => {
+        const row = body.insertRow();
+        const memoryPercent = gpu.memory_total ? ` (${Math.round(100 * gpu.memory_used / gpu.memory_total)}%)` : '';
+        const processes = gpu.processes.map(proc => `${proc.pid} ${proc.name} (${formatMetric(proc.used_memory, ' MiB')})`);
+        [
+            gpu.index,
+            gpu.name,
+            formatMetric(gpu.utilization_gpu, '%'),
+            `${formatMetric(gpu.memory_used)} / ${formatMetric(gpu.memory_total, ' MiB')}${memoryPercent}`,
+            formatMetric(gpu.temperature, '°C'),
+            `${formatMetric(gpu.power_draw)} / ${formatMetric(gpu.power_limit, ' W')}`,
+            `${formatMetric(gpu.clock_sm)} / ${formatMetric(gpu.clock_mem, ' MHz')}`,
+            processes.length ? processes.join('\n') : '-'
+        ].forEach(value => {
+            row.insertCell().textContent = value;
+        });
+    });
+    container.appendChild(table);
+}
+
 function toggleGpuInfo(hostname, button) {
     const gpuSection = document.getElementById('gpu-' + hostname);
+    const gpuMetrics = gpuSection.querySelector('.gpu-metrics');
     const gpuOutput = gpuSection.querySelector('.gpu-output');
     const gpuLoading = gpuSection.querySelector('.gpu-loading');
+    const rawToggle = gpuSection.querySelector('.gpu-raw-toggle');
     
     if (gpuSection.style.display === 'none') {
         // Show GPU section
@@ -244,10 +296,13 @@ function toggleGpuInfo(hostname, button) {
         
         // Show loading state
         gpuLoading.style.display = 'block';
+        gpuMetrics.style.display = 'none';
         gpuOutput.style.display = 'none';
+        rawToggle.style.display = 'none';
+        rawToggle.textContent = 'Show nvidia-smi output';
         
-        // Fetch GPU information
-        fetch('/api/gpu-info/' + encodeURIComponent(hostname), {
+        // Fetch structured GPU metrics
+        fetch('/api/gpu-metrics/' + encodeURIComponent(hostname), {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -256,31 +311,71 @@ function toggleGpuInfo(hostname, button) {
         .then(response => response.json())
         .then(data => {
             gpuLoading.style.display = 'none';
-            gpuOutput.style.display = 'block';
+            gpuMetrics.style.display = 'block';
+            rawToggle.style.display = '';
             
             if (data.success) {
-                gpuOutput.textContent = data.output;
-                gpuOutput.classList.remove('gpu-error');
+                renderGpuMetrics(gpuMetrics, data.gpus);
+                gpuMetrics.title = describeAge(data.age);
+                gpuMetrics.classList.remove('gpu-error');
             } else {
-                gpuOutput.textContent = 'Error: ' + data.message;
-                gpuOutput.classList.add('gpu-error');
+                gpuMetrics.textContent = 'Error: ' + data.message;
+                gpuMetrics.classList.add('gpu-error');
             }
         })
         .catch(error => {
             gpuLoading.style.display = 'none';
-            gpuOutput.style.display = 'block';
-            gpuOutput.textContent = 'Error fetching GPU information: ' + error.message;
-            gpuOutput.classList.add('gpu-error');
+            gpuMetrics.style.display = 'block';
+            gpuMetrics.textContent = 'Error fetching GPU information: ' + error.message;
+            gpuMetrics.classList.add('gpu-error');
             console.error('Error:', error);
         });
     } else {
         // Hide GPU section
         gpuSection.style.display = 'none';
-        button.textContent = 'nvidia-smi';
+        button.textContent = 'GPU Summary';
         button.classList.remove('expanded');
     }
 }
 
+// Show or hide the plain nvidia-smi text below the metrics table
+function toggleGpuRawOutput(hostname, button) {
+    const gpuSection = document.getElementById('gpu-' + hostname);
+    const gpuOutput = gpuSection.querySelector('.gpu-output');
+    
+    if (gpuOutput.style.display !== 'none') {
+        gpuOutput.style.display = 'none';
+        button.textContent = 'Show nvidia-smi output';
+        return;
+    }
+    
+    gpuOutput.style.display = 'block';
+    gpuOutput.textContent = 'Loading nvidia-smi output...';
+    gpuOutput.classList.remove('gpu-error');
+    button.textContent = 'Hide nvidia-smi output';
+    
+    fetch('/api/gpu-info/' + encodeURIComponent(hostname), {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            gpuOutput.textContent = data.output;
+        } else {
+            gpuOutput.textContent = 'Error: ' + data.message;
+            gpuOutput.classList.add('gpu-error');
+        }
+    })
+    .catch(error => {
+        gpuOutput.textContent = 'Error fetching nvidia-smi output: ' + error.message;
+        gpuOutput.classList.add('gpu-error');
+        console.error('Error:', error);
+    });
+}
+
 function toggleGpuTopoInfo(hostname, button) {
     const gpuTopoSection = document.getElementById('gpu-topo-' + hostname);
     const gpuTopoOutput = gpuTopoSection.querySelector('.gpu-topo-output');
@@ -331,6 +426,324 @@ function toggleGpuTopoInfo(hostname, button) {
     }
 }
 
+// Container lists shown in open Docker sections, by hostname:
+// {version, containers: Map of id to record, selected: Set of ids ticked for bulk actions,
+//  stats: latest /api/container-stats response, statsTimer: interval polling it}
+const containerTables = {};
+
+// CSS class for each container state
+const CONTAINER_STATE_CLASSES = {
+    'running': 'status-running',
+    'restarting': 'status-running',
+    'exited': 'status-exited',
+    'dead': 'status-exited',
+    'created': 'status-created',
+    'paused': 'status-paused'
+};
+
+// Button text while a Docker action is running
+const DOCKER_ACTION_PROGRESS = {
+    'start': 'Starting...',
+    'stop': 'Stopping...',
+    'restart': 'Restarting...'
+};
+
+function createDockerActionButton(hostname, container, action) {
+    const labels = {'start': 'Start', 'stop': 'Stop', 'restart': 'Restart'};
+    const button = document.createElement('button');
+    button.className = `docker-action-btn docker-${action}-btn`;
+    button.textContent = labels[action];
+    button.title = `${labels[action]} container`;
+    button.addEventListener('click', () => dockerAction(hostname, container.id, action, button));
+    return button;
+}
+
+// Toolbar that applies an action to every ticked container with one request
+function createBulkActionBar(hostname) {
+    const table = containerTables[hostname];
+    const bar = document.createElement('div');
+    bar.className = 'docker-bulk-actions';
+    const count = document.createElement('span');
+    count.className = 'docker-selected-count';
+    count.textContent = `${table.selected.size} selected`;
+    bar.appendChild(count);
+    const summary = document.createElement('span');
+    summary.className = 'docker-stats-summary';
+    ['start', 'stop', 'restart'].forEach(action => {
+        const button = document.createElement('button');
+        button.className = `docker-action-btn docker-${action}-btn`;
+        button.textContent = `${action} selected`;
+        button.disabled = table.selected.size === 0;
+        button.addEventListener('click', () => dockerBulkAction(hostname, action, button));
+        bar.appendChild(button);
+    });
+    bar.appendChild(summary);
+    return bar;
+}
+
+function updateBulkActionBar(hostname) {
+    const dockerSection = document.getElementById('docker-' + hostname);
+    const selected = containerTables[hostname].selected;
+    dockerSection.querySelector('.docker-selected-count').textContent = `${selected.size} selected`;
+    dockerSection.querySelectorAll('.docker-bulk-actions button').forEach(button => {
+        button.disabled = selected.size === 0;
+    });
+}
+
+// Build the container table from structured /api/containers records
+function renderContainers(hostname) {
+    const dockerOutput = document.getElementById('docker-' + hostname).querySelector('.docker-output');
+    const table = containerTables[hostname];
+    const containers = Array.from(table.containers.values());
+    dockerOutput.innerHTML = '';
+    if (!containers.length) {
+        const empty = document.createElement('div');
+        empty.className = 'docker-empty';
+        empty.textContent = 'No Docker containers found';
+        dockerOutput.appendChild(empty);
+        return;
+    }
+    
+    // Forget ticks on containers that are gone
+    table.selected.forEach(id => {
+        if (!table.containers.has(id)) {
+            table.selected.delete(id);
+        }
+    });
+    dockerOutput.appendChild(createBulkActionBar(hostname));
+    
+    const tableElement = document.createElement('table');
+    tableElement.className = 'docker-table';
+    const headerRow = tableElement.createTHead().insertRow();
+    const selectAll = document.createElement('input');
+    selectAll.type = 'checkbox';
+    selectAll.title = 'Select all containers';
+    selectAll.checked = table.selected.size === containers.length;
+    headerRow.appendChild(document.createElement('th')).appendChild(selectAll);
+    ['Container ID', 'Name', 'Image', 'Status', 'CPU', 'Memory', 'Net I/O', 'Block I/O', 'Ports', 'Created', 'Actions'].forEach(label => {
+        const th = document.createElement('th');
+        th.textContent = label;
+        headerRow.appendChild(th);
+    });
+    const body = tableElement.createTBody();
+    const checkboxes = [];
+    containers.forEach(container => {
+        const row = body.insertRow();
+        row.dataset.containerId = container.id;
+        
+        const checkbox = document.createElement('input');
+        checkbox.type = 'checkbox';
+        checkbox.checked = table.selected.has(container.id);
+        checkbox.addEventListener('change', () => {
+            if (checkbox.checked) {
+                table.selected.add(container.id);
+            } else {
+                table.selected.delete(container.id);
+            }
+            selectAll.checked = table.selected.size === containers.length;
+            updateBulkActionBar(hostname);
+        });
+        checkboxes.push([checkbox, container.id]);
+        row.insertCell().appendChild(checkbox);
+        
+        const id = document.createElement('code');
+        id.textContent = container.id;
+        row.insertCell().appendChild(id);
+        
+        const name = document.createElement('span');
+        name.className = 'container-name';
+        name.textContent = container.name;
+        row.insertCell().appendChild(name);
+        
+        row.insertCell().textContent = container.image;
+        
+        const status = document.createElement('span');
+        status.className = `container-status ${CONTAINER_STATE_CLASSES[container.state] || 'status-exited'}`;
+        status.textContent = container.status;
+        row.insertCell().appendChild(status);
+        
+        // Filled in from the docker stats stream by applyContainerStats
+        ['container-cpu', 'container-memory', 'container-net', 'container-block'].forEach(className => {
+            row.insertCell().className = className;
+        });
+        
+        const ports = document.createElement('span');
+        ports.className = 'container-ports';
+        ports.textContent = container.ports.length ? container.ports.join(', ') : '-';
+        row.insertCell().appendChild(ports);
+        
+        row.insertCell().textContent = container.created;
+        
+        // Offer the actions that make sense for the container's state
+        const actions = row.insertCell();
+        if (container.state === 'running') {
+            actions.appendChild(createDockerActionButton(hostname, container, 'stop'));
+            actions.appendChild(createDockerActionButton(hostname, container, 'restart'));
+        } else {
+            actions.appendChild(createDockerActionButton(hostname, container, 'start'));
+        }
+    });
+    selectAll.addEventListener('change', () => {
+        checkboxes.forEach(([checkbox, id]) => {
+            checkbox.checked = selectAll.checked;
+            if (selectAll.checked) {
+                table.selected.add(id);
+            } else {
+                table.selected.delete(id);
+            }
+        });
+        updateBulkActionBar(hostname);
+    });
+    dockerOutput.appendChild(tableElement);
+    applyContainerStats(hostname);
+}
+
+function formatBytes(bytes) {
+    if (bytes === null || bytes === undefined) {
+        return 'N/A';
+    }
+    const units = ['B', 'KiB', 'MiB', 'GiB', 'TiB'];
+    let value = bytes;
+    let unit = 0;
+    while (value >= 1024 && unit < units.length - 1) {
+        value /= 1024;
+        unit++;
+    }
+    return `${value.toFixed(unit ? 1 : 0)} ${units[unit]}`;
+}
+
+// Fill the stats cells and host totals of an open container table
+function applyContainerStats(hostname) {
+    const table = containerTables[hostname];
+    const dockerSection = document.getElementById('docker-' + hostname);
+    if (!table || !table.stats) {
+        return;
+    }
+    const stats = table.stats.containers;
+    dockerSection.querySelectorAll('.docker-table tbody tr').forEach(row => {
+        const record = stats[row.dataset.containerId];
+        row.querySelector('.container-cpu').textContent = record ? formatMetric(record.cpu_percent, '%') : '-';
+        row.querySelector('.container-memory').textContent = record ?
+            `${formatBytes(record.memory_used)} / ${formatBytes(record.memory_limit)}` : '-';
+        row.querySelector('.container-net').textContent = record ?
+            `${formatBytes(record.net_rx)} / ${formatBytes(record.net_tx)}` : '-';
+        row.querySelector('.container-block').textContent = record ?
+            `${formatBytes(record.block_read)} / ${formatBytes(record.block_write)}` : '-';
+    });
+    
+    const summary = table.stats.summary;
+    const summarySpan = dockerSection.querySelector('.docker-stats-summary');
+    if (summarySpan) {
+        summarySpan.textContent = summary.containers ?
+            `Running containers: CPU ${formatMetric(summary.cpu_percent, '%')}, memory ${formatBytes(summary.memory_used)}, ` +
+            `net ${formatBytes(summary.net_rx)} / ${formatBytes(summary.net_tx)}` : '';
+    }
+}
+
+// Poll the in-memory docker stats while a container table is open
+function startContainerStatsPolling(hostname) {
+    const poll = () => {
+        const table = containerTables[hostname];
+        if (!table) {
+            return;
+        }
+        fetch('/api/container-stats/' + encodeURIComponent(hostname))
+        .then(response => response.json())
+        .then(data => {
+            if (data.success && containerTables[hostname]) {
+                containerTables[hostname].stats = data;
+                applyContainerStats(hostname);
+            }
+        })
+        .catch(error => {
+            console.error('Error fetching container stats:', error);
+        });
+    };
+    poll();
+    return setInterval(poll, 5000);
+}
+
+function showDockerError(hostname, message) {
+    const dockerOutput = document.getElementById('docker-' + hostname).querySelector('.docker-output');
+    dockerOutput.innerHTML = '';
+    const error = document.createElement('div');
+    error.className = 'gpu-error';
+    error.textContent = message;
+    dockerOutput.appendChild(error);
+}
+
+// Load the full container list; the browser revalidates its cached copy with
+// If-None-Match, so an unchanged list costs a 304
+function loadContainers(hostname) {
+    const dockerSection = document.getElementById('docker-' + hostname);
+    const dockerOutput = dockerSection.querySelector('.docker-output');
+    const dockerLoading = dockerSection.querySelector('.docker-loading');
+    
+    return fetch('/api/containers/' + encodeURIComponent(hostname))
+    .then(response => response.json())
+    .then(data => {
+        dockerLoading.style.display = 'none';
+        dockerOutput.style.display = 'block';
+        
+        if (data.success) {
+            const previous = containerTables[hostname];
+            containerTables[hostname] = {
+                version: data.version,
+                containers: new Map(data.containers.map(container => [container.id, container])),
+                selected: previous ? previous.selected : new Set(),
+                stats: previous ? previous.stats : null,
+                statsTimer: previous ? previous.statsTimer : null
+            };
+            if (!containerTables[hostname].statsTimer) {
+                containerTables[hostname].statsTimer = startContainerStatsPolling(hostname);
+            }
+            renderContainers(hostname);
+        } else {
+            if (containerTables[hostname]) {
+                clearInterval(containerTables[hostname].statsTimer);
+                delete containerTables[hostname];
+            }
+            showDockerError(hostname, 'Error: ' + data.message);
+        }
+    })
+    .catch(error => {
+        dockerLoading.style.display = 'none';
+        dockerOutput.style.display = 'block';
+        showDockerError(hostname, 'Error fetching Docker information: ' + error.message);
+        console.error('Error:', error);
+    });
+}
+
+// Bring an open container table up to date, fetching only the changes when
+// the host's containers are tracked from Docker events
+function refreshContainers(hostname) {
+    const table = containerTables[hostname];
+    if (!table || table.version === null || table.version === undefined) {
+        return loadContainers(hostname);
+    }
+    
+    return fetch(`/api/docker-changes/${encodeURIComponent(hostname)}?since=${table.version}`)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            return loadContainers(hostname);
+        }
+        if (data.version === table.version) {
+            return;
+        }
+        if (data.reset) {
+            table.containers = new Map();
+        }
+        data.containers.forEach(container => table.containers.set(container.id, container));
+        data.removed.forEach(id => table.containers.delete(id));
+        table.version = data.version;
+        renderContainers(hostname);
+    })
+    .catch(error => {
+        console.error('Error refreshing containers:', error);
+    });
+}
+
 function toggleDockerInfo(hostname, button) {
     const dockerSection = document.getElementById('docker-' + hostname);
     const dockerOutput = dockerSection.querySelector('.docker-output');
@@ -346,35 +759,16 @@ function toggleDockerInfo(hostname, button) {
         dockerLoading.style.display = 'block';
         dockerOutput.style.display = 'none';
         
-        // Fetch Docker information
-        fetch('/api/docker-info/' + encodeURIComponent(hostname), {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json',
-            }
-        })
-        .then(response => response.json())
-        .then(data => {
-            dockerLoading.style.display = 'none';
-            dockerOutput.style.display = 'block';
-            
-            if (data.success) {
-                dockerOutput.innerHTML = data.html;
-            } else {
-                dockerOutput.innerHTML = '<div class="gpu-error">Error: ' + data.message + '</div>';
-            }
-        })
-        .catch(error => {
-            dockerLoading.style.display = 'none';
-            dockerOutput.style.display = 'block';
-            dockerOutput.innerHTML = '<div class="gpu-error">Error fetching Docker information: ' + error.message + '</div>';
-            console.error('Error:', error);
-        });
+        loadContainers(hostname);
     } else {
         // Hide Docker section
         dockerSection.style.display = 'none';
         button.textContent = 'Docker';
         button.classList.remove('expanded');
+        if (containerTables[hostname]) {
+            clearInterval(containerTables[hostname].statsTimer);
+            delete containerTables[hostname];
+        }
     }
 }
 
@@ -382,7 +776,7 @@ function dockerAction(hostname, containerId, action, button) {
     // Disable button and show loading state
     button.disabled = true;
     const originalText = button.textContent;
-    button.textContent = action === 'start' ? 'Starting...' : 'Stopping...';
+    button.textContent = DOCKER_ACTION_PROGRESS[action];
     
     fetch('/api/docker-action/' + encodeURIComponent(hostname), {
         method: 'POST',
@@ -397,19 +791,8 @@ function dockerAction(hostname, containerId, action, button) {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            // Refresh the Docker table to show updated status
-            const dockerSection = document.getElementById('docker-' + hostname);
-            if (dockerSection && dockerSection.style.display !== 'none') {
-                // Find the Docker button and trigger a refresh
-                const dockerButton = document.querySelector(`button[onclick*="toggleDockerInfo('${hostname}'"]`);
-                if (dockerButton && dockerButton.classList.contains('expanded')) {
-                    // Hide and show again to refresh
-                    dockerButton.click();
-                    setTimeout(() => {
-                        dockerButton.click();
-                    }, 500);
-                }
-            }
+            // Pick up the changed row; the table is re-rendered with fresh buttons
+            refreshContainers(hostname);
         } else {
             alert('Error: ' + data.message);
             // Reset button state
@@ -426,6 +809,59 @@ function dockerAction(hostname, containerId, action, button) {
     });
 }
 
+// Apply an action to every ticked container on a host with one request
+function dockerBulkAction(hostname, action, button) {
+    const table = containerTables[hostname];
+    const containerIds = Array.from(table.selected);
+    if (!containerIds.length) {
+        return;
+    }
+    button.disabled = true;
+    const originalText = button.textContent;
+    button.textContent = DOCKER_ACTION_PROGRESS[action];
+    
+    fetch('/api/docker-bulk-action', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            action: action,
+            targets: [{hostname: hostname, containers: containerIds}]
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.hosts) {
+            const failures = [];
+            data.hosts.forEach(host => {
+                if (!host.containers.length && !host.success) {
+                    failures.push(`${host.name}: ${host.message}`);
+                }
+                host.containers.filter(outcome => !outcome.success).forEach(outcome => {
+                    failures.push(`${outcome.container}: ${outcome.message}`);
+                });
+            });
+            if (failures.length) {
+                alert(`docker ${action} failed for:\n` + failures.join('\n'));
+            }
+            table.selected.clear();
+            renderContainers(hostname);
+            refreshContainers(hostname);
+        } else {
+            alert('Error: ' + data.message);
+            button.disabled = false;
+            button.textContent = originalText;
+        }
+    })
+    .catch(error => {
+        alert('Error performing Docker action: ' + error.message);
+        console.error('Error:', error);
+        button.disabled = false;
+        button.textContent = originalText;
+    });
+}
+
 function openNvtopTerminal(hostname, button) {
     // Disable button and show loading state
     button.disabled = true;
@@ -561,88 +997,183 @@ function openNvtopTerminal(hostname, button) {
     });
 }
 
-function loadUptimes() {
-    // Find all uptime elements and load them asynchronously
-    const uptimeElements = document.querySelectorAll('.uptime');
-    
-    // Create array of promises for parallel execution
-    const uptimePromises = Array.from(uptimeElements).map(uptimeDiv => {
-        const hostCard = uptimeDiv.closest('.host-card');
-        const hostname = hostCard.querySelector('.host-hostname').textContent.trim();
-        
-        // Skip if already loaded or if showing an error
-        const currentText = uptimeDiv.textContent;
-        if (!currentText.includes('Loading...')) {
-            return Promise.resolve();
+// Describe how old a cached backend snapshot is
+function describeAge(age) {
+    if (age === undefined || age === null) {
+        return '';
+    }
+    if (age < 60) {
+        return `Updated ${Math.round(age)}s ago`;
+    }
+    return `Updated ${Math.round(age / 60)}m ago`;
+}
+
+// Power status badge text, matching the server-rendered template
+const POWER_STATUS_LABELS = {
+    'on': '● ON',
+    'off': '○ OFF',
+    'error': '! ERROR',
+    'timeout': '⏱ TIMEOUT',
+    'pending': '⏳ PENDING',
+    'config_error': '⚠ CONFIG'
+};
+
+// Ping badge text for each reachability status
+const PING_STATUS_LABELS = {
+    'online': '● ONLINE',
+    'offline': '○ OFFLINE',
+    'error': '! ERROR'
+};
+
+function applyUptime(hostCard, uptime) {
+    const uptimeDiv = hostCard.querySelector('.uptime');
+    if (!uptimeDiv || !uptime) {
+        return;
+    }
+    uptimeDiv.innerHTML = `<strong>Uptime:</strong> ${uptime.uptime}`;
+    uptimeDiv.title = describeAge(uptime.age);
+}
+
+function applyPingStatus(hostCard, ping) {
+    const pingDiv = hostCard.querySelector('.ping-indicator');
+    if (!pingDiv || !ping) {
+        return;
+    }
+    const pingStatus = pingDiv.querySelector('.ping-status');
+    let title = 'Network connectivity status';
+    if (ping.rtt_ms !== undefined && ping.rtt_ms !== null) {
+        title += ` - RTT ${ping.rtt_ms} ms`;
+        if (ping.jitter_ms !== null) {
+            title += `, jitter ${ping.jitter_ms} ms`;
         }
-        
-        // Fetch uptime for this host
-        return fetch(`/api/uptime/${encodeURIComponent(hostname)}`)
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    uptimeDiv.innerHTML = `<strong>Uptime:</strong> ${data.uptime}`;
-                } else {
-                    uptimeDiv.innerHTML = `<strong>Uptime:</strong> ${data.uptime}`;
-                }
-            })
-            .catch(error => {
-                console.error(`Error fetching uptime for ${hostname}:`, error);
-                uptimeDiv.innerHTML = `<strong>Uptime:</strong> Error loading`;
-            });
-    });
+    }
+    if (ping.loss) {
+        title += ` - ${ping.loss}% loss over last ${ping.samples} probes`;
+    }
+    if (ping.age !== undefined) {
+        title += ` (${describeAge(ping.age)})`;
+    }
+    pingDiv.title = title;
+    if (ping.success) {
+        pingStatus.className = `ping-status ${ping.status}`;
+        pingStatus.textContent = PING_STATUS_LABELS[ping.status] || '? UNKNOWN';
+    } else {
+        pingStatus.className = 'ping-status error';
+        pingStatus.textContent = '! ERROR';
+    }
+}
+
+function setVisible(element, visible) {
+    if (element) {
+        element.style.display = visible ? '' : 'none';
+    }
+}
+
+function applyPowerStatus(hostCard, power) {
+    const statusDiv = hostCard.querySelector('.status');
+    if (!statusDiv || !power) {
+        return;
+    }
+    statusDiv.className = `status ${power.status}`;
+    statusDiv.textContent = POWER_STATUS_LABELS[power.status] || '? UNKNOWN';
+    statusDiv.title = describeAge(power.age);
+    
+    // Show the controls that make sense for the new power state
+    setVisible(hostCard.querySelector('.nvtop-btn-small'), power.status === 'on');
+    setVisible(hostCard.querySelector('.gpu-actions'), power.status === 'on');
+    
+    const actionsSection = hostCard.querySelector('.actions-section');
+    if (actionsSection && power.status === 'off' && actionsSection.style.display === 'none') {
+        // Reset a power-on button left in its "sent" state
+        const powerButton = actionsSection.querySelector('.power-on-btn');
+        powerButton.disabled = false;
+        powerButton.textContent = 'Power On';
+        powerButton.style.backgroundColor = '';
+    }
+    setVisible(actionsSection, power.status === 'off');
+}
+
+function applyContainerCounts(hostCard, docker) {
+    const countSpan = hostCard.querySelector('.docker-count');
+    if (!countSpan || !docker) {
+        return;
+    }
+    countSpan.textContent = docker.containers ? `${docker.containers.running}/${docker.containers.total}` : '';
     
-    // Wait for all uptime requests to complete
-    Promise.allSettled(uptimePromises).then(() => {
-        console.log('All uptime information loaded');
+    // Keep an open container table in step with the pushed change
+    if (containerTables[hostCard.dataset.hostname]) {
+        refreshContainers(hostCard.dataset.hostname);
+    }
+}
+
+// Patch one host card with whatever fields are present in a status update
+function applyHostStatus(host) {
+    const hostCard = document.querySelector(`.host-card[data-hostname="${CSS.escape(host.hostname)}"]`);
+    if (!hostCard) {
+        return;
+    }
+    applyPingStatus(hostCard, host.ping);
+    applyUptime(hostCard, host.uptime);
+    applyPowerStatus(hostCard, host.power);
+    applyContainerCounts(hostCard, host.docker);
+}
+
+// Live status updates pushed by the server
+let fleetStream = null;
+
+function isFleetStreamOpen() {
+    return fleetStream !== null && fleetStream.readyState === EventSource.OPEN;
+}
+
+function connectFleetStream() {
+    fleetStream = new EventSource('/api/stream');
+    
+    fleetStream.addEventListener('host', event => {
+        applyHostStatus(JSON.parse(event.data));
+        document.getElementById('timestamp').textContent = new Date().toLocaleString();
     });
+    
+    fleetStream.onerror = () => {
+        // EventSource reconnects on its own and resumes from the last event id
+        console.warn('Fleet status stream interrupted, reconnecting...');
+    };
 }
 
-function loadPingStatus() {
-    // Find all ping indicator elements and check connectivity
-    const pingElements = document.querySelectorAll('.ping-indicator');
+// Load ping, uptime and power state for every host with one request.
+// Hosts whose data is still being collected are retried until complete.
+function loadFleetStatus(attempt = 0) {
+    const maxAttempts = 15;
     
-    // Create array of promises for parallel execution
-    const pingPromises = Array.from(pingElements).map(pingDiv => {
-        const hostCard = pingDiv.closest('.host-card');
-        const hostname = hostCard.querySelector('.host-hostname').textContent.trim();
-        const pingStatus = pingDiv.querySelector('.ping-status');
-        
-        // Fetch ping status for this host
-        return fetch(`/api/ping/${encodeURIComponent(hostname)}`)
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    pingStatus.className = `ping-status ${data.status}`;
-                    switch(data.status) {
-                        case 'online':
-                            pingStatus.textContent = '● ONLINE';
-                            break;
-                        case 'offline':
-                            pingStatus.textContent = '○ OFFLINE';
-                            break;
-                        case 'error':
-                            pingStatus.textContent = '! ERROR';
-                            break;
-                        default:
-                            pingStatus.textContent = '? UNKNOWN';
-                    }
-                } else {
+    return fetch('/api/fleet?fields=ping,uptime,power')
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message);
+            }
+            
+            data.hosts.forEach(applyHostStatus);
+            
+            if (!data.complete && attempt < maxAttempts) {
+                // Some hosts are still pending, check again shortly
+                setTimeout(() => loadFleetStatus(attempt + 1), 2000);
+            } else {
+                console.log('All fleet status information loaded');
+            }
+        })
+        .catch(error => {
+            console.error('Error loading fleet status:', error);
+            document.querySelectorAll('.host-card').forEach(hostCard => {
+                const uptimeDiv = hostCard.querySelector('.uptime');
+                if (uptimeDiv && uptimeDiv.textContent.includes('Loading...')) {
+                    uptimeDiv.innerHTML = '<strong>Uptime:</strong> Error loading';
+                }
+                const pingStatus = hostCard.querySelector('.ping-status.loading');
+                if (pingStatus) {
                     pingStatus.className = 'ping-status error';
                     pingStatus.textContent = '! ERROR';
                 }
-            })
-            .catch(error => {
-                console.error(`Error checking ping for ${hostname}:`, error);
-                pingStatus.className = 'ping-status error';
-                pingStatus.textContent = '! ERROR';
             });
-    });
-    
-    // Wait for all ping requests to complete
-    Promise.allSettled(pingPromises).then(() => {
-        console.log('All ping status information loaded');
-    });
+        });
 }
 
 // Update application function
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+
+"""
+Production entry point.
+
+Run with gunicorn using the bundled configuration:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Importing the app starts its background services (event loop, fleet
+poller), so it must be imported in the worker process, not preloaded.
+"""
+
+from app import app
+
+application = app